@@ -0,0 +1,38 @@
+"""create users table
+
+Revision ID: 000_create_users
+Revises:
+Create Date: 2023-12-31 00:00:00.000000
+
+The users table used to be created by Base.metadata.create_all at
+startup, and 001 declares a foreign key to it. Databases that already
+have revision 001 or later are past this revision and never run it.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '000_create_users'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Same table and index names as create_all gives database.User
+    op.create_table(
+        'users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('username', sa.String(), nullable=True),
+        sa.Column('email', sa.String(), nullable=True),
+        sa.Column('hash_password', sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_users_id'), 'users', ['id'], unique=False)
+    op.create_index(op.f('ix_users_email'), 'users', ['email'], unique=True)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_users_email'), table_name='users')
+    op.drop_index(op.f('ix_users_id'), table_name='users')
+    op.drop_table('users')
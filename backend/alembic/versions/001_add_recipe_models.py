@@ -1,7 +1,7 @@
 """Add recipe models
 
 Revision ID: 001_add_recipe_models
-Revises: 
+Revises: 000_create_users
 Create Date: 2024-01-01 00:00:00.000000
 
 """
@@ -11,7 +11,7 @@ from sqlalchemy.dialects import postgresql
 
 # revision identifiers, used by Alembic.
 revision = '001_add_recipe_models'
-down_revision = None
+down_revision = '000_create_users'
 branch_labels = None
 depends_on = None
 
@@ -0,0 +1,43 @@
+"""add full-text and trigram search indexes
+
+Revision ID: 003_add_recipe_search_indexes
+Revises: 002_add_default_recipes
+Create Date: 2024-02-01 00:00:00.000000
+"""
+from alembic import op
+
+# revision identifiers
+revision = '003_add_recipe_search_indexes'
+down_revision = '002_add_default_recipes'
+branch_labels = None
+depends_on = None
+
+# Must match recipe_search.SEARCH_DOCUMENT_SQL
+SEARCH_DOCUMENT_SQL = (
+    "setweight(to_tsvector('english'::regconfig, coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english'::regconfig, coalesce(description, '')), 'B')"
+)
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    # Full-text search over title (weight A) and description (weight B)
+    op.execute(
+        f"CREATE INDEX ix_recipes_search_document ON recipes USING gin (({SEARCH_DOCUMENT_SQL}))"
+    )
+
+    # Trigram indexes so partial-word ILIKE '%q%' avoids a sequential scan
+    op.create_index('ix_recipes_title_trgm', 'recipes', ['title'],
+                    postgresql_using='gin',
+                    postgresql_ops={'title': 'gin_trgm_ops'})
+    op.create_index('ix_recipes_description_trgm', 'recipes', ['description'],
+                    postgresql_using='gin',
+                    postgresql_ops={'description': 'gin_trgm_ops'})
+
+
+def downgrade():
+    op.drop_index('ix_recipes_description_trgm', table_name='recipes')
+    op.drop_index('ix_recipes_title_trgm', table_name='recipes')
+    op.execute("DROP INDEX IF EXISTS ix_recipes_search_document")
+    # pg_trgm is left installed; other objects may depend on it
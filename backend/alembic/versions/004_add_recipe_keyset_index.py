@@ -0,0 +1,22 @@
+"""add composite index for keyset pagination
+
+Revision ID: 004_add_recipe_keyset_index
+Revises: 003_add_recipe_search_indexes
+Create Date: 2024-02-15 00:00:00.000000
+"""
+from alembic import op
+
+# revision identifiers
+revision = '004_add_recipe_keyset_index'
+down_revision = '003_add_recipe_search_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_recipes_user_id_created_at_id', 'recipes',
+                    ['user_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_recipes_user_id_created_at_id', table_name='recipes')
@@ -0,0 +1,29 @@
+"""add external_id to recipes for importer dedupe
+
+Revision ID: 005_add_recipe_external_id
+Revises: 004_add_recipe_keyset_index
+Create Date: 2024-02-20 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '005_add_recipe_external_id'
+down_revision = '004_add_recipe_keyset_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('recipes', sa.Column('external_id', sa.String(), nullable=True))
+    # One row per (external recipe, owner); default recipes have a NULL owner,
+    # which a plain unique index would treat as always distinct
+    op.execute(
+        "CREATE UNIQUE INDEX ux_recipes_external_id_owner "
+        "ON recipes (external_id, COALESCE(user_id, 0))"
+    )
+
+
+def downgrade():
+    op.drop_index('ux_recipes_external_id_owner', table_name='recipes')
+    op.drop_column('recipes', 'external_id')
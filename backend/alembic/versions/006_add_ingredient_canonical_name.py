@@ -0,0 +1,26 @@
+"""add canonical_name to recipe_ingredients
+
+Revision ID: 006_add_ingredient_canonical_name
+Revises: 005_add_recipe_external_id
+Create Date: 2024-03-01 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '006_add_ingredient_canonical_name'
+down_revision = '005_add_recipe_external_id'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Nullable: existing rows are filled by migration 009
+    op.add_column('recipe_ingredients', sa.Column('canonical_name', sa.String(), nullable=True))
+    op.create_index('ix_recipe_ingredients_canonical_name', 'recipe_ingredients',
+                    ['canonical_name'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_recipe_ingredients_canonical_name', table_name='recipe_ingredients')
+    op.drop_column('recipe_ingredients', 'canonical_name')
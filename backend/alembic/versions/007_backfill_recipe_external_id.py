@@ -0,0 +1,51 @@
+"""backfill external_id for recipes imported before 005
+
+Revision ID: 007_backfill_recipe_external_id
+Revises: 006_add_ingredient_canonical_name
+Create Date: 2024-03-10 00:00:00.000000
+"""
+from alembic import op
+
+# revision identifiers
+revision = '007_backfill_recipe_external_id'
+down_revision = '006_add_ingredient_canonical_name'
+branch_labels = None
+depends_on = None
+
+# Recipes seeded before the importer kept Spoonacular's URL in source_url when
+# the recipe had no original source: https://spoonacular.com/recipes/<slug>-<id>.
+# Those carry the Spoonacular id; recipes with a publisher URL are matched by
+# the importer on (source_url, owner) instead.
+SPOONACULAR_URL_PATTERN = r'^https?://(www\.)?spoonacular\.com/recipes/.*-[0-9]+$'
+
+
+def upgrade():
+    # One row per (external id, owner), skipping ids the owner already has,
+    # so the unique index ux_recipes_external_id_owner holds
+    op.execute(f"""
+        WITH candidates AS (
+            SELECT DISTINCT ON (ext_id, COALESCE(user_id, 0)) id, user_id, ext_id
+            FROM (
+                SELECT id, user_id,
+                       'spoonacular:' || substring(source_url from '-([0-9]+)$') AS ext_id
+                FROM recipes
+                WHERE external_id IS NULL
+                  AND source_url ~ '{SPOONACULAR_URL_PATTERN}'
+            ) legacy
+            ORDER BY ext_id, COALESCE(user_id, 0), id
+        )
+        UPDATE recipes
+        SET external_id = candidates.ext_id
+        FROM candidates
+        WHERE recipes.id = candidates.id
+          AND NOT EXISTS (
+              SELECT 1 FROM recipes existing
+              WHERE existing.external_id = candidates.ext_id
+                AND COALESCE(existing.user_id, 0) = COALESCE(candidates.user_id, 0)
+          )
+    """)
+
+
+def downgrade():
+    # Backfilled ids are indistinguishable from imported ones; keep them
+    pass
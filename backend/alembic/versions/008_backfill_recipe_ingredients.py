@@ -0,0 +1,46 @@
+"""backfill recipe_ingredients for recipes written before it was kept in sync
+
+Revision ID: 008_backfill_recipe_ingredients
+Revises: 007_backfill_recipe_external_id
+Create Date: 2024-03-12 00:00:00.000000
+"""
+from alembic import op
+
+# revision identifiers
+revision = '008_backfill_recipe_ingredients'
+down_revision = '007_backfill_recipe_external_id'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Ingredient search, pantry search and the default recipe snapshot read
+    # only recipe_ingredients; recipes without rows would never match.
+    # One row per entry of the ingredients JSON, as ingredient_index.ingredient_rows
+    # writes them: an object's lowercased name, quantity and unit, or a
+    # lowercased plain string. canonical_name is filled by the next revision.
+    op.execute("""
+        INSERT INTO recipe_ingredients (recipe_id, ingredient_name, quantity, unit)
+        SELECT recipes.id,
+               lower(CASE json_typeof(item.value)
+                         WHEN 'string' THEN item.value #>> '{}'
+                         ELSE coalesce(item.value ->> 'name', '')
+                     END),
+               CASE json_typeof(item.value) WHEN 'object' THEN item.value ->> 'quantity' END,
+               CASE json_typeof(item.value) WHEN 'object' THEN item.value ->> 'unit' END
+        FROM recipes
+        CROSS JOIN LATERAL json_array_elements(
+            CASE json_typeof(recipes.ingredients) WHEN 'array' THEN recipes.ingredients ELSE '[]'::json END
+        ) WITH ORDINALITY AS item (value, position)
+        WHERE json_typeof(item.value) IN ('object', 'string')
+          AND NOT EXISTS (
+              SELECT 1 FROM recipe_ingredients existing
+              WHERE existing.recipe_id = recipes.id
+          )
+        ORDER BY recipes.id, item.position
+    """)
+
+
+def downgrade():
+    # The rows are also written for new recipes; nothing to undo
+    pass
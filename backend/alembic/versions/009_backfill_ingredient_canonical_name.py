@@ -0,0 +1,60 @@
+"""backfill recipe_ingredients.canonical_name for rows written before 006
+
+Revision ID: 009_backfill_ingredient_canonical_name
+Revises: 008_backfill_recipe_ingredients
+Create Date: 2024-03-14 00:00:00.000000
+"""
+import logging
+
+from alembic import op
+import sqlalchemy as sa
+
+from ingredient_canonical import canonical_name
+
+# revision identifiers
+revision = '009_backfill_ingredient_canonical_name'
+down_revision = '008_backfill_recipe_ingredients'
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger(f"alembic.runtime.migration.{revision}")
+
+# The table as of this revision, not the application model
+recipe_ingredients = sa.table(
+    'recipe_ingredients',
+    sa.column('ingredient_name', sa.String),
+    sa.column('canonical_name', sa.String),
+)
+
+
+def upgrade():
+    # Exact ingredient search matches canonical_name only; rows without one
+    # (written before 006, or by 008) would never be found. The canonical
+    # form is computed in Python, once per distinct name.
+    if op.get_context().as_sql:
+        logger.warning("canonical_name cannot be computed in --sql mode; "
+                       "run backfill_canonical_ingredients.py after applying the SQL")
+        return
+
+    conn = op.get_bind()
+    names = conn.execute(
+        sa.select(recipe_ingredients.c.ingredient_name)
+        .where(recipe_ingredients.c.canonical_name.is_(None))
+        .distinct()
+    ).scalars().all()
+    if not names:
+        return
+    conn.execute(
+        recipe_ingredients.update()
+        .where(
+            recipe_ingredients.c.ingredient_name == sa.bindparam('name'),
+            recipe_ingredients.c.canonical_name.is_(None),
+        )
+        .values(canonical_name=sa.bindparam('canonical')),
+        [{'name': name, 'canonical': canonical_name(name)} for name in names],
+    )
+
+
+def downgrade():
+    # New rows get canonical_name when written as well; nothing to undo
+    pass
@@ -0,0 +1,216 @@
+"""
+Typeahead suggestions for recipe titles and ingredient names.
+
+Suggestions are kept in PrefixIndexes: sorted lists of
+(key, suggestion) pairs, where the keys are the lowercased suggestion
+and each later word start in it ("tikka masala" is found by "tik" and by
+"mas"). A lookup bisects to the first key with the prefix and walks
+forward, so the cost depends on the number of suggestions returned, not
+on the corpus size. Suggestions come back in key order, which puts
+"tomato" before "tomato paste".
+
+Each kind of suggestion has one PrefixIndex per owner: one for the
+default recipes (owner 0) and one per user. A lookup merges just the
+default index and the user's own, so it only ever walks visible
+suggestions, however many other users share the prefix.
+
+The index is per process. Recipes created here are added right away;
+recipes written by other workers or the importer are picked up by sync(),
+which reads only rows its SyncCursors have not read and runs at most
+every AUTOCOMPLETE_SYNC_SECONDS, so lookups stay in memory.
+"""
+import heapq
+import threading
+import time
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from config import AUTOCOMPLETE_SYNC_SECONDS, INDEX_SYNC_GAP_IDS
+from database import Recipe, RecipeIngredient
+from sync_cursor import SyncCursor
+
+MAX_WORD_STARTS = 5  # word starts indexed per suggestion, besides the first
+
+
+def normalize(text: str) -> str:
+    """Lowercase with single spaces, as keys and queries are compared."""
+    return " ".join((text or "").lower().split())
+
+
+class PrefixIndex:
+    """Sorted prefix keys over one owner's suggestions of one kind."""
+
+    def __init__(self):
+        self._keys: List[Tuple[str, str]] = []  # (key, normalized suggestion), sorted
+        self._display: Dict[str, str] = {}  # normalized suggestion -> text as first seen
+
+    def __len__(self) -> int:
+        return len(self._display)
+
+    @staticmethod
+    def _key_starts(normalized: str) -> List[str]:
+        keys = [normalized]
+        position = normalized.find(" ")
+        while position != -1 and len(keys) <= MAX_WORD_STARTS:
+            keys.append(normalized[position + 1:])
+            position = normalized.find(" ", position + 1)
+        return keys
+
+    def add(self, text: str, bulk: bool = False) -> None:
+        """Record `text`; with `bulk`, call sort() afterwards."""
+        normalized = normalize(text)
+        if not normalized or normalized in self._display:
+            return
+        self._display[normalized] = " ".join(text.split())
+        for key in self._key_starts(normalized):
+            if bulk:
+                self._keys.append((key, normalized))
+            else:
+                insort(self._keys, (key, normalized))
+
+    def sort(self) -> None:
+        self._keys.sort()
+
+    def scan(self, prefix: str) -> Iterator[Tuple[str, str, str]]:
+        """(key, normalized, display) for every key starting with `prefix`, in key order."""
+        keys = self._keys
+        i = bisect_left(keys, (prefix,))
+        while i < len(keys) and keys[i][0].startswith(prefix):
+            key, normalized = keys[i]
+            yield key, normalized, self._display[normalized]
+            i += 1
+
+
+def lookup(indexes: Dict[int, PrefixIndex], prefix: str, user_id: int, limit: int) -> List[str]:
+    """Up to `limit` suggestions with a key starting with `prefix`, from the default and the user's indexes."""
+    visible = [indexes[owner] for owner in (0, user_id) if owner in indexes]
+    results: List[str] = []
+    seen = set()
+    for _, normalized, display in heapq.merge(*(index.scan(prefix) for index in visible)):
+        if normalized in seen:
+            continue
+        seen.add(normalized)
+        results.append(display)
+        if len(results) == limit:
+            break
+    return results
+
+
+class Autocomplete:
+    """Title and ingredient prefix indexes, kept current incrementally by row id."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        # owner (0 = default recipes) -> PrefixIndex
+        self.titles: Dict[int, PrefixIndex] = {}
+        self.ingredients: Dict[int, PrefixIndex] = {}
+        self._recipe_cursor = SyncCursor()
+        self._ingredient_cursor = SyncCursor()
+        self._synced_at: Optional[float] = None
+
+    def reset(self) -> None:
+        """Forget everything, e.g. after the recipes were reloaded; the next sync rebuilds it."""
+        with self._lock:
+            self._reset()
+
+    def resync(self, db: Session) -> None:
+        """Rebuild both indexes from scratch and swap them in; lookups keep using the old ones meanwhile."""
+        fresh = Autocomplete()
+        fresh.sync(db, force=True)
+        with self._lock:
+            self.titles, self.ingredients = fresh.titles, fresh.ingredients
+            self._recipe_cursor, self._ingredient_cursor = fresh._recipe_cursor, fresh._ingredient_cursor
+            self._synced_at = fresh._synced_at
+
+    def add_recipe(self, user_id: Optional[int], title: str, names: Iterable[str]) -> None:
+        """Add a recipe written by this process (other writers are picked up by sync)."""
+        owner = user_id or 0
+        with self._lock:
+            titles = self.titles.setdefault(owner, PrefixIndex())
+            titles.add(title)
+            ingredients = self.ingredients.setdefault(owner, PrefixIndex())
+            for name in names:
+                ingredients.add(name)
+
+    def sync(self, db: Session, force: bool = False) -> None:
+        """
+        Catch up with recipes and ingredient rows written since the last
+        sync, at most every AUTOCOMPLETE_SYNC_SECONDS unless `force`.
+        Rows are append-only, so only rows the cursors have not read are
+        fetched, and reading a recipe already added by add_recipe()
+        changes nothing.
+        """
+        now = time.monotonic()
+        if not force and self._synced_at is not None and now - self._synced_at < AUTOCOMPLETE_SYNC_SECONDS:
+            return
+        self._synced_at = now
+
+        with self._lock:
+            recipe_cursor, ingredient_cursor = self._recipe_cursor, self._ingredient_cursor
+            recipes_unread = recipe_cursor.unread(Recipe.id)
+            ingredients_unread = ingredient_cursor.unread(RecipeIngredient.id)
+        recipes = db.execute(
+            select(Recipe.id, Recipe.user_id, Recipe.title).where(recipes_unread)
+        ).all()
+        if ingredient_cursor.max_id == 0:
+            # First load: one row per (name, owner), far fewer than the ingredient
+            # rows, plus the recent ids the cursor needs to track gaps
+            max_id = db.scalar(select(func.max(RecipeIngredient.id))) or 0
+            ingredients = db.execute(
+                select(RecipeIngredient.ingredient_name, Recipe.user_id)
+                .join(Recipe, Recipe.id == RecipeIngredient.recipe_id)
+                .where(RecipeIngredient.id <= max_id)
+                .group_by(RecipeIngredient.ingredient_name, Recipe.user_id)
+            ).all()
+            ingredient_ids = db.scalars(
+                select(RecipeIngredient.id)
+                .where(RecipeIngredient.id > max_id - INDEX_SYNC_GAP_IDS, RecipeIngredient.id <= max_id)
+            ).all()
+        else:
+            rows = db.execute(
+                select(RecipeIngredient.id, RecipeIngredient.ingredient_name, Recipe.user_id)
+                .join(Recipe, Recipe.id == RecipeIngredient.recipe_id)
+                .where(ingredients_unread)
+            ).all()
+            ingredients = [(name, user_id) for _, name, user_id in rows]
+            ingredient_ids = [row_id for row_id, _, _ in rows]
+        if not recipes and not ingredients and not recipe_cursor.gaps and not ingredient_cursor.gaps:
+            return
+
+        bulk = len(recipes) + len(ingredients) > 1000
+        with self._lock:
+            if self._recipe_cursor is not recipe_cursor:
+                return  # reset or resync meanwhile
+            touched: Dict[Tuple[str, int], PrefixIndex] = {}
+            for _, user_id, title in recipes:
+                index = touched[("title", user_id or 0)] = self.titles.setdefault(user_id or 0, PrefixIndex())
+                index.add(title, bulk)
+            for name, user_id in ingredients:
+                index = touched[("ingredient", user_id or 0)] = self.ingredients.setdefault(user_id or 0, PrefixIndex())
+                index.add(name, bulk)
+            if bulk:
+                for index in touched.values():
+                    index.sort()
+            recipe_cursor.advance(row.id for row in recipes)
+            ingredient_cursor.advance(ingredient_ids)
+
+    def suggest(self, user_id: int, q: str, limit: int = 10) -> Dict[str, List[str]]:
+        """Titles and ingredient names visible to `user_id` starting a word with `q`."""
+        prefix = normalize(q)
+        if not prefix:
+            return {"titles": [], "ingredients": []}
+        with self._lock:
+            return {
+                "titles": lookup(self.titles, prefix, user_id, limit),
+                "ingredients": lookup(self.ingredients, prefix, user_id, limit),
+            }
+
+
+# Shared per-process suggestions
+autocomplete = Autocomplete()
@@ -0,0 +1,62 @@
+"""
+Script to recompute recipe_ingredients.canonical_name after the
+ingredient_canonical rules change (--all), or to fill rows that have none
+after applying the migrations with --sql, where migration 009 cannot run.
+Safe to re-run: only rows without a canonical name are updated, unless
+--all is given.
+Usage: python backfill_canonical_ingredients.py [batch_size] [--all]
+"""
+import sys
+import time
+from sqlalchemy import select, update
+from database import SessionLocal, RecipeIngredient
+from ingredient_canonical import canonical_name
+
+def backfill_canonical_ingredients(batch_size: int = 5000, recompute: bool = False):
+    """Write canonical_name from ingredient_name, one batch of rows (by id) per commit."""
+    db = SessionLocal()
+    start = time.monotonic()
+    last_id = 0
+    rows_seen = rows_updated = 0
+
+    try:
+        while True:
+            query = (
+                select(RecipeIngredient.id, RecipeIngredient.ingredient_name, RecipeIngredient.canonical_name)
+                .where(RecipeIngredient.id > last_id)
+                .order_by(RecipeIngredient.id)
+                .limit(batch_size)
+            )
+            if not recompute:
+                query = query.where(RecipeIngredient.canonical_name.is_(None))
+            batch = db.execute(query).all()
+            if not batch:
+                break
+
+            changes = [
+                {"id": row.id, "canonical_name": canonical}
+                for row in batch
+                if (canonical := canonical_name(row.ingredient_name)) != row.canonical_name
+            ]
+            if changes:
+                db.execute(update(RecipeIngredient), changes)
+            db.commit()
+
+            last_id = batch[-1].id
+            rows_seen += len(batch)
+            rows_updated += len(changes)
+            print(f"Checked {rows_seen} ingredient rows ({rows_updated} updated)")
+
+        elapsed = time.monotonic() - start
+        print(f"\nDone: {rows_seen} ingredient rows checked, {rows_updated} updated in {elapsed:.1f}s")
+
+    except Exception as e:
+        db.rollback()
+        print(f"Error: {e} (committed batches are kept; re-run to continue)")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv[1:] if arg != "--all"]
+    batch_size = int(args[0]) if args else 5000
+    backfill_canonical_ingredients(batch_size, recompute="--all" in sys.argv[1:])
@@ -0,0 +1,66 @@
+"""
+Script to backfill recipe_ingredients rows for recipes written before the
+table was kept in sync (ingredient search only sees recipes that have rows).
+Migration 008 runs the same backfill in SQL; this script is for re-running it.
+Safe to re-run: recipes that already have rows are skipped.
+Usage: python backfill_recipe_ingredients.py [batch_size]
+"""
+import sys
+import time
+from typing import Iterator, Tuple
+from sqlalchemy import select, insert, exists
+from sqlalchemy.orm import Session
+from database import SessionLocal, Recipe, RecipeIngredient
+from ingredient_index import ingredient_rows
+
+def backfill_batches(db: Session, batch_size: int = 1000) -> Iterator[Tuple[int, int]]:
+    """
+    Write recipe_ingredients rows from the ingredients JSON of recipes that
+    have none, one batch of recipes (by id) at a time, yielding
+    (recipes, rows) after each batch. The caller commits.
+    """
+    last_id = 0
+    while True:
+        batch = db.execute(
+            select(Recipe.id, Recipe.ingredients)
+            .where(
+                Recipe.id > last_id,
+                ~exists().where(RecipeIngredient.recipe_id == Recipe.id),
+            )
+            .order_by(Recipe.id)
+            .limit(batch_size)
+        ).all()
+        if not batch:
+            return
+
+        rows = [row for recipe_id, ingredients in batch for row in ingredient_rows(recipe_id, ingredients)]
+        if rows:
+            db.execute(insert(RecipeIngredient), rows)
+        last_id = batch[-1].id
+        yield len(batch), len(rows)
+
+def backfill_recipe_ingredients(batch_size: int = 1000):
+    """Run backfill_batches, one commit per batch."""
+    db = SessionLocal()
+    start = time.monotonic()
+    recipes_done = rows_written = 0
+
+    try:
+        for recipes, rows in backfill_batches(db, batch_size):
+            db.commit()
+            recipes_done += recipes
+            rows_written += rows
+            print(f"Backfilled {recipes_done} recipes ({rows_written} ingredient rows)")
+
+        elapsed = time.monotonic() - start
+        print(f"\nDone: {recipes_done} recipes, {rows_written} ingredient rows in {elapsed:.1f}s")
+
+    except Exception as e:
+        db.rollback()
+        print(f"Error: {e} (committed batches are kept; re-run to continue)")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    batch_size = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    backfill_recipe_ingredients(batch_size)
@@ -0,0 +1,397 @@
+"""
+Micro-benchmarks for the recipe search, auth and serialization hot paths.
+
+For each corpus size a synthetic set of recipes with realistic ingredient
+lists is loaded (through recipe_importer.insert_recipes, like a real
+import), then two groups of cases are timed:
+
+- inner:    recipe_service / ingredient_index / session functions called
+            directly on a Session, plus page serialization;
+- endpoint: the recipe routes through FastAPI's TestClient, with the
+            Redis response cache disabled so every call does the real work
+            (one extra case shows a cached list page).
+
+The default database is a throwaway SQLite file and the default Redis is
+fakeredis. --database-url may point at a local Postgres instead; it must
+be a scratch database already migrated with `alembic upgrade head`, and
+its users/recipes tables are TRUNCATEd. Results go to stdout and, with
+--json, to a file that --compare can diff against a later run.
+
+Usage (from backend/, after `pip install -r benchmarks/requirements.txt`):
+    python -m benchmarks.bench_hot_paths [--sizes 1000 10000 100000]
+        [--repeat 50] [--database-url URL] [--redis-url URL]
+        [--json results.json] [--compare previous.json]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional
+
+import redis
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.orm import Session, sessionmaker
+
+import fast_json
+import recipe_cache
+import recipe_service
+import sessions
+from autocomplete import autocomplete
+from database import Base, Recipe, User, get_db
+from default_recipes import default_recipe_store
+from dependencies import _get_production_user, get_read_db, get_read_session_factory, set_redis_client
+from ingredient_index import ingredient_index
+from models.schemas import RecipeResponse
+from pantry_matcher import pantry_matcher
+from recipe_importer import insert_recipes
+from routes.recipes import router as recipes_router
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+BENCH_SID = "bench-session"
+BATCH_SIZE = 1000
+
+# Synthetic corpus vocabulary: ingredient names are built as
+# "<modifier> <base>" or plain "<base>", which gives a few thousand
+# distinct names with the overlap (e.g. "onion" / "red onion") that
+# two-way substring matching has to deal with.
+BASE_INGREDIENTS = [
+    "flour", "sugar", "brown sugar", "butter", "egg", "milk", "heavy cream", "salt",
+    "black pepper", "olive oil", "vegetable oil", "garlic", "onion", "red onion",
+    "shallot", "tomato", "cherry tomato", "tomato paste", "potato", "sweet potato",
+    "carrot", "celery", "bell pepper", "jalapeno", "chicken breast", "chicken thigh",
+    "ground beef", "beef chuck", "pork shoulder", "bacon", "salmon", "shrimp", "tofu",
+    "rice", "basmati rice", "pasta", "spaghetti", "penne", "bread crumbs", "parmesan",
+    "cheddar", "mozzarella", "feta", "yogurt", "lemon", "lemon juice", "lime", "orange",
+    "apple", "banana", "blueberries", "strawberries", "spinach", "kale", "lettuce",
+    "cucumber", "zucchini", "eggplant", "mushroom", "broccoli", "cauliflower", "peas",
+    "corn", "black beans", "chickpeas", "lentils", "basil", "parsley", "cilantro",
+    "thyme", "rosemary", "oregano", "cumin", "paprika", "chili powder", "cinnamon",
+    "nutmeg", "ginger", "soy sauce", "honey", "maple syrup", "vanilla extract",
+    "baking powder", "baking soda", "chicken broth", "vegetable broth", "coconut milk",
+    "walnuts", "almonds", "peanut butter", "dark chocolate", "cocoa powder",
+]
+MODIFIERS = [
+    "fresh", "dried", "chopped", "minced", "sliced", "diced", "grated", "ground",
+    "unsalted", "low-sodium", "organic", "frozen", "toasted", "smoked", "crushed",
+]
+UNITS = ["cup", "cups", "tbsp", "tsp", "g", "oz", "lb", "clove", "cloves", "pinch", None]
+QUANTITIES = ["1", "2", "3", "1/2", "1/4", "3/4", "1 1/2", "200", "400", None]
+DISHES = [
+    "soup", "stew", "salad", "pasta", "curry", "stir fry", "tacos", "casserole",
+    "risotto", "bread", "cake", "muffins", "pie", "skillet", "bowl", "roast",
+]
+ADJECTIVES = [
+    "easy", "classic", "spicy", "creamy", "roasted", "quick", "hearty", "lemony",
+    "garlicky", "smoky", "one-pot", "weeknight", "summer", "crispy",
+]
+
+# Search inputs used by every case
+TEXT_QUERIES = {"word": "chicken", "partial": "chick"}
+INGREDIENT_TERMS = ["garlic", "onion", "tomato"]
+PANTRY = ["garlic", "onion", "tomato", "olive oil", "salt", "black pepper", "pasta", "egg", "butter", "chicken breast"]
+
+
+# --- Corpus ------------------------------------------------------
+def synthetic_recipe(rng: random.Random, n: int, user_id: Optional[int], created_at: datetime) -> Dict:
+    """One recipe row in the shape recipe_importer.insert_recipes expects."""
+    names = rng.sample(BASE_INGREDIENTS, rng.randint(5, 15))
+    ingredients = [
+        {
+            "name": f"{rng.choice(MODIFIERS)} {name}" if rng.random() < 0.4 else name,
+            "quantity": rng.choice(QUANTITIES),
+            "unit": rng.choice(UNITS),
+        }
+        for name in names
+    ]
+    main = names[0]
+    steps = [
+        f"Step {i + 1}: prepare the {rng.choice(names)} and combine with the {rng.choice(names)}."
+        for i in range(rng.randint(4, 12))
+    ]
+    return {
+        "title": f"{rng.choice(ADJECTIVES).title()} {main.title()} {rng.choice(DISHES).title()}",
+        "description": f"A {rng.choice(ADJECTIVES)} {rng.choice(DISHES)} with {main} and {names[1]}.",
+        "ingredients": ingredients,
+        "instructions": "\n".join(steps),
+        "prep_time": rng.choice([5, 10, 15, 20, 30, None]),
+        "cook_time": rng.choice([10, 20, 30, 45, 60, 90, None]),
+        "servings": rng.choice([1, 2, 4, 6, 8, None]),
+        "source_url": None,
+        "external_id": f"bench:{n}",
+        "user_id": user_id,
+        "created_at": created_at,
+        "updated_at": created_at,
+    }
+
+
+def reset_database(engine) -> None:
+    if engine.dialect.name == "sqlite":
+        Base.metadata.drop_all(engine)
+        Base.metadata.create_all(engine)
+    else:
+        with engine.begin() as conn:
+            conn.execute(text("TRUNCATE users, recipes, recipe_ingredients RESTART IDENTITY CASCADE"))
+
+
+def load_corpus(SessionBench: sessionmaker, size: int, seed: int) -> int:
+    """Fill the database with `size` recipes; returns the bench user's id."""
+    rng = random.Random(seed)
+    with SessionBench() as db:
+        user = User(username="bench", email="bench@example.com", hash_password="x")
+        db.add(user)
+        db.commit()
+        user_id = user.id
+
+        # One recipe in five belongs to the bench user, the rest are defaults
+        start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        batch = []
+        for n in range(size):
+            owner = user_id if n % 5 == 0 else None
+            batch.append(synthetic_recipe(rng, n, owner, start + timedelta(minutes=n)))
+            if len(batch) == BATCH_SIZE:
+                insert_recipes(db, batch)
+                db.commit()
+                batch = []
+        if batch:
+            insert_recipes(db, batch)
+            db.commit()
+    return user_id
+
+
+# --- Timing ------------------------------------------------------
+def measure(kind: str, case: str, fn: Callable[[], object], repeat: int) -> Dict:
+    fn()  # warm up caches, statement compilation and the ingredient vocabulary
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    median = statistics.median(timings)
+    return {
+        "kind": kind,
+        "case": case,
+        "repeat": repeat,
+        "min_ms": round(timings[0] * 1000, 4),
+        "median_ms": round(median * 1000, 4),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))] * 1000, 4),
+        "mean_ms": round(statistics.fmean(timings) * 1000, 4),
+        "ops_per_sec": round(1 / median, 1) if median > 0 else None,
+    }
+
+
+def inner_cases(db: Session, r: redis.Redis, user_id: int) -> Dict[str, Callable[[], object]]:
+    page_rows = db.execute(
+        select(*recipe_service.response_columns()).order_by(Recipe.id).limit(100)
+    ).all()
+    page_recipes = db.scalars(select(Recipe).order_by(Recipe.id).limit(100)).all()
+
+    def session_miss():
+        sessions.local_cache.pop(BENCH_SID)
+        return sessions.load_session_user(r, BENCH_SID, db)
+
+    return {
+        "ingredient_index.matching_names": lambda: [
+            ingredient_index.matching_names(term) for term in INGREDIENT_TERMS
+        ],
+        "ingredient_search[any]": lambda: recipe_service.ingredient_search(
+            db, user_id, INGREDIENT_TERMS, False, 20, 0),
+        "ingredient_search[all]": lambda: recipe_service.ingredient_search(
+            db, user_id, INGREDIENT_TERMS, True, 20, 0),
+        "pantry_search[10]": lambda: recipe_service.pantry_search(db, user_id, PANTRY, 20),
+        "suggest[to]": lambda: recipe_service.suggest(db, user_id, "to", 10),
+        **{
+            f"search_page[{name}]": (lambda q=q: recipe_service.search_page(db, user_id, q, 20))
+            for name, q in TEXT_QUERIES.items()
+        },
+        "list_page[100]": lambda: recipe_service.list_page(db, user_id, 100),
+        "list_page[100,summary]": lambda: recipe_service.list_page(db, user_id, 100, summary=True),
+        "serialize[100,fast_json]": lambda: fast_json.dumps(recipe_service.dump_rows(page_rows)),
+        "serialize[100,pydantic]": lambda: json.dumps(
+            [RecipeResponse.model_validate(recipe).model_dump(mode="json") for recipe in page_recipes],
+            ensure_ascii=False, separators=(",", ":"),
+        ),
+        "_get_production_user[cached]": lambda: _get_production_user(BENCH_SID, r, db),
+        "_get_production_user[redis]": session_miss,
+    }
+
+
+def endpoint_cases(client: TestClient, recipe_id: int) -> Dict[str, Callable[[], object]]:
+    def get(url: str, **params):
+        return lambda: client.get(url, params=params).raise_for_status()
+
+    return {
+        "GET /api/recipes?limit=20": get("/api/recipes", limit=20),
+        "GET /api/recipes?limit=100": get("/api/recipes", limit=100),
+        "GET /api/recipes?limit=100&summary=true": get("/api/recipes", limit=100, summary="true"),
+        **{
+            f"GET /api/recipes/search[{name}]": get("/api/recipes/search", q=q)
+            for name, q in TEXT_QUERIES.items()
+        },
+        "POST /api/recipes/search/ingredients": lambda: client.post(
+            "/api/recipes/search/ingredients",
+            json={"ingredients": INGREDIENT_TERMS, "match_all": False, "limit": 20},
+        ).raise_for_status(),
+        "GET /api/recipes/autocomplete": get("/api/recipes/autocomplete", q="chi"),
+        "POST /api/recipes/pantry": lambda: client.post(
+            "/api/recipes/pantry", json={"ingredients": PANTRY, "limit": 20},
+        ).raise_for_status(),
+        "GET /api/recipes/{id}": get(f"/api/recipes/{recipe_id}"),
+        "GET /api/recipes/batch[20]": get(
+            "/api/recipes/batch", ids=",".join(str(recipe_id - n) for n in range(20))),
+        "GET /api/recipes/export": get("/api/recipes/export"),
+        "GET /api/recipes/export?gzip=true": get("/api/recipes/export", gzip="true"),
+    }
+
+
+def bench_app(SessionBench: sessionmaker) -> FastAPI:
+    """The recipe routes on the benchmark database, without main.py's lifespan."""
+    app = FastAPI()
+    app.include_router(recipes_router)
+
+    def get_bench_db():
+        db = SessionBench()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = get_bench_db
+    app.dependency_overrides[get_read_db] = get_bench_db
+    app.dependency_overrides[get_read_session_factory] = lambda: SessionBench
+    return app
+
+
+def run_size(engine, r: redis.Redis, size: int, args) -> List[Dict]:
+    SessionBench = sessionmaker(bind=engine, autoflush=False)
+    reset_database(engine)
+    r.flushdb()
+    ingredient_index.reset()
+    default_recipe_store.reset()
+    pantry_matcher.reset()
+    autocomplete.reset()
+    sessions.local_cache.pop(BENCH_SID)
+
+    started = time.perf_counter()
+    user_id = load_corpus(SessionBench, size, args.seed)
+    print(f"\n{size} recipes loaded in {time.perf_counter() - started:.1f} s")
+
+    results = []
+    with SessionBench() as db:
+        sessions.create_session(r, BENCH_SID, db.get(User, user_id))
+        recipe_id = db.scalar(select(Recipe.id).order_by(Recipe.id.desc()).limit(1))
+        for case, fn in inner_cases(db, r, user_id).items():
+            results.append(measure("inner", case, fn, args.repeat))
+
+    set_redis_client(r)
+    client = TestClient(bench_app(SessionBench), cookies={"SID": BENCH_SID})
+    cache_enabled = recipe_cache.RECIPE_CACHE_ENABLED
+    try:
+        recipe_cache.RECIPE_CACHE_ENABLED = False
+        for case, fn in endpoint_cases(client, recipe_id).items():
+            results.append(measure("endpoint", case, fn, args.repeat))
+        recipe_cache.RECIPE_CACHE_ENABLED = True
+        results.append(measure("endpoint", "GET /api/recipes?limit=100 (cached)",
+                               endpoint_cases(client, recipe_id)["GET /api/recipes?limit=100"],
+                               args.repeat))
+    finally:
+        recipe_cache.RECIPE_CACHE_ENABLED = cache_enabled
+        set_redis_client(None)
+
+    for result in results:
+        result["size"] = size
+        print(f"  {result['kind']:>8}  {result['case']:<45} "
+              f"median {result['median_ms']:>10.3f} ms  p95 {result['p95_ms']:>10.3f} ms")
+    return results
+
+
+# --- Environment and comparison -----------------------------------
+def connect_redis(url: Optional[str]) -> redis.Redis:
+    if url:
+        return redis.from_url(url, decode_responses=True)
+    try:
+        import fakeredis
+    except ImportError:
+        raise SystemExit("fakeredis is not installed; pip install -r benchmarks/requirements.txt or pass --redis-url")
+    return fakeredis.FakeRedis(decode_responses=True)
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(previous_path: str, results: List[Dict]) -> None:
+    """Print the median change of every case also present in a previous run."""
+    with open(previous_path, "r", encoding="utf-8") as f:
+        previous = json.load(f)
+    before = {(res["size"], res["kind"], res["case"]): res["median_ms"] for res in previous["results"]}
+    print(f"\nCompared with {previous_path} (commit {previous.get('environment', {}).get('commit')}):")
+    for result in results:
+        old = before.get((result["size"], result["kind"], result["case"]))
+        if not old:
+            continue
+        change = (result["median_ms"] - old) / old * 100
+        print(f"  {result['size']:>7}  {result['case']:<45} "
+              f"{old:>10.3f} -> {result['median_ms']:>10.3f} ms  ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--database-url", help="scratch database (default: temporary SQLite file)")
+    parser.add_argument("--redis-url", help="Redis to use (default: fakeredis)")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--compare", help="previous --json output to compare against")
+    args = parser.parse_args()
+
+    tmpdir = None
+    database_url = args.database_url
+    if not database_url:
+        tmpdir = tempfile.TemporaryDirectory()
+        database_url = f"sqlite:///{os.path.join(tmpdir.name, 'bench.db')}"
+    connect_args = {"check_same_thread": False} if database_url.startswith("sqlite") else {}
+    engine = create_engine(database_url, connect_args=connect_args)
+    r = connect_redis(args.redis_url)
+
+    try:
+        results = []
+        for size in args.sizes:
+            results += run_size(engine, r, size, args)
+    finally:
+        engine.dispose()
+        if tmpdir is not None:
+            tmpdir.cleanup()
+
+    if args.compare:
+        compare(args.compare, results)
+    if args.json:
+        environment = {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": engine.dialect.name,
+            "redis": "redis" if args.redis_url else "fakeredis",
+        }
+        with open(args.json, "w") as f:
+            json.dump({"benchmark": "hot_paths", "args": vars(args), "environment": environment,
+                       "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Mixed login + read throughput, with bcrypt inline vs. in the password pool.
+
+Models the sync request path: a fixed-size request threadpool (Starlette's
+default is 40 threads) serves a stream of login requests (bcrypt verify)
+and recipe read requests (a short simulated DB wait plus serialization of
+one recipe). Closed-loop clients keep both streams busy; the benchmark
+reports read and login throughput and read latency for each mode.
+
+Usage (from backend/):
+    python -m benchmarks.bench_login_mix [--duration 10] [--login-clients 80]
+        [--read-clients 20] [--threads 40] [--json results.json]
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from fastapi import HTTPException
+
+import helper
+from models.schemas import RecipeResponse
+from password_pool import PasswordPool
+from config import BCRYPT_POOL_WORKERS, BCRYPT_POOL_MAX_PENDING
+
+PASSWORD = "correct horse battery staple"
+
+SAMPLE_RECIPE = {
+    "id": 1,
+    "title": "Roasted Tomato Soup",
+    "description": "A simple soup.",
+    "ingredients": [{"name": f"ingredient {i}", "quantity": "1", "unit": "cup"} for i in range(12)],
+    "instructions": "Roast. Blend. Serve.\n" * 10,
+    "prep_time": 10,
+    "cook_time": 40,
+    "servings": 4,
+    "source_url": None,
+    "user_id": None,
+    "created_at": datetime(2024, 1, 1, tzinfo=timezone.utc),
+    "updated_at": datetime(2024, 1, 1, tzinfo=timezone.utc),
+}
+
+
+def read_request() -> None:
+    time.sleep(0.002)  # database round trip
+    json.dumps(RecipeResponse.model_validate(SAMPLE_RECIPE).model_dump(mode="json"))
+
+
+def run_mode(name, login_fn, args) -> dict:
+    request_pool = ThreadPoolExecutor(max_workers=args.threads)
+    stop = threading.Event()
+    lock = threading.Lock()
+    read_latencies = []
+    counts = {"logins": 0, "logins_rejected": 0}
+
+    def login_client():
+        while not stop.is_set():
+            try:
+                request_pool.submit(login_fn).result()
+                key = "logins"
+            except HTTPException:
+                key = "logins_rejected"
+            with lock:
+                counts[key] += 1
+            if key == "logins_rejected":
+                time.sleep(0.05)  # client backs off before retrying
+
+    def read_client():
+        while not stop.is_set():
+            started = time.perf_counter()
+            request_pool.submit(read_request).result()
+            with lock:
+                read_latencies.append(time.perf_counter() - started)
+
+    clients = [threading.Thread(target=login_client) for _ in range(args.login_clients)]
+    clients += [threading.Thread(target=read_client) for _ in range(args.read_clients)]
+    for client in clients:
+        client.start()
+    time.sleep(args.duration)
+    stop.set()
+    for client in clients:
+        client.join()
+    request_pool.shutdown()
+
+    read_latencies.sort()
+    result = {
+        "mode": name,
+        "reads_per_sec": round(len(read_latencies) / args.duration, 1),
+        "read_p50_ms": round(statistics.median(read_latencies) * 1000, 2) if read_latencies else None,
+        "read_p99_ms": round(read_latencies[int(len(read_latencies) * 0.99)] * 1000, 2) if read_latencies else None,
+        "logins_per_sec": round(counts["logins"] / args.duration, 1),
+        "logins_rejected_per_sec": round(counts["logins_rejected"] / args.duration, 1),
+    }
+    print(
+        f"{name:>7}: {result['reads_per_sec']:>8} reads/s "
+        f"(p50 {result['read_p50_ms']} ms, p99 {result['read_p99_ms']} ms), "
+        f"{result['logins_per_sec']} logins/s, {result['logins_rejected_per_sec']} rejected/s"
+    )
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--login-clients", type=int, default=80)
+    parser.add_argument("--read-clients", type=int, default=20)
+    parser.add_argument("--threads", type=int, default=40)
+    parser.add_argument("--workers", type=int, default=max(1, BCRYPT_POOL_WORKERS))
+    parser.add_argument("--max-pending", type=int, default=BCRYPT_POOL_MAX_PENDING)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    hashed = helper.hash_password(PASSWORD)
+    results = [run_mode("inline", lambda: helper.verify_password(PASSWORD, hashed), args)]
+
+    pool = PasswordPool(workers=args.workers, max_pending=args.max_pending)
+    pool.start()
+    pool.verify_password(PASSWORD, hashed)  # warm up the worker processes
+    try:
+        results.append(run_mode("pool", lambda: pool.verify_password(PASSWORD, hashed), args))
+    finally:
+        pool.shutdown()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"benchmark": "login_mix", "args": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Engine construction from config, with instrumented connection pools.
+
+Every engine gets the pool size, overflow, timeout, recycle and pre-ping
+settings from config, plus a server-side statement_timeout on PostgreSQL.
+Its pool records how long checkouts wait for a connection and how often
+they time out. Together with the pool's own counters this gives
+saturation stats, served by /db/stats and /metrics.
+"""
+import threading
+import time
+from typing import Dict
+
+from sqlalchemy import create_engine as sa_create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine as sa_create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from config import (
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE,
+    DB_POOL_PRE_PING,
+    DB_STATEMENT_TIMEOUT_MS,
+)
+
+
+class PoolStats:
+    """Checkout counters of one pool (name: "primary", "replica", ...)."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.pool = None
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def record(self, waited: float, timed_out: bool) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+    def as_dict(self) -> Dict[str, float]:
+        pool = self.pool
+        capacity = pool.size() + max(pool._max_overflow, 0)
+        checked_out = pool.checkedout()
+        return {
+            "size": pool.size(),
+            "max_overflow": pool._max_overflow,
+            "checked_out": checked_out,
+            "idle": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "saturation": round(checked_out / capacity, 4) if capacity else 0.0,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_seconds_total": round(self.wait_seconds, 6),
+            "max_wait_seconds": round(self.max_wait_seconds, 6),
+        }
+
+
+# Every pool built by this module, by name
+pools: Dict[str, PoolStats] = {}
+
+
+class _TimedPoolMixin:
+    stats: PoolStats
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.stats.record(time.perf_counter() - started, timed_out=True)
+            raise
+        self.stats.record(time.perf_counter() - started, timed_out=False)
+        return connection
+
+    def recreate(self):
+        # dispose() and invalidation build a fresh pool; keep reporting it
+        pool = super().recreate()
+        pool.stats = self.stats
+        self.stats.pool = pool
+        return pool
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def _engine_options(url: str, pool_class, statement_timeout_args) -> dict:
+    options = {}
+    if not url.startswith("sqlite"):
+        options.update(
+            poolclass=pool_class,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+        )
+    options["pool_pre_ping"] = DB_POOL_PRE_PING
+    if DB_STATEMENT_TIMEOUT_MS > 0 and url.startswith("postgresql"):
+        options["connect_args"] = statement_timeout_args
+    return options
+
+
+def _register(name: str, engine):
+    pool = engine.pool if not hasattr(engine, "sync_engine") else engine.sync_engine.pool
+    if isinstance(pool, _TimedPoolMixin):
+        stats = PoolStats(name)
+        stats.pool = pool
+        pool.stats = stats
+        pools[name] = stats
+    return engine
+
+
+def create_engine(name: str, url: str):
+    """A sync Engine for `url` with the configured pool, registered as `name`."""
+    options = _engine_options(url, TimedQueuePool, {
+        # psycopg2: libpq startup option
+        "options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}",
+    })
+    return _register(name, sa_create_engine(url, future=True, **options))
+
+
+def create_async_engine(name: str, url: str):
+    """An AsyncEngine for `url` with the configured pool, registered as `name`."""
+    options = _engine_options(url, TimedAsyncQueuePool, {
+        # asyncpg: session settings sent at connect
+        "server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)},
+    })
+    return _register(name, sa_create_async_engine(url, **options))
+
+
+def stats() -> Dict[str, Dict[str, float]]:
+    """Stats of every registered pool, by name."""
+    return {name: pool_stats.as_dict() for name, pool_stats in pools.items()}
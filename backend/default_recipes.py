@@ -0,0 +1,222 @@
+"""
+Shared in-process snapshot of the default recipes (user_id IS NULL).
+
+Every user sees the default recipes, and for most users they are nearly
+the whole result of a list or ingredient search. The snapshot keeps them
+in memory as immutable rows, newest first, with lookups by id and by
+ingredient name, so those queries only read the user's own rows from the
+database and merge them with the snapshot.
+
+A snapshot is rebuilt only when the default recipes change:
+- recipe_cache.make_key reports the Redis default version that the
+  importer bumps (observe_version). A new version triggers a rebuild
+  before the request is served, so a response cached under that version
+  never comes from an older snapshot;
+- every DEFAULT_SNAPSHOT_CHECK_SECONDS a one-row signature query (count,
+  max id, max updated_at) catches changes made without a version bump,
+  and covers the case where the response cache is off.
+
+More than DEFAULT_SNAPSHOT_MAX_RECIPES default recipes disables the
+snapshot; callers then fall back to the plain SQL path.
+
+A rebuild is single-flight and runs its queries without holding a lock
+that readers wait on: in ASYNC_MODE it runs on the event-loop thread
+(through run_sync), where a blocked reader would stall the loop and the
+rebuild's own I/O with it. Requests arriving during a rebuild take the
+SQL path instead, and the finished snapshot is swapped in atomically.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from config import (
+    DEFAULT_SNAPSHOT_ENABLED,
+    DEFAULT_SNAPSHOT_CHECK_SECONDS,
+    DEFAULT_SNAPSHOT_MAX_RECIPES,
+)
+from database import Recipe, RecipeIngredient
+from ingredient_canonical import canonical_name
+from ingredient_matcher import NameMatcher
+from models.schemas import RecipeResponse
+
+logger = logging.getLogger(__name__)
+
+
+class DefaultRecipeSnapshot:
+    """
+    Immutable set of default recipe rows (tuples of `fields`), ordered by
+    (created_at, id) ascending, with lookups by id and ingredient name.
+    """
+
+    def __init__(self, fields: Sequence[str], rows: Sequence, ingredient_rows: Sequence,
+                 version: Optional[str], signature: Tuple):
+        self.fields = tuple(fields)
+        self.version = version
+        self.signature = signature
+        self.rows = tuple(rows)
+        self.keys = [(row.created_at, row.id) for row in self.rows]
+        self.by_id: Dict[int, object] = {row.id: row for row in self.rows}
+
+        # ingredient name -> positions (in self.rows) of the recipes using it
+        position = {row.id: i for i, row in enumerate(self.rows)}
+        postings: Dict[str, set] = {}
+        canonical: Dict[str, set] = {}
+        for recipe_id, name, canonical_form in ingredient_rows:
+            if recipe_id in position:
+                postings.setdefault(name, set()).add(position[recipe_id])
+                if canonical_form is not None:
+                    canonical.setdefault(canonical_form, set()).add(position[recipe_id])
+        self.postings: Dict[str, frozenset] = {
+            name: frozenset(positions) for name, positions in postings.items()
+        }
+        # canonical name -> positions, for exact searches
+        self.canonical_postings: Dict[str, frozenset] = {
+            name: frozenset(positions) for name, positions in canonical.items()
+        }
+        self.names = NameMatcher(self.postings)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def get(self, recipe_id: int):
+        return self.by_id.get(recipe_id)
+
+    def newest(self, count: int, after: Optional[Tuple] = None) -> List:
+        """Up to `count` rows newest first, strictly before the (created_at, id) key `after`."""
+        end = len(self.rows) if after is None else bisect_left(self.keys, tuple(after))
+        return list(reversed(self.rows[max(0, end - count):end]))
+
+    def ingredient_matches(self, search_ingredients: List[str], match_all: bool, count: int,
+                           exact: bool = False) -> List[Tuple]:
+        """
+        Up to `count` (match_count, row) pairs, ranked like
+        IngredientIndex.search_query: matched terms, then newest first.
+        """
+        matched = Counter()
+        for search_ing in search_ingredients:
+            if exact:
+                positions = self.canonical_postings.get(canonical_name(search_ing), frozenset())
+            else:
+                positions = set()
+                for name in self.names.matching(search_ing):
+                    positions.update(self.postings[name])
+            matched.update(positions)
+
+        required = len(search_ingredients) if match_all else 1
+        ranked = sorted(
+            ((matches, self.keys[i], i) for i, matches in matched.items() if matches >= required),
+            reverse=True,
+        )
+        return [(matches, self.rows[i]) for matches, _, i in ranked[:count]]
+
+
+class DefaultRecipeStore:
+    """Holds the current snapshot and rebuilds it when the defaults change."""
+
+    def __init__(self, fields: Sequence[str]):
+        self.fields = tuple(fields)
+        self._lock = threading.Lock()  # guards swaps only, never held during queries
+        self._rebuild_lock = threading.Lock()  # single-flight rebuild, only acquired without blocking
+        self._generation = 0  # bumped by reset(), so an older rebuild is not installed
+        self._snapshot: Optional[DefaultRecipeSnapshot] = None
+        self._disabled_signature: Optional[Tuple] = None
+        self._checked_at = 0.0
+        self._observed_version: Optional[str] = None
+
+    def reset(self) -> None:
+        """Drop the snapshot, e.g. after the recipes table was rebuilt; the next get() reloads it."""
+        with self._lock:
+            self._snapshot, self._disabled_signature = None, None
+            self._checked_at = 0.0
+            self._generation += 1
+
+    def observe_version(self, version) -> None:
+        """Record the latest default version seen in Redis (None when unset)."""
+        self._observed_version = str(version or 0)
+
+    def _signature(self, db: Session) -> Tuple:
+        return tuple(db.execute(
+            select(func.count(), func.max(Recipe.id), func.max(Recipe.updated_at))
+            .where(Recipe.user_id.is_(None))
+        ).one())
+
+    def _is_current(self, snapshot: Optional[DefaultRecipeSnapshot], db: Session) -> bool:
+        observed = self._observed_version
+        if snapshot is not None and observed is not None and snapshot.version != observed:
+            return False
+        if time.monotonic() - self._checked_at < DEFAULT_SNAPSHOT_CHECK_SECONDS:
+            return True
+        signature = self._signature(db)
+        self._checked_at = time.monotonic()
+        if snapshot is None:
+            return signature == self._disabled_signature
+        return signature == snapshot.signature
+
+    def get(self, db: Session) -> Optional[DefaultRecipeSnapshot]:
+        """
+        The current snapshot, rebuilt first if the defaults changed. None
+        when snapshots are disabled, there are too many default recipes, or
+        another request is rebuilding it.
+        """
+        if not DEFAULT_SNAPSHOT_ENABLED:
+            return None
+        snapshot = self._snapshot
+        if (snapshot is not None or self._disabled_signature is not None) and self._is_current(snapshot, db):
+            return snapshot
+        if not self._rebuild_lock.acquire(blocking=False):
+            return None
+        try:
+            # Another request may have rebuilt it since we looked
+            if self._snapshot is not snapshot:
+                return self._snapshot
+            return self._rebuild(db)
+        finally:
+            self._rebuild_lock.release()
+
+    def _install(self, generation: int, snapshot: Optional[DefaultRecipeSnapshot],
+                 disabled_signature: Optional[Tuple]) -> None:
+        with self._lock:
+            if self._generation == generation:
+                self._snapshot, self._disabled_signature = snapshot, disabled_signature
+
+    def _rebuild(self, db: Session) -> Optional[DefaultRecipeSnapshot]:
+        generation = self._generation
+        version = self._observed_version
+        signature = self._signature(db)
+        self._checked_at = time.monotonic()
+        if signature[0] > DEFAULT_SNAPSHOT_MAX_RECIPES:
+            if self._disabled_signature is None:
+                logger.warning(
+                    "%s default recipes exceed DEFAULT_SNAPSHOT_MAX_RECIPES=%s; not snapshotting them",
+                    signature[0], DEFAULT_SNAPSHOT_MAX_RECIPES,
+                )
+            self._install(generation, None, signature)
+            return None
+
+        started = time.perf_counter()
+        rows = db.execute(
+            select(*(getattr(Recipe, name) for name in self.fields))
+            .where(Recipe.user_id.is_(None))
+            .order_by(Recipe.created_at, Recipe.id)
+        ).all()
+        ingredient_rows = db.execute(
+            select(RecipeIngredient.recipe_id, RecipeIngredient.ingredient_name,
+                   RecipeIngredient.canonical_name)
+            .join(Recipe, Recipe.id == RecipeIngredient.recipe_id)
+            .where(Recipe.user_id.is_(None))
+        ).all()
+        snapshot = DefaultRecipeSnapshot(self.fields, rows, ingredient_rows, version, signature)
+        self._install(generation, snapshot, None)
+        logger.info("Default recipe snapshot: %s recipes loaded in %.1f ms",
+                    len(snapshot), (time.perf_counter() - started) * 1000)
+        return snapshot
+
+
+# RecipeResponse rows (the same fields as recipe_service.RESPONSE_FIELDS)
+default_recipe_store = DefaultRecipeStore(tuple(RecipeResponse.model_fields))
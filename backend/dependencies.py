@@ -1,15 +1,25 @@
 import redis
+import redis.asyncio as aioredis
+import logging
 from typing import Optional
 from fastapi import HTTPException, Cookie, Depends
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from config import REDIS_URL, DEV_MODE
-from database import User, get_db
+from config import REDIS_URL, DEV_MODE, REPLICA_READ_AFTER_WRITE_SECONDS
+from database import (
+    User, get_db, get_async_db, engine, read_engine, async_engine, async_read_engine,
+    SessionLocal, ReadSessionLocal, AsyncSessionLocal, AsyncReadSessionLocal,
+)
 from models.schemas import User_out
 from helper import hash_password
+from sessions import load_session_user, load_session_user_async
 
-# Global Redis client instance
+logger = logging.getLogger(__name__)
+
+# Global Redis client instances (the async one is only set in ASYNC_MODE)
 redis_client: redis.Redis | None = None
+async_redis_client: aioredis.Redis | None = None
 
 def get_redis() -> redis.Redis:
     """
@@ -26,6 +36,20 @@ def set_redis_client(client: redis.Redis | None) -> None:
     global redis_client
     redis_client = client
 
+def get_async_redis() -> aioredis.Redis:
+    """
+    Dependency function to get the async Redis client (ASYNC_MODE).
+    """
+    assert async_redis_client is not None, "Async Redis not initialized"
+    return async_redis_client
+
+def set_async_redis_client(client: aioredis.Redis | None) -> None:
+    """
+    Set the global async Redis client. Used by lifespan in main.py.
+    """
+    global async_redis_client
+    async_redis_client = client
+
 def _get_production_user(
     SID: Optional[str] = Cookie(None),
     r: redis.Redis = Depends(get_redis),
@@ -39,26 +63,8 @@ def _get_production_user(
     if not SID:
         raise HTTPException(status_code=401, detail="Not authenticated")
     
-    # Validate SID exists in Redis
-    user_id_str = r.get(SID)
-    if not user_id_str:
-        raise HTTPException(status_code=401, detail="Invalid or expired session")
-    
-    # Convert user ID from string to int (Redis stores as string)
-    try:
-        user_id = int(user_id_str)
-    except (ValueError, TypeError):
-        raise HTTPException(status_code=401, detail="Invalid session data")
-    
-    # Query database for user by ID
-    query = select(User).where(User.id == user_id)
-    user = db.scalar(query)
-    
-    # Check if user exists
-    if not user:
-        raise HTTPException(status_code=401, detail="User not found")
-    
-    return user
+    # Resolve the session from the local cache or its Redis hash
+    return load_session_user(r, SID, db)
 
 def _get_dev_user(db: Session) -> User:
     """Internal: Get or create a dev user for development mode."""
@@ -95,4 +101,118 @@ def get_current_user(
     if DEV_MODE:
         return _get_dev_user(db)
     else:
-        return _get_production_user(SID, r, db)
\ No newline at end of file
+        return _get_production_user(SID, r, db)
+
+async def _get_production_user_async(
+    SID: Optional[str],
+    r: aioredis.Redis,
+    db: AsyncSession
+) -> User:
+    """Async version of _get_production_user."""
+    if not SID:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+
+    return await load_session_user_async(r, SID, db)
+
+async def get_current_user_async(
+    SID: Optional[str] = Cookie(None),
+    r: aioredis.Redis = Depends(get_async_redis),
+    db: AsyncSession = Depends(get_async_db)
+) -> User:
+    """
+    Async version of get_current_user, for the ASYNC_MODE routers.
+    """
+    if DEV_MODE:
+        return await db.run_sync(_get_dev_user)
+    else:
+        return await _get_production_user_async(SID, r, db)
+
+# --- Read replica routing ---------------------------------------
+def _recent_write_key(user_id: int) -> str:
+    return f"db:recent_write:user:{user_id}"
+
+def mark_recent_write(r: redis.Redis, user_id: int) -> None:
+    """
+    Keep a user's reads on the primary for REPLICA_READ_AFTER_WRITE_SECONDS
+    after they write, so they (and the recipe cache) never see replica lag.
+    """
+    if read_engine is engine:
+        return
+    try:
+        r.set(_recent_write_key(user_id), 1, ex=REPLICA_READ_AFTER_WRITE_SECONDS)
+    except redis.RedisError:
+        logger.warning("Could not mark recent write for user %s", user_id, exc_info=True)
+
+def read_session_factory(r: redis.Redis, user_id: int):
+    """
+    Where a user's reads go: the read replica, or the primary when there
+    is no replica or the user wrote recently.
+    """
+    if read_engine is engine:
+        return ReadSessionLocal
+    try:
+        if r.exists(_recent_write_key(user_id)):
+            return SessionLocal
+    except redis.RedisError:
+        return SessionLocal
+    return ReadSessionLocal
+
+def get_read_session_factory(
+    current_user: User = Depends(get_current_user),
+    r: redis.Redis = Depends(get_redis)
+):
+    """
+    Dependency for routes that open their own read session, such as a
+    streamed response, which outlives the request's session.
+    """
+    return read_session_factory(r, current_user.id)
+
+def get_read_db(
+    current_user: User = Depends(get_current_user),
+    r: redis.Redis = Depends(get_redis)
+) -> Session:
+    """
+    Dependency for SELECT-only routes: a session from read_session_factory.
+    """
+    db = read_session_factory(r, current_user.id)()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def mark_recent_write_async(r: aioredis.Redis, user_id: int) -> None:
+    """Async version of mark_recent_write."""
+    if async_read_engine is async_engine:
+        return
+    try:
+        await r.set(_recent_write_key(user_id), 1, ex=REPLICA_READ_AFTER_WRITE_SECONDS)
+    except redis.RedisError:
+        logger.warning("Could not mark recent write for user %s", user_id, exc_info=True)
+
+async def read_session_factory_async(r: aioredis.Redis, user_id: int):
+    """Async version of read_session_factory."""
+    assert AsyncReadSessionLocal is not None, "Async database not enabled (set ASYNC_MODE=true)"
+    if async_read_engine is async_engine:
+        return AsyncReadSessionLocal
+    try:
+        if await r.exists(_recent_write_key(user_id)):
+            return AsyncSessionLocal
+    except redis.RedisError:
+        return AsyncSessionLocal
+    return AsyncReadSessionLocal
+
+async def get_async_read_session_factory(
+    current_user: User = Depends(get_current_user_async),
+    r: aioredis.Redis = Depends(get_async_redis)
+):
+    """Async version of get_read_session_factory."""
+    return await read_session_factory_async(r, current_user.id)
+
+async def get_async_read_db(
+    current_user: User = Depends(get_current_user_async),
+    r: aioredis.Redis = Depends(get_async_redis)
+) -> AsyncSession:
+    """Async version of get_read_db."""
+    session_factory = await read_session_factory_async(r, current_user.id)
+    async with session_factory() as db:
+        yield db
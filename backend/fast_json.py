@@ -0,0 +1,52 @@
+"""
+orjson encoder for recipe payloads, byte-identical to FastAPI's default
+JSONResponse output (pydantic JSON-mode dump, then json.dumps with
+ensure_ascii=False and compact separators).
+
+orjson already matches the stdlib for strings, ints, bools and null, and
+with OPT_UTC_Z formats datetimes the way pydantic does. The differences
+are floats (orjson writes 1e16 where json writes 1e+16) and ints wider
+than 64 bits, which orjson rejects. Neither can appear in a typed column,
+so only free-form JSON values, such as a recipe's ingredients, pass
+through `json_value`. That pre-renders such numbers as raw fragments.
+"""
+from typing import Any
+
+import orjson
+
+OPTIONS = orjson.OPT_UTC_Z
+
+
+def json_value(value: Any) -> Any:
+    """
+    Prepare a parsed JSON value for `dumps`: floats and out-of-range ints
+    are replaced by fragments holding the stdlib's rendering.
+    """
+    value_type = type(value)
+    if value_type is float:
+        return orjson.Fragment(float.__repr__(value))
+    if value_type is int and not -2 ** 63 <= value < 2 ** 64:
+        return orjson.Fragment(int.__repr__(value))
+    if value_type is list:
+        return [json_value(item) for item in value]
+    if value_type is dict:
+        return {key: json_value(item) for key, item in value.items()}
+    return value
+
+
+def ingredients_value(ingredients: Any) -> Any:
+    """json_value for an ingredients list, skipping the walk for the usual all-string case."""
+    if type(ingredients) is not list:
+        return json_value(ingredients)
+    for ing in ingredients:
+        if type(ing) is not dict:
+            return json_value(ingredients)
+        for item in ing.values():
+            if type(item) is not str and item is not None:
+                return json_value(ingredients)
+    return ingredients
+
+
+def dumps(content: Any) -> str:
+    """Encode content exactly like FastAPI's default JSONResponse."""
+    return orjson.dumps(content, option=OPTIONS).decode("utf-8")
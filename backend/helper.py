@@ -3,7 +3,7 @@ from sqlalchemy import select
 from sqlalchemy.orm import Session
 from database import User
 from fastapi import Response
-from config import DEV_MODE
+from config import DEV_MODE, SESSION_TTL
 import uuid
 
 # Generate a Version 4 UUID
@@ -37,7 +37,7 @@ def set_auth_cookie(response: Response, session_id: str) -> None:
     response.set_cookie(
         key="SID",
         value=session_id,
-        max_age=60*60*24,  # 24 hours
+        max_age=SESSION_TTL,  # 24 hours by default
         path="/",
         samesite="lax" if DEV_MODE else "none",
         httponly=True,
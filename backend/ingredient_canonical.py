@@ -0,0 +1,126 @@
+"""
+Canonical ingredient names, computed once when a recipe is written.
+
+Free-text names such as "Tomatoes", "Roma tomato" and "tomato, diced"
+all describe the same ingredient. canonical_name() reduces them to one
+form ("tomato"), which is stored in recipe_ingredients.canonical_name
+next to the raw name, so an exact ingredient search is a plain indexed
+equality instead of two-way substring matching:
+
+1. lowercase; drop parenthesized text and everything after the first
+   comma ("tomato, diced" -> "tomato");
+2. split into words on anything that is not a letter, dropping numbers,
+   units and preparation/size words ("2 cups finely chopped onions");
+3. singularize each word ("tomatoes" -> "tomato", "berries" -> "berry");
+4. map synonyms and varieties, for the whole phrase first and then word
+   by word ("roma tomato" -> "tomato", "scallion" -> "green onion").
+
+A name made only of preparation words keeps them ("cloves" -> "clove");
+one without any letters keeps its lowercased, trimmed form.
+Changing any rule or list here changes stored values: run
+backfill_canonical_ingredients.py --all afterwards.
+"""
+import re
+
+_PARENTHESIZED = re.compile(r"\([^)]*\)")
+_WORD = re.compile(r"[a-z]+")
+
+# Preparation, size, freshness and unit words that do not change the ingredient
+PREP_WORDS = frozenset({
+    "chopped", "diced", "minced", "sliced", "grated", "shredded", "crushed", "cubed",
+    "julienned", "halved", "quartered", "peeled", "seeded", "pitted", "trimmed", "cored",
+    "mashed", "melted", "softened", "beaten", "whisked", "sifted", "drained", "rinsed",
+    "toasted", "roasted", "cooked", "uncooked", "boiled", "thawed", "frozen", "fresh",
+    "freshly", "finely", "roughly", "coarsely", "thinly", "thickly", "lightly", "firmly",
+    "packed", "large", "medium", "small", "extra", "whole", "ripe", "optional", "divided",
+    "room", "temperature", "to", "taste", "for", "garnish", "and", "or", "of", "a", "an",
+    "cup", "cups", "tablespoon", "tablespoons", "tbsp", "teaspoon", "teaspoons", "tsp",
+    "ounce", "ounces", "oz", "pound", "pounds", "lb", "lbs", "gram", "grams", "g", "kg",
+    "ml", "l", "pinch", "dash", "clove", "cloves", "can", "cans", "package", "pkg",
+})
+
+# Plurals the suffix rules below get wrong
+IRREGULAR_PLURALS = {
+    "leaves": "leaf",
+    "halves": "half",
+    "loaves": "loaf",
+    "knives": "knife",
+    "potatoes": "potato",
+    "tomatoes": "tomato",
+    "mangoes": "mango",
+    "cookies": "cookie",
+    "brownies": "brownie",
+    "chives": "chive",
+    "olives": "olive",
+    "cloves": "clove",
+}
+
+# Words ending in "s" that are not plurals
+NOT_PLURAL = frozenset({
+    "asparagus", "couscous", "hummus", "molasses", "swiss", "citrus", "hibiscus",
+    "octopus", "grits", "bass", "watercress", "lemongrass", "series",
+})
+
+# Synonyms and varieties, keyed by singularized phrase
+SYNONYMS = {
+    "roma tomato": "tomato",
+    "plum tomato": "tomato",
+    "vine tomato": "tomato",
+    "scallion": "green onion",
+    "spring onion": "green onion",
+    "garbanzo bean": "chickpea",
+    "garbanzo": "chickpea",
+    "cilantro": "coriander",
+    "coriander leaf": "coriander",
+    "courgette": "zucchini",
+    "aubergine": "eggplant",
+    "capsicum": "bell pepper",
+    "sweet pepper": "bell pepper",
+    "ground beef": "beef mince",
+    "minced beef": "beef mince",
+    "beef mince": "beef mince",
+    "powdered sugar": "icing sugar",
+    "confectioner sugar": "icing sugar",
+    "caster sugar": "superfine sugar",
+    "all purpose flour": "flour",
+    "plain flour": "flour",
+    "prawn": "shrimp",
+    "rocket": "arugula",
+    "maize": "corn",
+    "double cream": "heavy cream",
+    "heavy whipping cream": "heavy cream",
+    "evoo": "olive oil",
+    "extra virgin olive oil": "olive oil",
+    "virgin olive oil": "olive oil",
+}
+
+
+def singular(word: str) -> str:
+    """English singular of one lowercase word, by suffix rules."""
+    if word in IRREGULAR_PLURALS:
+        return IRREGULAR_PLURALS[word]
+    if len(word) <= 3 or word in NOT_PLURAL or word.endswith(("ss", "us", "is")):
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith(("ches", "shes", "xes", "zes", "sses", "oes")):
+        return word[:-2]
+    if word.endswith("s"):
+        return word[:-1]
+    return word
+
+
+def canonical_name(name: str) -> str:
+    """The canonical form of a free-text ingredient name (see the module docstring)."""
+    raw = (name or "").lower().strip()
+    text = _PARENTHESIZED.sub(" ", raw).split(",", 1)[0]
+    found = _WORD.findall(text)
+    # "cloves" alone is the spice: keep the words when nothing else is left
+    words = [singular(word) for word in found if word not in PREP_WORDS] or [singular(word) for word in found]
+    if not words:
+        return raw
+
+    phrase = " ".join(words)
+    if phrase in SYNONYMS:
+        return SYNONYMS[phrase]
+    return " ".join(SYNONYMS.get(word, word) for word in words)
@@ -0,0 +1,204 @@
+"""
+Ingredient search over the normalized recipe_ingredients table.
+
+A search term matches an ingredient when either lowercase string contains
+the other. That check runs in memory against the distinct ingredient
+names (the vocabulary, indexed by ingredient_matcher.NameMatcher), to
+resolve each term to the exact names it matches. The database then does
+the rest with the ingredient_name index: one `ingredient_name IN (...)`
+join, grouped per recipe, counting matched terms and returning the
+ranked page.
+
+An exact search skips the vocabulary: each term is canonicalized like
+the stored names (ingredient_canonical) and compared for equality with
+the canonical_name index.
+"""
+import operator
+import threading
+from functools import reduce
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Session
+
+from config import INDEX_SYNC_GAP_IDS
+from database import Recipe, RecipeIngredient
+from ingredient_canonical import canonical_name
+from ingredient_matcher import NameMatcher
+from recipe_search import visible_to
+from sync_cursor import SyncCursor
+
+
+def ingredient_names(ingredients) -> List[str]:
+    """
+    Extract lowercase ingredient names from a recipe's ingredients JSON.
+    Handles both dict ({"name": ...}) and plain string entries.
+    """
+    names = []
+    for ing in ingredients or []:
+        if isinstance(ing, dict):
+            name = (ing.get("name") or "").lower()
+        elif isinstance(ing, str):
+            name = ing.lower()
+        else:
+            continue
+        names.append(name)
+    return names
+
+
+def ingredient_rows(recipe_id: int, ingredients) -> List[Dict]:
+    """
+    recipe_ingredients rows for a recipe's ingredients JSON, one per entry,
+    with the same lowercase names as ingredient_names() and their
+    canonical forms.
+    """
+    rows = []
+    for ing in ingredients or []:
+        if isinstance(ing, dict):
+            name = (ing.get("name") or "").lower()
+            quantity, unit = ing.get("quantity"), ing.get("unit")
+        elif isinstance(ing, str):
+            name, quantity, unit = ing.lower(), None, None
+        else:
+            continue
+        rows.append({"recipe_id": recipe_id, "ingredient_name": name,
+                     "canonical_name": canonical_name(name),
+                     "quantity": quantity, "unit": unit})
+    return rows
+
+
+class IngredientIndex:
+    """
+    Per-process vocabulary of the distinct ingredient names in
+    recipe_ingredients, kept current incrementally by row id (SyncCursor).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._names = NameMatcher()
+        self._cursor = SyncCursor()
+
+    def reset(self) -> None:
+        """Forget the vocabulary, e.g. after recipe_ingredients was rebuilt; the next sync reloads it."""
+        with self._lock:
+            self._names = NameMatcher()
+            self._cursor = SyncCursor()
+
+    def resync(self, db: Session) -> None:
+        """Rebuild the vocabulary from scratch and swap it in; lookups keep using the old one meanwhile."""
+        fresh = IngredientIndex()
+        fresh.sync(db)
+        with self._lock:
+            self._names, self._cursor = fresh._names, fresh._cursor
+
+    def add_names(self, names) -> None:
+        """Add names written by this process (other writers are picked up by sync)."""
+        with self._lock:
+            self._names.add(names)
+
+    def sync(self, db: Session) -> None:
+        """
+        Catch up with ingredient rows written since the last sync (by other
+        workers, the importer, or before this process started). Rows are
+        append-only, so only rows the cursor has not read are fetched; the
+        first sync reads just the distinct names, plus the recent ids the
+        cursor needs to track gaps.
+        """
+        with self._lock:
+            cursor = self._cursor
+            unread = cursor.unread(RecipeIngredient.id)
+        if cursor.max_id == 0:
+            max_id = db.scalar(select(func.max(RecipeIngredient.id)))
+            if max_id is None:
+                return
+            names = db.scalars(
+                select(RecipeIngredient.ingredient_name)
+                .where(RecipeIngredient.id <= max_id)
+                .distinct()
+            ).all()
+            ids = db.scalars(
+                select(RecipeIngredient.id)
+                .where(RecipeIngredient.id > max_id - INDEX_SYNC_GAP_IDS, RecipeIngredient.id <= max_id)
+            ).all()
+        else:
+            rows = db.execute(
+                select(RecipeIngredient.id, RecipeIngredient.ingredient_name)
+                .where(unread)
+            ).all()
+            if not rows and not cursor.gaps:
+                return
+            ids = [row_id for row_id, _ in rows]
+            names = [name for _, name in rows]
+        with self._lock:
+            if self._cursor is not cursor:
+                return  # reset or resync meanwhile
+            self._names.add(names)
+            cursor.advance(ids)
+
+    def matching_names(self, search_ing: str) -> List[str]:
+        """Vocabulary names that contain, or are contained in, `search_ing`."""
+        with self._lock:
+            return sorted(self._names.matching(search_ing))
+
+    def search_query(
+        self,
+        search_ingredients: List[str],
+        user_id: int,
+        match_all: bool = False,
+        limit: int = 20,
+        offset: int = 0,
+        own_only: bool = False,
+        columns: Optional[Sequence] = None,
+        exact: bool = False,
+    ):
+        """
+        Query for one page of recipes visible to `user_id` (their own
+        recipes plus default recipes, or only their own with `own_only`),
+        ranked by number of matching search ingredients and then by
+        creation date, newest first. None when no ingredient can match.
+
+        Rows are (Recipe, match_count), or (*columns, match_count) when
+        `columns` is given. `search_ingredients` must already be lowercased
+        and stripped. With `exact`, a term matches only ingredients with
+        the same canonical name.
+        """
+        if exact:
+            name_column = RecipeIngredient.canonical_name
+            names_per_term = [[canonical_name(search_ing)] for search_ing in search_ingredients]
+        else:
+            name_column = RecipeIngredient.ingredient_name
+            names_per_term = [self.matching_names(search_ing) for search_ing in search_ingredients]
+        if match_all and not all(names_per_term):
+            return None
+        all_names = sorted(set().union(*names_per_term))
+        if not all_names:
+            return None
+
+        # One 0/1 flag per search term: does any of the recipe's ingredients match it?
+        match_count = reduce(operator.add, [
+            func.max(case((name_column.in_(names), 1), else_=0))
+            for names in names_per_term if names
+        ])
+        required = len(search_ingredients) if match_all else 1
+        matches = (
+            select(RecipeIngredient.recipe_id, match_count.label("match_count"))
+            .join(Recipe, Recipe.id == RecipeIngredient.recipe_id)
+            .where(
+                name_column.in_(all_names),
+                Recipe.user_id == user_id if own_only else visible_to(user_id),
+            )
+            .group_by(RecipeIngredient.recipe_id)
+            .having(match_count >= required)
+            .subquery()
+        )
+        return (
+            select(*(columns or [Recipe]), matches.c.match_count)
+            .join(matches, matches.c.recipe_id == Recipe.id)
+            .order_by(matches.c.match_count.desc(), Recipe.created_at.desc(), Recipe.id.desc())
+            .offset(offset)
+            .limit(limit)
+        )
+
+
+# Shared per-process vocabulary
+ingredient_index = IngredientIndex()
@@ -0,0 +1,105 @@
+"""
+Multi-pattern matching of search terms against ingredient names.
+
+A search term matches an ingredient name when either string contains the
+other (term_matches). Checking every term against every name is
+terms x names substring tests in Python. NameMatcher indexes the names
+once instead, and answers each term with work proportional to the term
+and its matches:
+
+- "term in name": the names are joined into one text, separated by a
+  character no name contains, and str.find walks it at C speed. Each hit
+  lies inside exactly one name, found by bisecting the name offsets, and
+  the scan resumes at the next name;
+- "name in term": every substring of the (short) term, up to the length
+  of the longest name, is looked up in the name dict.
+
+The result is exactly the names term_matches accepts, including the
+empty-string cases. The index only grows, like the vocabularies that use
+it; names containing the separator, or terms containing it, are checked
+the plain way.
+"""
+from bisect import bisect_right
+from typing import Dict, Iterable, List, Set
+
+SEPARATOR = "\x00"
+
+
+def term_matches(search_ing: str, name: str) -> bool:
+    """Whether a search term matches an ingredient name (either contains the other)."""
+    return search_ing in name or name in search_ing
+
+
+class NameMatcher:
+    """A growing set of ingredient names, indexed for term_matches lookups."""
+
+    def __init__(self, names: Iterable[str] = ()):
+        self._names: Dict[str, int] = {}  # name -> position in _ordered
+        self._ordered: List[str] = []
+        self._starts: List[int] = []  # offset of each name in _text
+        self._text = ""
+        self._unsafe: List[str] = []  # names containing SEPARATOR
+        self._max_len = 0  # longest name; no longer substring can be a name
+        self.add(names)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._names
+
+    def __iter__(self):
+        return iter(self._ordered)
+
+    def add(self, names: Iterable[str]) -> None:
+        """Index names not seen before."""
+        chunks = []
+        offset = len(self._text)
+        for name in names:
+            if name in self._names:
+                continue
+            self._names[name] = len(self._ordered)
+            self._ordered.append(name)
+            if SEPARATOR in name:
+                self._unsafe.append(name)
+            self._starts.append(offset)
+            self._max_len = max(self._max_len, len(name))
+            chunks.append(name)
+            offset += len(name) + 1
+        if chunks:
+            self._text += SEPARATOR.join(chunks) + SEPARATOR
+
+    def matching(self, term: str) -> Set[str]:
+        """The names that contain, or are contained in, `term`."""
+        if not term:
+            return set(self._ordered)
+        if SEPARATOR in term:
+            return {name for name in self._ordered if term_matches(term, name)}
+
+        found = set()
+        # term in name
+        text, starts, ordered = self._text, self._starts, self._ordered
+        find = text.find
+        position = find(term)
+        while position != -1:
+            i = bisect_right(starts, position) - 1
+            found.add(ordered[i])
+            if i + 1 == len(starts):
+                break
+            position = find(term, starts[i + 1])
+
+        # name in term
+        names = self._names
+        length = len(term)
+        longest = self._max_len
+        if "" in names:
+            found.add("")
+        for start in range(length):
+            for end in range(start + 1, min(length, start + longest) + 1):
+                if term[start:end] in names:
+                    found.add(term[start:end])
+
+        for name in self._unsafe:
+            if term_matches(term, name):
+                found.add(name)
+        return found
@@ -3,39 +3,107 @@ from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import text
 import redis
-from database import init_db, engine
+import redis.asyncio as aioredis
+from database import (
+    init_db, init_db_async, engine, async_engine, read_engine, async_read_engine,
+    SessionLocal,
+)
 from routes.routes import router
 from routes.recipes import router as recipes_router
-from dependencies import set_redis_client
-from config import REDIS_URL, CORS_ORIGINS
+from routes.async_routes import router as async_router
+from routes.async_recipes import router as async_recipes_router
+from dependencies import set_redis_client, set_async_redis_client
+from config import REDIS_URL, CORS_ORIGINS, ASYNC_MODE
+from pagination import NEXT_CURSOR_HEADER
+from password_pool import password_pool
+import metrics
+import query_monitor
+import rate_limit
+import sessions
+import startup
 
 # --- Lifespan --------------------------------------------------
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # startup: init Redis and optionally test DB
-    redis_client = redis.from_url(REDIS_URL, decode_responses=True)
-    set_redis_client(redis_client)
+    if ASYNC_MODE:
+        async with async_lifespan():
+            yield
+        return
 
-    # quick smoke test (optional)
-    with engine.connect() as conn:
-        conn.execute(text("SELECT 1"))
+    # startup: init Redis, check the schema, warm caches in the background
+    with startup.timings.phase("redis"):
+        redis_client = metrics.instrument_redis(redis.from_url(REDIS_URL, decode_responses=True))
+        set_redis_client(redis_client)
+        # The rate limiter and the session revocation listener run on the
+        # event loop, so they need an async client
+        limiter_redis = metrics.instrument_redis(aioredis.from_url(REDIS_URL, decode_responses=True))
+        rate_limit.limiter.set_redis(limiter_redis)
+        revocation_task = sessions.start_revocation_listener(limiter_redis)
 
-    init_db()
+    startup.prepare_schema(engine, init_db)
+    with startup.timings.phase("password_pool"):
+        password_pool.start()
+    startup.preload_in_background(SessionLocal)
+    startup.resync_in_background(SessionLocal)
 
     yield  # app runs here
 
-    # shutdown: close Redis + DB engine
+    # shutdown: stop the password pool, close Redis + DB engine
+    password_pool.shutdown()
+    revocation_task.cancel()
+    rate_limit.limiter.set_redis(None)
+    await limiter_redis.aclose()
     set_redis_client(None)
     if redis_client is not None:
         redis_client.close()
 
     engine.dispose()
+    read_engine.dispose()
+
+@asynccontextmanager
+async def async_lifespan():
+    # startup: init async Redis, check the schema, warm caches in the background
+    with startup.timings.phase("redis"):
+        redis_client = metrics.instrument_redis(aioredis.from_url(REDIS_URL, decode_responses=True))
+        set_async_redis_client(redis_client)
+        rate_limit.limiter.set_redis(redis_client)
+        revocation_task = sessions.start_revocation_listener(redis_client)
+
+    await startup.prepare_schema_async(async_engine, init_db_async)
+    with startup.timings.phase("password_pool"):
+        password_pool.start()
+    # On threads with sync sessions, so cache builds do not block the event loop
+    startup.preload_in_background(SessionLocal)
+    startup.resync_in_background(SessionLocal)
+
+    yield  # app runs here
+
+    # shutdown: stop the password pool, close Redis + DB engine
+    revocation_task.cancel()
+    password_pool.shutdown()
+    rate_limit.limiter.set_redis(None)
+    set_async_redis_client(None)
+    await redis_client.aclose()
+
+    await async_engine.dispose()
+    await async_read_engine.dispose()
+    engine.dispose()  # used by the preload and resync threads
 
 app = FastAPI(lifespan=lifespan)
 
+# --- Metrics ---------------------------------------------------
+metrics.instrument_engine(engine)
+if read_engine is not engine:
+    metrics.instrument_engine(read_engine)
+if async_engine is not None:
+    metrics.instrument_engine(async_engine.sync_engine)
+if async_read_engine is not async_engine:
+    metrics.instrument_engine(async_read_engine.sync_engine)
+
 # --- CORS Middleware -------------------------------------------
+# Rate limiting first, so CORS wraps its 429/503 responses too
+app.add_middleware(rate_limit.RateLimitMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
@@ -43,7 +111,16 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
+app.add_middleware(query_monitor.QueryMonitorMiddleware)
+# Added last so it wraps CORS too and times the whole request
+app.add_middleware(metrics.MetricsMiddleware)
 
-app.include_router(router)
-app.include_router(recipes_router)
\ No newline at end of file
+# Same endpoints either way; ASYNC_MODE picks which implementation serves them
+if ASYNC_MODE:
+    app.include_router(async_router)
+    app.include_router(async_recipes_router)
+else:
+    app.include_router(router)
+    app.include_router(recipes_router)
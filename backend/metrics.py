@@ -0,0 +1,340 @@
+"""
+Per-process request, database and Redis metrics in Prometheus text format.
+
+MetricsMiddleware (plain ASGI, so it adds no task or thread hop) records,
+per method and route template:
+  - request latency and response size histograms,
+  - request counts by status,
+  - database queries and Redis commands issued while serving the request,
+    with the time spent in them,
+plus the number of requests in flight.
+
+Database calls are observed through SQLAlchemy cursor events on the
+engines, and Redis calls by wrapping the client handed out by get_redis /
+get_async_redis. Both are attributed to the request through a context
+variable, which Starlette copies into the threadpool that runs sync
+routes. Calls outside a request (startup, scripts) are labelled
+route="none".
+
+Connection pool usage (see db_pool) and startup phase timings are
+rendered alongside. Like recipe_cache.stats, the numbers are per worker
+process; Prometheus sums them across the scrape targets. They are served by GET /metrics.
+"""
+import contextvars
+import functools
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import redis.asyncio as aioredis
+from sqlalchemy import event
+
+import db_pool
+import startup
+from config import METRICS_ENABLED
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+NO_ROUTE = "none"
+UNMATCHED_ROUTE = "unmatched"
+
+
+class Histogram:
+    """Cumulative-bucket histogram; one instance per label set."""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class CallStats:
+    """Count of calls and total seconds spent in them."""
+
+    __slots__ = ("calls", "seconds")
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+
+
+class RequestScope:
+    """Database and Redis usage of the request being served."""
+
+    __slots__ = ("db", "redis")
+
+    def __init__(self):
+        self.db = CallStats()
+        self.redis = CallStats()
+
+
+_current: contextvars.ContextVar[Optional[RequestScope]] = contextvars.ContextVar(
+    "metrics_request_scope", default=None
+)
+
+
+class Registry:
+    """All recorded series. Updates hold one lock for a few dict operations."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.requests: Dict[Tuple[str, str, str], int] = {}
+        self.latency: Dict[Tuple[str, str], Histogram] = {}
+        self.response_size: Dict[Tuple[str, str], Histogram] = {}
+        self.db: Dict[str, CallStats] = {}
+        self.redis: Dict[str, CallStats] = {}
+
+    def request_started(self) -> None:
+        with self._lock:
+            self.in_flight += 1
+
+    def request_finished(
+        self, method: str, route: str, status: int, seconds: float, size: int, scope: RequestScope
+    ) -> None:
+        key = (method, route)
+        with self._lock:
+            self.in_flight -= 1
+            status_key = (method, route, str(status))
+            self.requests[status_key] = self.requests.get(status_key, 0) + 1
+            latency = self.latency.get(key)
+            if latency is None:
+                latency = self.latency[key] = Histogram(LATENCY_BUCKETS)
+                self.response_size[key] = Histogram(SIZE_BUCKETS)
+            latency.observe(seconds)
+            self.response_size[key].observe(size)
+            self._add(self.db, route, scope.db.calls, scope.db.seconds)
+            self._add(self.redis, route, scope.redis.calls, scope.redis.seconds)
+
+    def call_outside_request(self, kind: str, seconds: float) -> None:
+        with self._lock:
+            self._add(getattr(self, kind), NO_ROUTE, 1, seconds)
+
+    @staticmethod
+    def _add(series: Dict[str, CallStats], route: str, calls: int, seconds: float) -> None:
+        if not calls:
+            return
+        stats = series.get(route)
+        if stats is None:
+            stats = series[route] = CallStats()
+        stats.calls += calls
+        stats.seconds += seconds
+
+    def render(self) -> str:
+        """The Prometheus text exposition of every series."""
+        with self._lock:
+            lines: List[str] = [
+                "# HELP http_requests_in_flight Requests currently being served.",
+                "# TYPE http_requests_in_flight gauge",
+                f"http_requests_in_flight {self.in_flight}",
+                "# HELP http_requests_total Requests served, by route and status.",
+                "# TYPE http_requests_total counter",
+            ]
+            for (method, route, status), count in sorted(self.requests.items()):
+                lines.append(f"http_requests_total{_labels(method=method, route=route, status=status)} {count}")
+            _render_histograms(lines, "http_request_duration_seconds",
+                               "Request latency in seconds.", self.latency)
+            _render_histograms(lines, "http_response_size_bytes",
+                               "Response body size in bytes.", self.response_size)
+            for name, series, what in (("db_queries", self.db, "database queries"),
+                                       ("redis_commands", self.redis, "Redis commands")):
+                lines += [f"# HELP {name}_total Number of {what}, by route.", f"# TYPE {name}_total counter"]
+                lines += [f"{name}_total{_labels(route=route)} {stats.calls}"
+                          for route, stats in sorted(series.items())]
+                lines += [f"# HELP {name}_seconds_total Time spent in {what}, by route.",
+                          f"# TYPE {name}_seconds_total counter"]
+                lines += [f"{name}_seconds_total{_labels(route=route)} {_number(stats.seconds)}"
+                          for route, stats in sorted(series.items())]
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels: str) -> str:
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _number(value: float) -> str:
+    return repr(float(value))
+
+
+def _render_histograms(lines: List[str], name: str, help_text: str,
+                       series: Dict[Tuple[str, str], Histogram]) -> None:
+    lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for (method, route), histogram in sorted(series.items()):
+        cumulative = 0
+        for bound, count in zip(list(histogram.buckets) + ["+Inf"], histogram.counts):
+            cumulative += count
+            le = bound if bound == "+Inf" else _number(bound)
+            lines.append(f"{name}_bucket{_labels(method=method, route=route, le=le)} {cumulative}")
+        lines.append(f"{name}_sum{_labels(method=method, route=route)} {_number(histogram.sum)}")
+        lines.append(f"{name}_count{_labels(method=method, route=route)} {histogram.count}")
+
+
+registry = Registry()
+
+
+# Connection pool series: db_pool.PoolStats key -> (metric, type, help)
+POOL_SERIES = {
+    "checked_out": ("db_pool_checked_out", "gauge", "Connections currently checked out."),
+    "idle": ("db_pool_idle", "gauge", "Idle connections in the pool."),
+    "overflow": ("db_pool_overflow", "gauge", "Connections open beyond pool_size."),
+    "saturation": ("db_pool_saturation", "gauge", "Checked-out share of pool_size + max_overflow."),
+    "checkouts": ("db_pool_checkouts_total", "counter", "Successful connection checkouts."),
+    "timeouts": ("db_pool_timeouts_total", "counter", "Checkouts that gave up after pool_timeout."),
+    "wait_seconds_total": ("db_pool_wait_seconds_total", "counter", "Time spent waiting for a connection."),
+}
+
+
+def _render_pools() -> str:
+    pool_stats = db_pool.stats()
+    lines: List[str] = []
+    for key, (name, metric_type, help_text) in POOL_SERIES.items():
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"]
+        lines += [f"{name}{_labels(pool=pool)} {_number(stats[key])}"
+                  for pool, stats in sorted(pool_stats.items())]
+    return "\n".join(lines) + "\n"
+
+
+def _render_startup() -> str:
+    lines = [
+        "# HELP startup_phase_seconds Duration of each startup phase of this process.",
+        "# TYPE startup_phase_seconds gauge",
+    ]
+    lines += [f"startup_phase_seconds{_labels(phase=phase)} {_number(seconds)}"
+              for phase, seconds in startup.timings.as_dict().items()]
+    return "\n".join(lines) + "\n"
+
+
+def render() -> str:
+    return registry.render() + _render_pools() + _render_startup()
+
+
+# --- Request middleware -----------------------------------------
+class MetricsMiddleware:
+    """ASGI middleware recording every HTTP request into `registry`."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        request_scope = RequestScope()
+        token = _current.set(request_scope)
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        registry.request_started()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            _current.reset(token)
+            # FastAPI stores the matched route in the scope while routing
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or UNMATCHED_ROUTE
+            registry.request_finished(scope["method"], route_path, status, elapsed, size, request_scope)
+
+
+# --- Database ----------------------------------------------------
+def _record(kind: str, seconds: float) -> None:
+    request_scope = _current.get()
+    if request_scope is None:
+        registry.call_outside_request(kind, seconds)
+        return
+    stats = request_scope.db if kind == "db" else request_scope.redis
+    stats.calls += 1
+    stats.seconds += seconds
+
+
+def instrument_engine(engine) -> None:
+    """Count and time every statement run on a (sync) Engine."""
+    if not METRICS_ENABLED or engine is None:
+        return
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["metrics_started"].pop()
+        _record("db", time.perf_counter() - started)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("metrics_started"):
+            started = conn.info["metrics_started"].pop()
+            _record("db", time.perf_counter() - started)
+
+
+# --- Redis -------------------------------------------------------
+def _timed(fn):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _record("redis", time.perf_counter() - started)
+    return wrapper
+
+
+def _timed_async(fn):
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await fn(*args, **kwargs)
+        finally:
+            _record("redis", time.perf_counter() - started)
+    return wrapper
+
+
+def instrument_redis(client):
+    """
+    Count and time the round trips of a redis or redis.asyncio client, in
+    place: single commands and pipeline executions (one round trip each).
+    Returns the client.
+    """
+    if not METRICS_ENABLED or client is None:
+        return client
+    timed = _timed_async if isinstance(client, aioredis.Redis) else _timed
+    client.execute_command = timed(client.execute_command)
+    make_pipeline = client.pipeline
+
+    @functools.wraps(make_pipeline)
+    def pipeline(*args, **kwargs):
+        pipe = make_pipeline(*args, **kwargs)
+        pipe.execute = timed(pipe.execute)
+        return pipe
+
+    client.pipeline = pipeline
+    return client
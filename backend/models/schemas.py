@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Annotated, Optional, List
 from datetime import datetime
 
 class User_in(BaseModel):
@@ -50,17 +50,55 @@ class RecipeResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class RecipeSummary(BaseModel):
+    """List-view projection of a recipe (view=summary): no text or ingredients."""
+    id: int
+    title: str
+    prep_time: Optional[int] = None
+    cook_time: Optional[int] = None
+    servings: Optional[int] = None
+    user_id: Optional[int] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+# A search or pantry ingredient; each one is matched substring by substring
+# against the ingredient vocabulary, so both its length and the list are capped
+IngredientTerm = Annotated[str, Field(max_length=100)]
+
 class RecipeSearchRequest(BaseModel):
     q: str  # Search query string
     limit: Optional[int] = 20
     offset: Optional[int] = 0
 
 class IngredientSearchRequest(BaseModel):
-    ingredients: List[str]  # List of ingredient names to search for
+    ingredients: List[IngredientTerm] = Field(..., max_length=50)  # List of ingredient names to search for
     match_all: Optional[bool] = False  # If True, recipe must contain all ingredients; if False, any ingredient
+    exact: Optional[bool] = False  # If True, match canonical names ("tomatoes" = "Roma tomato") instead of substrings
     limit: Optional[int] = 20
     offset: Optional[int] = 0
 
+class PantryRequest(BaseModel):
+    ingredients: List[IngredientTerm] = Field(..., max_length=200)  # What the user has on hand
+    max_missing: Optional[int] = Field(None, ge=0)  # Only recipes needing at most this many more ingredients
+    limit: int = Field(20, ge=1, le=100)
+
+class PantryMatchResponse(RecipeSummary):
+    """A RecipeSummary with how well the pantry covers its ingredients."""
+    matched_count: int  # Recipe ingredients found in the pantry
+    missing_count: int  # Recipe ingredients still needed
+    match_ratio: float  # matched_count / the recipe's ingredient count
+
+class AutocompleteResponse(BaseModel):
+    titles: List[str]  # Recipe titles with a word starting with the query
+    ingredients: List[str]  # Ingredient names with a word starting with the query
+
+class BatchRecipeItem(BaseModel):
+    id: int  # Requested recipe id
+    found: bool  # False when the recipe does not exist or is not visible
+    recipe: Optional[RecipeResponse] = None
+
 # Spoonacular Schemas (deprecated - keeping for backwards compatibility)
 class SpoonacularRecipeSummary(BaseModel):
     id: int
@@ -0,0 +1,113 @@
+"""
+Keyset (cursor) pagination helpers.
+
+A cursor is the sort key of the last row on a page, JSON encoded and then
+base64url encoded so clients treat it as opaque. The next page continues
+strictly after that key, so deep pages cost the same as the first one.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import select, tuple_, union_all
+from sqlalchemy.orm import aliased
+from sqlalchemy.sql import Select
+
+from database import Recipe
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(values: Sequence) -> str:
+    """Encode a row's sort key into an opaque cursor string."""
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, types: Sequence[type]) -> Tuple:
+    """
+    Decode a cursor produced by encode_cursor back into a typed sort key.
+    Raises HTTPException 400 if the cursor is malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        if not isinstance(payload, list) or len(payload) != len(types):
+            raise ValueError("cursor has the wrong number of fields")
+        return tuple(
+            datetime.fromisoformat(value) if value_type is datetime else value_type(value)
+            for value, value_type in zip(payload, types)
+        )
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def before(columns: Sequence, after: Sequence):
+    """
+    `columns` < `after` as one row-value comparison. The cursor values are
+    bound as the columns' types, so they are stored-format compatible (the
+    type would otherwise be guessed from the Python values).
+    """
+    return tuple_(*columns) < tuple_(*after, types=[column.type for column in columns])
+
+
+def recipe_page_query(
+    user_id: int,
+    limit: int,
+    offset: int = 0,
+    after: Optional[Tuple[datetime, int]] = None,
+    columns: Optional[Sequence[str]] = None,
+) -> Select:
+    """
+    Newest-first page of the recipes visible to a user.
+
+    The user's own recipes and the default recipes are read by two branches
+    that each walk ix_recipes_user_id_created_at_id in order and stop after
+    `offset + limit` rows; the outer query merges them. `after` is the
+    (created_at, id) key of the last row of the previous page.
+
+    Rows are Recipe entities, or tuples of the named `columns` (which must
+    include created_at and id).
+    """
+    branches = []
+    for owner_filter in (Recipe.user_id == user_id, Recipe.user_id.is_(None)):
+        if columns:
+            branch = select(*(getattr(Recipe, name) for name in columns))
+        else:
+            branch = select(Recipe)
+        branch = branch.where(owner_filter)
+        if after is not None:
+            branch = branch.where(before((Recipe.created_at, Recipe.id), after))
+        branch = branch.order_by(
+            Recipe.created_at.desc(), Recipe.id.desc()
+        ).limit(offset + limit).subquery()
+        branches.append(select(branch))
+
+    page = aliased(Recipe, union_all(*branches).subquery())
+    if columns:
+        query = select(*(getattr(page, name) for name in columns))
+    else:
+        query = select(page)
+    return query.order_by(
+        page.created_at.desc(), page.id.desc()
+    ).offset(offset).limit(limit)
+
+
+def own_recipe_page_query(
+    user_id: int,
+    limit: int,
+    after: Optional[Tuple[datetime, int]] = None,
+    columns: Sequence[str] = (),
+) -> Select:
+    """
+    Newest-first run of `limit` of the user's own recipes (no defaults),
+    strictly after the (created_at, id) key `after`, as tuples of `columns`.
+    """
+    query = select(*(getattr(Recipe, name) for name in columns)).where(Recipe.user_id == user_id)
+    if after is not None:
+        query = query.where(before((Recipe.created_at, Recipe.id), after))
+    return query.order_by(Recipe.created_at.desc(), Recipe.id.desc()).limit(limit)
@@ -0,0 +1,244 @@
+"""
+"What can I cook with what I have": pantry matching over sparse ingredient sets.
+
+Every distinct ingredient name (the vocabulary) gets a number, and every
+recipe is a row holding the numbers of its names, stored sparsely: one
+flat array of entries (name number, row) for all recipes, so memory
+grows with the number of recipe ingredients, not with vocabulary size
+times recipe count. A pantry becomes a boolean mask over the vocabulary:
+the names matched by any pantry term, found by a NameMatcher with the
+same either-contains-the-other rule as ingredient search. Scoring all
+recipes is then one vectorized pass over the entries (mask lookup, then
+np.bincount by row), which gives each recipe's matched and missing
+ingredient counts and its match ratio. The top k come from a partial
+sort (np.partition), so only the survivors are fully sorted.
+
+The rows are per process and catch up with recipe_ingredients rows
+incrementally by row id (SyncCursor); recipes created by this process
+are added immediately. A recipe that gains names is appended again as a
+new row and its old row is marked dead; resync() rebuilds everything
+compactly.
+"""
+import threading
+from datetime import datetime, timezone
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from database import Recipe, RecipeIngredient
+from ingredient_matcher import NameMatcher
+from sync_cursor import SyncCursor
+
+INITIAL_ROWS = 1024
+INITIAL_ENTRIES = 8192
+
+
+class PantryMatch(NamedTuple):
+    recipe_id: int
+    matched: int  # recipe ingredients covered by the pantry
+    missing: int  # recipe ingredients not in the pantry
+    ratio: float  # matched / all of the recipe's ingredients
+
+
+def _timestamp(created_at: Optional[datetime]) -> int:
+    """Microseconds since the epoch; naive datetimes are taken as UTC."""
+    if created_at is None:
+        return 0
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return int(created_at.timestamp() * 1_000_000)
+
+
+def _grown(array: np.ndarray, size: int) -> np.ndarray:
+    """`array`, or a copy at least twice as large when it holds fewer than `size` items."""
+    if size <= len(array):
+        return array
+    bigger = np.zeros(max(size, len(array) * 2), dtype=array.dtype)
+    bigger[:len(array)] = array
+    return bigger
+
+
+class PantryMatcher:
+    """
+    Per-process ingredient sets of every recipe, kept current
+    incrementally by recipe_ingredients row id.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clear()
+
+    def _clear(self) -> None:
+        self._names: Dict[str, int] = {}  # ingredient name -> number
+        self._matcher = NameMatcher()
+        self._rows: Dict[int, int] = {}  # recipe id -> its live row
+        self._cursor = SyncCursor()
+        self._count = 0  # rows, live or dead
+        self._entry_count = 0
+        # Per row
+        self._starts = np.zeros(INITIAL_ROWS, dtype=np.int64)  # first entry
+        self._totals = np.zeros(INITIAL_ROWS, dtype=np.int64)  # entries = distinct names
+        self._ids = np.zeros(INITIAL_ROWS, dtype=np.int64)
+        self._owners = np.zeros(INITIAL_ROWS, dtype=np.int64)  # 0 = default recipe
+        self._created = np.zeros(INITIAL_ROWS, dtype=np.int64)
+        self._live = np.zeros(INITIAL_ROWS, dtype=bool)
+        # Per entry
+        self._entries = np.zeros(INITIAL_ENTRIES, dtype=np.int32)  # name number
+        self._entry_rows = np.zeros(INITIAL_ENTRIES, dtype=np.int32)
+
+    def reset(self) -> None:
+        """Forget every recipe, e.g. after recipe_ingredients was rebuilt; the next sync reloads them."""
+        with self._lock:
+            self._clear()
+
+    def resync(self, db: Session) -> None:
+        """Rebuild from scratch, without dead rows, and swap in; matching keeps using the old rows meanwhile."""
+        fresh = PantryMatcher()
+        fresh.sync(db)
+        with self._lock:
+            lock = self._lock
+            self.__dict__.update(fresh.__dict__)
+            self._lock = lock
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    # --- Updates (callers hold the lock) ---------------------------
+    def _number(self, name: str) -> int:
+        number = self._names.get(name)
+        if number is None:
+            number = self._names[name] = len(self._names)
+        return number
+
+    def _add(self, recipe_id: int, user_id: Optional[int], created_at, names) -> None:
+        names = [name for name in names if name]
+        numbers = {self._number(name) for name in names}
+        old_row = self._rows.get(recipe_id)
+        if old_row is not None:
+            start = self._starts[old_row]
+            known = set(self._entries[start:start + self._totals[old_row]].tolist())
+            if numbers <= known:
+                return
+            numbers |= known
+        if not numbers:
+            return
+        self._matcher.add(names)
+
+        # Rows and entries are only appended; arrays that grow are replaced
+        row, start, total = self._count, self._entry_count, len(numbers)
+        self._starts, self._totals, self._ids, self._owners, self._created, self._live = (
+            _grown(array, row + 1)
+            for array in (self._starts, self._totals, self._ids, self._owners, self._created, self._live)
+        )
+        self._entries = _grown(self._entries, start + total)
+        self._entry_rows = _grown(self._entry_rows, start + total)
+        self._entries[start:start + total] = sorted(numbers)
+        self._entry_rows[start:start + total] = row
+        self._starts[row], self._totals[row] = start, total
+        self._ids[row] = recipe_id
+        self._owners[row] = user_id or 0
+        self._created[row] = _timestamp(created_at)
+        self._live[row] = True
+        self._count, self._entry_count = row + 1, start + total
+        if old_row is not None:
+            self._live[old_row] = False
+        self._rows[recipe_id] = row
+
+    def add_recipe(self, recipe_id: int, user_id: Optional[int], created_at, names) -> None:
+        """Add a recipe written by this process (other writers are picked up by sync)."""
+        with self._lock:
+            self._add(recipe_id, user_id, created_at, names)
+
+    def sync(self, db: Session) -> None:
+        """
+        Catch up with ingredient rows written since the last sync. Rows are
+        append-only, so only rows the cursor has not read are fetched, and
+        re-adding a recipe added by add_recipe() is harmless.
+        """
+        with self._lock:
+            cursor = self._cursor
+            unread = cursor.unread(RecipeIngredient.id)
+        rows = db.execute(
+            select(
+                RecipeIngredient.id, RecipeIngredient.recipe_id, RecipeIngredient.ingredient_name,
+                Recipe.user_id, Recipe.created_at,
+            )
+            .join(Recipe, Recipe.id == RecipeIngredient.recipe_id)
+            .where(unread)
+            .order_by(RecipeIngredient.recipe_id)
+        ).all()
+        if not rows and not cursor.gaps:
+            return
+
+        per_recipe: Dict[int, tuple] = {}
+        for _, recipe_id, name, user_id, created_at in rows:
+            per_recipe.setdefault(recipe_id, (user_id, created_at, []))[2].append(name)
+        with self._lock:
+            if self._cursor is not cursor:
+                return  # reset or resync meanwhile
+            for recipe_id, (user_id, created_at, names) in per_recipe.items():
+                self._add(recipe_id, user_id, created_at, names)
+            cursor.advance(row.id for row in rows)
+
+    # --- Queries ---------------------------------------------------
+    def _pantry_mask(self, pantry: List[str]) -> np.ndarray:
+        mask = np.zeros(len(self._names), dtype=bool)
+        for term in pantry:
+            for name in self._matcher.matching(term):
+                mask[self._names[name]] = True
+        return mask
+
+    def match(
+        self,
+        user_id: int,
+        pantry: List[str],
+        limit: int = 20,
+        max_missing: Optional[int] = None,
+    ) -> List[PantryMatch]:
+        """
+        Up to `limit` recipes visible to `user_id` that use at least one
+        pantry ingredient, best first: highest match ratio, then fewest
+        missing ingredients, then newest. `pantry` must already be
+        lowercased and stripped; `max_missing` drops recipes that need
+        more ingredients than that.
+        """
+        with self._lock:
+            n, e = self._count, self._entry_count
+            mask = self._pantry_mask(pantry)
+            # Rows and entries below n and e never change once written (only
+            # `live` does, hence the copy), and growing replaces the arrays,
+            # so these views stay consistent without the lock
+            entries, entry_rows = self._entries[:e], self._entry_rows[:e]
+            totals, ids, owners, created = self._totals[:n], self._ids[:n], self._owners[:n], self._created[:n]
+            live = self._live[:n].copy()
+
+        if n == 0 or not mask.any():
+            return []
+        matched = np.bincount(entry_rows[mask[entries]], minlength=n)
+
+        keep = live & (matched > 0) & ((owners == 0) | (owners == user_id))
+        if max_missing is not None:
+            keep &= totals - matched <= max_missing
+        candidates = np.flatnonzero(keep)
+        ratio = matched[candidates] / totals[candidates]
+
+        if len(candidates) > limit:
+            # Everything tied with the k-th best ratio stays, for the tie-breaks below
+            kth = len(candidates) - limit
+            cutoff = np.partition(ratio, kth)[kth]
+            best = ratio >= cutoff
+            candidates, ratio = candidates[best], ratio[best]
+
+        missing = totals[candidates] - matched[candidates]
+        # lexsort: last key is the primary one
+        order = np.lexsort((-ids[candidates], -created[candidates], missing, -ratio))[:limit]
+        return [
+            PantryMatch(int(ids[candidates[j]]), int(matched[candidates[j]]), int(missing[j]), float(ratio[j]))
+            for j in order
+        ]
+
+
+# Shared per-process matcher
+pantry_matcher = PantryMatcher()
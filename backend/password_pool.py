@@ -0,0 +1,104 @@
+"""
+Bounded process pool for bcrypt hashing and verification.
+
+bcrypt costs 100-300 ms of CPU per call. Running it inline in register and
+login ties up a request thread for that long, so a burst of logins starves
+unrelated requests. Here the work runs in a small dedicated process pool,
+and admission control caps how many calls may be queued or running: once
+`max_pending` is reached, new calls fail fast with 503 instead of piling
+up. A login spike then only slows down logins.
+"""
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from fastapi import HTTPException
+
+import helper
+from config import BCRYPT_POOL_WORKERS, BCRYPT_POOL_MAX_PENDING
+
+
+class PasswordPool:
+    """
+    Runs bcrypt calls in a process pool of `workers` processes, admitting
+    at most `max_pending` calls at once. With `workers=0` calls run inline
+    in the calling thread (still subject to admission control).
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """Create the worker processes (otherwise done on first use)."""
+        if self.workers <= 0:
+            return
+        with self._lock:
+            if self._executor is None:
+                # spawn: forking a process that already runs threads is unsafe
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def _admit(self) -> None:
+        if not self._slots.acquire(blocking=False):
+            raise HTTPException(
+                status_code=503,
+                detail="Too many sign-in requests, please retry shortly",
+                headers={"Retry-After": "1"},
+            )
+
+    def _submit(self, fn, *args) -> Future:
+        self._admit()
+        try:
+            if self.workers <= 0:
+                future = Future()
+                try:
+                    future.set_result(fn(*args))
+                except Exception as exc:
+                    future.set_exception(exc)
+            else:
+                self.start()
+                try:
+                    future = self._executor.submit(fn, *args)
+                except BrokenProcessPool:
+                    # A worker died (e.g. OOM-killed); replace the pool once
+                    self.shutdown()
+                    self.start()
+                    future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def hash_password(self, password: str) -> str:
+        return self._submit(helper.hash_password, password).result()
+
+    def verify_password(self, password: str, hashed_password: str) -> bool:
+        return self._submit(helper.verify_password, password, hashed_password).result()
+
+    async def hash_password_async(self, password: str) -> str:
+        return await asyncio.wrap_future(self._submit(helper.hash_password, password))
+
+    async def verify_password_async(self, password: str, hashed_password: str) -> bool:
+        return await asyncio.wrap_future(
+            self._submit(helper.verify_password, password, hashed_password)
+        )
+
+
+# Shared per-process pool
+password_pool = PasswordPool(workers=BCRYPT_POOL_WORKERS, max_pending=BCRYPT_POOL_MAX_PENDING)
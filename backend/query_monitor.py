@@ -0,0 +1,191 @@
+"""
+SQL statement budget, N+1 detection and slow-query log.
+
+Every statement run on an instrumented engine (database.py instruments
+both) is checked against three limits:
+
+- QUERY_BUDGET: statements allowed per request;
+- N_PLUS_ONE_THRESHOLD: executions of one identical SQL string allowed per
+  request, the usual signature of a lazy load or a query inside a loop;
+- SLOW_QUERY_MS: statements slower than this are logged with their
+  parameters and, with SLOW_QUERY_EXPLAIN on PostgreSQL, the EXPLAIN
+  ANALYZE plan of SELECTs.
+
+Requests are tracked by QueryMonitorMiddleware. With
+QUERY_BUDGET_ACTION=warn a violation is logged once per request; with
+"raise" the offending statement raises QueryBudgetExceeded, which makes
+the endpoint fail in tests. `assert_max_queries` applies a budget to any
+block of code, inside or outside a request.
+"""
+import contextvars
+import logging
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+from sqlalchemy import event
+
+from config import (
+    QUERY_BUDGET,
+    QUERY_BUDGET_ACTION,
+    N_PLUS_ONE_THRESHOLD,
+    SLOW_QUERY_MS,
+    SLOW_QUERY_EXPLAIN,
+)
+
+logger = logging.getLogger(__name__)
+
+MAX_LOGGED_PARAMETERS = 500  # characters of repr(parameters) in log lines
+
+
+class QueryBudgetExceeded(RuntimeError):
+    """A request (or an assert_max_queries block) ran too many statements."""
+
+
+class QueryCounter:
+    """Statements run while tracking one request or block."""
+
+    __slots__ = ("label", "budget", "count", "statements", "warned")
+
+    def __init__(self, label: str, budget: int):
+        self.label = label
+        self.budget = budget
+        self.count = 0
+        self.statements: Dict[str, int] = {}
+        self.warned = False
+
+    def add(self, statement: str) -> None:
+        self.count += 1
+        repeats = self.statements.get(statement, 0) + 1
+        self.statements[statement] = repeats
+
+        if self.budget and self.count > self.budget:
+            self._violation(f"{self.label} ran more than {self.budget} SQL statements")
+        if N_PLUS_ONE_THRESHOLD and repeats > N_PLUS_ONE_THRESHOLD:
+            self._violation(
+                f"{self.label} ran the same statement {repeats} times (possible N+1): "
+                f"{_shorten(statement)}"
+            )
+
+    def _violation(self, message: str) -> None:
+        if QUERY_BUDGET_ACTION == "raise":
+            raise QueryBudgetExceeded(message)
+        if not self.warned:
+            self.warned = True
+            logger.warning(message)
+
+
+_current: contextvars.ContextVar[Optional[QueryCounter]] = contextvars.ContextVar(
+    "query_monitor_counter", default=None
+)
+
+
+def current_counter() -> Optional[QueryCounter]:
+    """The counter of the request or block being tracked, if any."""
+    return _current.get()
+
+
+@contextmanager
+def track_queries(label: str, budget: int = QUERY_BUDGET) -> Iterator[QueryCounter]:
+    """Count the statements run inside the block against `budget` (0 = no budget)."""
+    counter = QueryCounter(label, budget)
+    token = _current.set(counter)
+    try:
+        yield counter
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def assert_max_queries(max_queries: int, label: str = "block") -> Iterator[QueryCounter]:
+    """
+    Fail with QueryBudgetExceeded if the block runs more than `max_queries`
+    statements, whatever QUERY_BUDGET_ACTION says. For tests and benchmarks.
+    """
+    with track_queries(label, budget=0) as counter:
+        yield counter
+    if counter.count > max_queries:
+        raise QueryBudgetExceeded(
+            f"{label} ran {counter.count} SQL statements, expected at most {max_queries}"
+        )
+
+
+class QueryMonitorMiddleware:
+    """ASGI middleware tracking the statements of every HTTP request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not (QUERY_BUDGET or N_PLUS_ONE_THRESHOLD):
+            await self.app(scope, receive, send)
+            return
+        with track_queries(f"{scope['method']} {scope['path']}"):
+            await self.app(scope, receive, send)
+
+
+# --- Engine instrumentation ---------------------------------------
+def _shorten(text: str, limit: int = 200) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit] + "..."
+
+
+def _explain(conn, statement: str, parameters) -> Optional[str]:
+    # Through a raw DBAPI cursor, so the EXPLAIN is not itself monitored
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS) {statement}", parameters)
+        return "\n".join(row[0] for row in cursor.fetchall())
+    except Exception:
+        logger.debug("EXPLAIN ANALYZE failed", exc_info=True)
+        return None
+    finally:
+        cursor.close()
+
+
+def _log_slow(conn, statement: str, parameters, executemany: bool, elapsed: float) -> None:
+    plan = None
+    if (
+        SLOW_QUERY_EXPLAIN
+        and not executemany
+        and conn.dialect.name == "postgresql"
+        and statement.lstrip().upper().startswith("SELECT")
+    ):
+        plan = _explain(conn, statement, parameters)
+    params = repr(parameters)
+    if len(params) > MAX_LOGGED_PARAMETERS:
+        params = params[:MAX_LOGGED_PARAMETERS] + "..."
+    logger.warning(
+        "Slow query (%.1f ms): %s\nParameters: %s%s",
+        elapsed * 1000, _shorten(statement, 2000), params,
+        f"\nPlan:\n{plan}" if plan else "",
+    )
+
+
+def instrument_engine(engine) -> None:
+    """Apply the statement budget and the slow-query log to a (sync) Engine."""
+    if engine is None:
+        return
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        counter = _current.get()
+        if counter is not None:
+            counter.add(statement)
+        if SLOW_QUERY_MS > 0:
+            conn.info.setdefault("query_monitor_started", []).append(time.perf_counter())
+
+    if SLOW_QUERY_MS <= 0:
+        return
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_monitor_started"].pop()
+        if elapsed * 1000 >= SLOW_QUERY_MS:
+            _log_slow(conn, statement, parameters, executemany, elapsed)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_monitor_started"):
+            conn.info["query_monitor_started"].pop()
@@ -0,0 +1,256 @@
+"""
+Admission control for expensive endpoints: Redis token buckets plus
+per-process load shedding.
+
+Each rule names one endpoint (method and path) and gives it a token
+bucket per client: `rate` tokens per second, holding at most `burst`.
+The client is the user (per user) or the address (per IP). Per-user
+rules resolve the SID cookie to its user id, from the session cache or
+one Redis read, so neither made-up nor rotated session ids get a fresh
+bucket; requests whose session does not resolve fall back to the
+address. A Lua script refills
+and takes a token atomically in Redis, so a check is one round trip and
+the limit holds across all workers. The Redis clock is used, so worker
+clocks do not matter.
+
+Rules with `max_in_flight` also cap how many such requests one process
+runs at once; further ones are shed with 503 without touching Redis.
+
+Both checks run in RateLimitMiddleware, before routing, authentication
+or any database work: a rejected request costs one Redis call (two for
+a per-user rule whose session is not in the cache).
+It answers 429 (or 503) with Retry-After and a JSON body shaped like an
+HTTPException. If Redis fails the request is let through; the limiter
+must not take the API down with it.
+
+RATE_LIMITS configures the rules, ";"-separated, each
+"METHOD PATH RATE/SECONDS BURST ip|user [MAX_IN_FLIGHT]", e.g.
+"POST /auth/login 5/60 10 ip 8". Empty disables rate limiting.
+"""
+import logging
+import math
+import threading
+from typing import Dict, NamedTuple, Optional, Tuple
+
+import redis
+from fastapi.responses import JSONResponse
+
+import sessions
+from config import RATE_LIMITS, RATE_LIMIT_TRUST_FORWARDED
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "ratelimit:"
+
+# KEYS[1] bucket; ARGV rate (tokens/s), burst, cost.
+# Returns {allowed (0/1), seconds until enough tokens (string)}.
+TOKEN_BUCKET_LUA = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+
+local allowed = 0
+local wait = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    wait = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+-- An idle bucket is full again after burst / rate seconds
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+return {allowed, tostring(wait)}
+"""
+
+
+class Rule(NamedTuple):
+    method: str
+    path: str
+    rate: float  # tokens per second
+    burst: int
+    per: str  # "ip" or "user"
+    max_in_flight: int  # per process, 0 = no cap
+
+    @property
+    def name(self) -> str:
+        return f"{self.method} {self.path}"
+
+
+def parse_rules(spec: str) -> Dict[Tuple[str, str], Rule]:
+    """Rules from RATE_LIMITS syntax (see the module docstring), by (method, path)."""
+    rules = {}
+    for entry in spec.split(";"):
+        parts = entry.split()
+        if not parts:
+            continue
+        if len(parts) not in (5, 6):
+            raise ValueError(f"Invalid RATE_LIMITS entry {entry.strip()!r}")
+        method, path, rate, burst, per = parts[:5]
+        count, _, seconds = rate.partition("/")
+        if per not in ("ip", "user"):
+            raise ValueError(f"RATE_LIMITS entry {entry.strip()!r}: expected ip or user, got {per!r}")
+        rule = Rule(
+            method=method.upper(),
+            path=path,
+            rate=float(count) / float(seconds or 1),
+            burst=int(burst),
+            per=per,
+            max_in_flight=int(parts[5]) if len(parts) == 6 else 0,
+        )
+        rules[(rule.method, rule.path)] = rule
+    return rules
+
+
+class RateLimitStats:
+    """Per-process decisions, by rule name."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts: Dict[str, Dict[str, int]] = {}
+
+    def record(self, rule: Rule, outcome: str) -> None:
+        with self._lock:
+            counts = self.counts.setdefault(rule.name, {"allowed": 0, "limited": 0, "shed": 0, "errors": 0})
+            counts[outcome] += 1
+
+    def as_dict(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {name: dict(counts) for name, counts in self.counts.items()}
+
+
+class RateLimiter:
+    """The configured rules and the Redis client the middleware checks them with."""
+
+    def __init__(self, rules: Dict[Tuple[str, str], Rule]):
+        self.rules = rules
+        self.stats = RateLimitStats()
+        self._in_flight: Dict[str, int] = {}
+        self._in_flight_lock = threading.Lock()
+        self._client = None
+        self._script = None
+
+    def set_redis(self, client) -> None:
+        """Use `client` (redis.asyncio) for the buckets; None disables the Redis check."""
+        self._client = client
+        self._script = client.register_script(TOKEN_BUCKET_LUA) if client is not None else None
+
+    def rule_for(self, method: str, path: str) -> Optional[Rule]:
+        return self.rules.get((method, path))
+
+    def enter(self, rule: Rule) -> bool:
+        """Take an in-flight slot; False when the process is at max_in_flight."""
+        with self._in_flight_lock:
+            running = self._in_flight.get(rule.name, 0)
+            if rule.max_in_flight and running >= rule.max_in_flight:
+                return False
+            self._in_flight[rule.name] = running + 1
+            return True
+
+    def leave(self, rule: Rule) -> None:
+        with self._in_flight_lock:
+            self._in_flight[rule.name] -= 1
+
+    async def client_key(self, scope, rule: Rule) -> str:
+        """The bucket owner: "user:<id>" for per-user rules with a live session, else "ip:<address>"."""
+        if rule.per == "user" and self._client is not None:
+            sid = _session_id(scope)
+            if sid:
+                try:
+                    user_id = await sessions.session_user_id_async(self._client, sid)
+                except redis.RedisError:
+                    logger.warning("Session lookup failed for %s; limiting by address",
+                                   rule.name, exc_info=True)
+                    user_id = None
+                if user_id is not None:
+                    return f"user:{user_id}"
+        return _address_key(scope)
+
+    async def take(self, rule: Rule, client_key: str) -> Tuple[bool, float]:
+        """(allowed, seconds to wait) for one request; allowed when Redis is unavailable."""
+        if self._script is None:
+            return True, 0.0
+        key = f"{KEY_PREFIX}{rule.method}:{rule.path}:{client_key}"
+        try:
+            allowed, wait = await self._script(keys=[key], args=[rule.rate, rule.burst, 1])
+        except redis.RedisError:
+            logger.warning("Rate limit check failed for %s; letting the request through",
+                           rule.name, exc_info=True)
+            self.stats.record(rule, "errors")
+            return True, 0.0
+        return bool(int(allowed)), float(wait)
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers", ()):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def _session_id(scope) -> Optional[str]:
+    cookies = _header(scope, b"cookie")
+    if not cookies:
+        return None
+    for cookie in cookies.split(";"):
+        name, _, value = cookie.strip().partition("=")
+        if name == "SID" and value:
+            return value
+    return None
+
+
+def _address_key(scope) -> str:
+    """The "ip:<address>" bucket owner, for per-IP rules and unresolved sessions."""
+    if RATE_LIMIT_TRUST_FORWARDED:
+        forwarded = _header(scope, b"x-forwarded-for")
+        if forwarded:
+            return f"ip:{forwarded.split(',')[0].strip()}"
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+def _rejection(status: int, detail: str, retry_after: float) -> JSONResponse:
+    return JSONResponse(
+        status_code=status,
+        content={"detail": detail},
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+class RateLimitMiddleware:
+    """ASGI middleware applying `limiter` before the request reaches the app."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        rule = limiter.rule_for(scope["method"], scope["path"]) if scope["type"] == "http" else None
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not limiter.enter(rule):
+            limiter.stats.record(rule, "shed")
+            await _rejection(503, "Server busy, please retry shortly", 1)(scope, receive, send)
+            return
+        try:
+            allowed, wait = await limiter.take(rule, await limiter.client_key(scope, rule))
+            if not allowed:
+                limiter.stats.record(rule, "limited")
+                await _rejection(429, "Too many requests, please slow down", wait)(scope, receive, send)
+                return
+            limiter.stats.record(rule, "allowed")
+            await self.app(scope, receive, send)
+        finally:
+            limiter.leave(rule)
+
+
+# Shared per-process limiter; main.py gives it a Redis client at startup
+limiter = RateLimiter(parse_rules(RATE_LIMITS))
@@ -0,0 +1,345 @@
+"""
+Read-through Redis cache for recipe read endpoints.
+
+Cache keys embed two version counters: one per user and one global counter
+for the default recipes. Writers bump the relevant counter (a single INCR),
+which makes every older key unreachable without scanning or deleting
+anything; stale entries simply age out through their TTL.
+
+Version keys never expire, while cache entries always do, so running Redis
+with `maxmemory-policy volatile-lru` bounds memory without ever evicting
+a version counter.
+"""
+import hashlib
+import json
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+import redis
+import redis.asyncio as aioredis
+from fastapi import Response
+
+import fast_json
+from default_recipes import default_recipe_store
+from config import RECIPE_CACHE_ENABLED, RECIPE_CACHE_TTL, RECIPE_CACHE_MAX_ENTRY_BYTES
+from pagination import NEXT_CURSOR_HEADER
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_VERSION_KEY = "recipes:version:default"
+CACHE_KEY_PREFIX = "recipes:cache"
+
+
+def user_version_key(user_id: int) -> str:
+    return f"recipes:version:user:{user_id}"
+
+
+class CacheStats:
+    """Per-process cache counters, exposed by the /cache/stats route."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.oversized = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "oversized": self.oversized,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+stats = CacheStats()
+
+
+def render_json(content: Any) -> str:
+    """Encode content exactly like FastAPI's default JSONResponse."""
+    return fast_json.dumps(content)
+
+
+def json_response(body: str, next_cursor: Optional[str] = None) -> Response:
+    response = Response(content=body, media_type="application/json")
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return response
+
+
+def _versioned_key(user_id: int, endpoint: str, versions, params: dict) -> str:
+    default_version, user_version = versions
+    # Rebuild the default recipe snapshot before serving a new default version
+    default_recipe_store.observe_version(default_version)
+    encoded = json.dumps(params, sort_keys=True, separators=(",", ":"), default=str)
+    digest = hashlib.blake2b(encoded.encode("utf-8"), digest_size=12).hexdigest()
+    return (
+        f"{CACHE_KEY_PREFIX}:{endpoint}:u{user_id}"
+        f":d{default_version or 0}:v{user_version or 0}:{digest}"
+    )
+
+
+def _encode_value(body: str, next_cursor: Optional[str]) -> Optional[str]:
+    # Stored as "<next cursor>\n<json body>"; cursors never contain newlines
+    value = f"{next_cursor or ''}\n{body}"
+    if len(value.encode("utf-8")) > RECIPE_CACHE_MAX_ENTRY_BYTES:
+        stats.oversized += 1
+        return None
+    return value
+
+
+def _decode_value(value: Optional[str]) -> Optional[Tuple[str, Optional[str]]]:
+    if value is None:
+        stats.misses += 1
+        return None
+    stats.hits += 1
+    next_cursor, _, body = value.partition("\n")
+    return body, next_cursor or None
+
+
+def make_key(r: redis.Redis, user_id: int, endpoint: str, **params) -> Optional[str]:
+    """
+    Build the versioned cache key for one endpoint call. Returns None when
+    caching is disabled or Redis is unavailable, meaning "do not cache".
+    """
+    if not RECIPE_CACHE_ENABLED:
+        return None
+    try:
+        versions = r.mget(DEFAULT_VERSION_KEY, user_version_key(user_id))
+    except redis.RedisError:
+        stats.errors += 1
+        logger.warning("Recipe cache unavailable, reading from the database", exc_info=True)
+        return None
+    return _versioned_key(user_id, endpoint, versions, params)
+
+
+def make_keys(r: redis.Redis, user_id: int, endpoint: str, params: Sequence[dict]) -> Optional[List[str]]:
+    """make_key for many calls of one endpoint, reading the versions once."""
+    if not RECIPE_CACHE_ENABLED:
+        return None
+    try:
+        versions = r.mget(DEFAULT_VERSION_KEY, user_version_key(user_id))
+    except redis.RedisError:
+        stats.errors += 1
+        logger.warning("Recipe cache unavailable, reading from the database", exc_info=True)
+        return None
+    return [_versioned_key(user_id, endpoint, versions, call_params) for call_params in params]
+
+
+def _read(r: redis.Redis, key: str) -> Optional[Tuple[str, Optional[str]]]:
+    try:
+        value = r.get(key)
+    except redis.RedisError:
+        stats.errors += 1
+        return None
+    return _decode_value(value)
+
+
+def _write(r: redis.Redis, key: str, body: str, next_cursor: Optional[str]) -> None:
+    value = _encode_value(body, next_cursor)
+    if value is None:
+        return
+    try:
+        r.set(key, value, ex=RECIPE_CACHE_TTL)
+    except redis.RedisError:
+        stats.errors += 1
+
+
+def cached_response(
+    r: redis.Redis,
+    key: Optional[str],
+    compute: Callable[[], Tuple[Any, Optional[str]]],
+) -> Response:
+    """
+    Serve a JSON response from the cache, or build it with `compute` and
+    store it. `compute` returns (json-compatible content, next cursor).
+    Exceptions raised by `compute` (e.g. a 404) are never cached.
+    """
+    if key is not None:
+        hit = _read(r, key)
+        if hit is not None:
+            return json_response(*hit)
+
+    content, next_cursor = compute()
+    body = render_json(content)
+    if key is not None:
+        _write(r, key, body, next_cursor)
+    return json_response(body, next_cursor)
+
+
+# --- Batches of single-recipe entries ------------------------------
+def _batch_body(ids: Sequence[int], bodies: Sequence[Optional[str]]) -> str:
+    # Cached bodies are spliced in as they are, already rendered by render_json
+    items = [
+        f'{{"id":{recipe_id},"found":true,"recipe":{body}}}' if body is not None
+        else f'{{"id":{recipe_id},"found":false,"recipe":null}}'
+        for recipe_id, body in zip(ids, bodies)
+    ]
+    return "[" + ",".join(items) + "]"
+
+
+def _fill_missing(
+    keys: Optional[List[str]], ids: Sequence[int], bodies: List[Optional[str]], found: Dict[int, Any]
+) -> List[Tuple[str, str]]:
+    """Render the computed items into `bodies`; returns the (key, value) pairs to cache."""
+    writes = []
+    for i, recipe_id in enumerate(ids):
+        if bodies[i] is None and recipe_id in found:
+            bodies[i] = render_json(found[recipe_id])
+            value = _encode_value(bodies[i], None) if keys is not None else None
+            if value is not None:
+                writes.append((keys[i], value))
+    return writes
+
+
+def batch_response(
+    r: redis.Redis,
+    keys: Optional[List[str]],
+    ids: Sequence[int],
+    compute: Callable[[List[int]], Dict[int, Any]],
+) -> Response:
+    """
+    A JSON list of {"id", "found", "recipe"} items in the order of `ids`,
+    from the per-recipe entries at `keys` (one MGET). `compute` gets the
+    ids that missed and returns the recipes it found, by id; those are
+    cached in one pipeline. Ids that were not found are never cached.
+    """
+    bodies: List[Optional[str]] = [None] * len(ids)
+    if keys is not None:
+        try:
+            values = r.mget(keys)
+        except redis.RedisError:
+            stats.errors += 1
+            values = [None] * len(ids)
+        for i, value in enumerate(values):
+            hit = _decode_value(value)
+            if hit is not None:
+                bodies[i] = hit[0]
+
+    missing = [recipe_id for recipe_id, body in zip(ids, bodies) if body is None]
+    if missing:
+        writes = _fill_missing(keys, ids, bodies, compute(missing))
+        if writes:
+            try:
+                pipe = r.pipeline(transaction=False)
+                for key, value in writes:
+                    pipe.set(key, value, ex=RECIPE_CACHE_TTL)
+                pipe.execute()
+            except redis.RedisError:
+                stats.errors += 1
+    return json_response(_batch_body(ids, bodies))
+
+
+def bump_user_version(r: redis.Redis, user_id: int) -> None:
+    """Invalidate every cached read for one user."""
+    try:
+        r.incr(user_version_key(user_id))
+    except redis.RedisError:
+        logger.warning("Could not bump recipe cache version for user %s", user_id, exc_info=True)
+
+
+def bump_default_version(r: redis.Redis) -> None:
+    """Invalidate every cached read that includes default recipes."""
+    try:
+        r.incr(DEFAULT_VERSION_KEY)
+    except redis.RedisError:
+        logger.warning("Could not bump default recipe cache version", exc_info=True)
+
+
+# --- Async variants (redis.asyncio, ASYNC_MODE) -----------------
+async def make_key_async(r: aioredis.Redis, user_id: int, endpoint: str, **params) -> Optional[str]:
+    """Async version of make_key."""
+    if not RECIPE_CACHE_ENABLED:
+        return None
+    try:
+        versions = await r.mget(DEFAULT_VERSION_KEY, user_version_key(user_id))
+    except redis.RedisError:
+        stats.errors += 1
+        logger.warning("Recipe cache unavailable, reading from the database", exc_info=True)
+        return None
+    return _versioned_key(user_id, endpoint, versions, params)
+
+
+async def make_keys_async(
+    r: aioredis.Redis, user_id: int, endpoint: str, params: Sequence[dict]
+) -> Optional[List[str]]:
+    """Async version of make_keys."""
+    if not RECIPE_CACHE_ENABLED:
+        return None
+    try:
+        versions = await r.mget(DEFAULT_VERSION_KEY, user_version_key(user_id))
+    except redis.RedisError:
+        stats.errors += 1
+        logger.warning("Recipe cache unavailable, reading from the database", exc_info=True)
+        return None
+    return [_versioned_key(user_id, endpoint, versions, call_params) for call_params in params]
+
+
+async def cached_response_async(
+    r: aioredis.Redis,
+    key: Optional[str],
+    compute: Callable[[], Awaitable[Tuple[Any, Optional[str]]]],
+) -> Response:
+    """Async version of cached_response; `compute` is awaited."""
+    if key is not None:
+        try:
+            hit = _decode_value(await r.get(key))
+        except redis.RedisError:
+            stats.errors += 1
+            hit = None
+        if hit is not None:
+            return json_response(*hit)
+
+    content, next_cursor = await compute()
+    body = render_json(content)
+    if key is not None:
+        value = _encode_value(body, next_cursor)
+        if value is not None:
+            try:
+                await r.set(key, value, ex=RECIPE_CACHE_TTL)
+            except redis.RedisError:
+                stats.errors += 1
+    return json_response(body, next_cursor)
+
+
+async def batch_response_async(
+    r: aioredis.Redis,
+    keys: Optional[List[str]],
+    ids: Sequence[int],
+    compute: Callable[[List[int]], Awaitable[Dict[int, Any]]],
+) -> Response:
+    """Async version of batch_response; `compute` is awaited."""
+    bodies: List[Optional[str]] = [None] * len(ids)
+    if keys is not None:
+        try:
+            values = await r.mget(keys)
+        except redis.RedisError:
+            stats.errors += 1
+            values = [None] * len(ids)
+        for i, value in enumerate(values):
+            hit = _decode_value(value)
+            if hit is not None:
+                bodies[i] = hit[0]
+
+    missing = [recipe_id for recipe_id, body in zip(ids, bodies) if body is None]
+    if missing:
+        writes = _fill_missing(keys, ids, bodies, await compute(missing))
+        if writes:
+            try:
+                pipe = r.pipeline(transaction=False)
+                for key, value in writes:
+                    pipe.set(key, value, ex=RECIPE_CACHE_TTL)
+                await pipe.execute()
+            except redis.RedisError:
+                stats.errors += 1
+    return json_response(_batch_body(ids, bodies))
+
+
+async def bump_user_version_async(r: aioredis.Redis, user_id: int) -> None:
+    """Async version of bump_user_version."""
+    try:
+        await r.incr(user_version_key(user_id))
+    except redis.RedisError:
+        logger.warning("Could not bump recipe cache version for user %s", user_id, exc_info=True)
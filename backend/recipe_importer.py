@@ -0,0 +1,303 @@
+"""
+Bulk recipe importer from Spoonacular, for a user's recipes or the default
+recipes (user_id = NULL).
+
+Candidates come from paged searches over a list of queries. Recipes the
+owner already has are skipped by `external_id` (unique per owner) before
+any detail request is made; the rest are fetched concurrently through
+informationBulk and written in one multi-row INSERT ... ON CONFLICT DO
+NOTHING per page (plus one for their recipe_ingredients rows), committed
+page by page. Recipes seeded before `external_id` existed, which
+migration 007 could not backfill, are recognised after the detail
+request by (source_url, owner) and given their `external_id` instead of
+being inserted again, so later runs skip them up front. After each commit the search
+position is saved to a checkpoint file, so an interrupted import resumes
+where it stopped.
+
+Usage:
+    python recipe_importer.py [--user-email EMAIL] [--count N] [--queries pasta,soup]
+                              [--batch-size N] [--workers N] [--checkpoint PATH] [--restart]
+
+Without --user-email the recipes are imported as default recipes.
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence
+
+import redis
+from sqlalchemy import select, insert, update, literal_column
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+
+from config import REDIS_URL
+from database import SessionLocal, User, Recipe, RecipeIngredient
+from ingredient_index import ingredient_rows
+import recipe_cache
+from spoonacular_service import (
+    BULK_CHUNK_SIZE,
+    SpoonacularClient,
+    get_client,
+    convert_spoonacular_to_recipe,
+)
+
+DEFAULT_QUERIES = ["pasta", "chicken", "dessert", "salad", "soup", "pizza", "bread", "cake"]
+DEFAULT_CHECKPOINT = ".recipe_import.checkpoint.json"
+EXTERNAL_ID_PREFIX = "spoonacular:"
+# complexSearch returns at most 100 results per request
+MAX_PAGE_SIZE = 100
+
+
+@dataclass
+class ImportResult:
+    imported: int
+    skipped: int
+    elapsed: float
+
+    @property
+    def rate(self) -> float:
+        """Imported recipes per second."""
+        return self.imported / self.elapsed if self.elapsed > 0 else 0.0
+
+
+def external_id(spoonacular_id: int) -> str:
+    return f"{EXTERNAL_ID_PREFIX}{spoonacular_id}"
+
+
+def _owner_clause(user_id: Optional[int]):
+    return Recipe.user_id.is_(None) if user_id is None else Recipe.user_id == user_id
+
+
+def _existing_external_ids(db: Session, user_id: Optional[int], external_ids: List[str]) -> set:
+    if not external_ids:
+        return set()
+    return set(db.scalars(
+        select(Recipe.external_id)
+        .where(_owner_clause(user_id), Recipe.external_id.in_(external_ids))
+    ))
+
+
+def adopt_legacy_recipes(db: Session, user_id: Optional[int], rows: List[Dict]) -> List[Dict]:
+    """
+    Match converted rows against the owner's recipes without an
+    external_id by source_url; each match gets the row's external_id
+    instead of a duplicate being inserted. Returns the rows left to insert.
+    """
+    urls = {row["source_url"] for row in rows if row.get("source_url")}
+    if not urls:
+        return rows
+    legacy = {}
+    for recipe_id, source_url in db.execute(
+        select(Recipe.id, Recipe.source_url)
+        .where(_owner_clause(user_id), Recipe.external_id.is_(None), Recipe.source_url.in_(urls))
+        .order_by(Recipe.id)
+    ):
+        legacy.setdefault(source_url, recipe_id)
+
+    remaining, adopted = [], []
+    for row in rows:
+        recipe_id = legacy.pop(row.get("source_url"), None)
+        if recipe_id is None:
+            remaining.append(row)
+        else:
+            adopted.append({"id": recipe_id, "external_id": row["external_id"]})
+    if adopted:
+        db.execute(update(Recipe), adopted)
+    return remaining
+
+
+def insert_recipes(db: Session, rows: List[Dict]) -> List[int]:
+    """
+    Insert recipe rows and their recipe_ingredients rows in batched
+    statements, skipping recipes whose (external_id, owner) already
+    exists. Returns the ids actually inserted.
+    """
+    if not rows:
+        return []
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    stmt = (
+        dialect.insert(Recipe)
+        .on_conflict_do_nothing(index_elements=[
+            Recipe.external_id, func.coalesce(Recipe.user_id, literal_column("0"))
+        ])
+        .returning(Recipe.id, Recipe.external_id)
+    )
+    inserted = db.execute(stmt, rows).all()
+
+    ingredients_by_external_id = {row["external_id"]: row["ingredients"] for row in rows}
+    ingredient_batch = [
+        ingredient_row
+        for recipe_id, ext_id in inserted
+        for ingredient_row in ingredient_rows(recipe_id, ingredients_by_external_id[ext_id])
+    ]
+    if ingredient_batch:
+        db.execute(insert(RecipeIngredient), ingredient_batch)
+    return [recipe_id for recipe_id, _ in inserted]
+
+
+def _load_checkpoint(path: Optional[str], user_id: Optional[int], queries: Sequence[str]) -> Dict:
+    fresh = {"user_id": user_id, "queries": list(queries), "query_index": 0, "offset": 0, "imported": 0}
+    if not path or not os.path.exists(path):
+        return fresh
+    with open(path, "r", encoding="utf-8") as f:
+        state = json.load(f)
+    # A checkpoint from a different import does not apply
+    if state.get("user_id") != user_id or state.get("queries") != list(queries):
+        return fresh
+    return state
+
+
+def _save_checkpoint(path: Optional[str], state: Dict) -> None:
+    if not path:
+        return
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+def _fetch_concurrently(client: SpoonacularClient, ids: List[int], workers: int) -> List[Dict]:
+    if not ids:
+        return []
+    chunk_size = max(1, min(BULK_CHUNK_SIZE, math.ceil(len(ids) / max(1, workers))))
+    chunks = [ids[i:i + chunk_size] for i in range(0, len(ids), chunk_size)]
+    if len(chunks) == 1:
+        return client.get_recipes_bulk(chunks[0])
+    with ThreadPoolExecutor(max_workers=min(workers, len(chunks))) as pool:
+        return [recipe for batch in pool.map(client.get_recipes_bulk, chunks) for recipe in batch]
+
+
+def import_recipes(
+    db: Session,
+    num_recipes: int,
+    user_id: Optional[int] = None,
+    queries: Sequence[str] = DEFAULT_QUERIES,
+    client: Optional[SpoonacularClient] = None,
+    r: Optional[redis.Redis] = None,
+    batch_size: int = MAX_PAGE_SIZE,
+    workers: int = 4,
+    checkpoint_path: Optional[str] = DEFAULT_CHECKPOINT,
+    log: Callable[[str], None] = print,
+) -> ImportResult:
+    """
+    Import up to `num_recipes` new recipes for `user_id` (None = default
+    recipes). Progress counts towards `num_recipes` across resumed runs.
+    The checkpoint file is removed once the import completes.
+    """
+    client = client or get_client()
+    batch_size = max(1, min(batch_size, MAX_PAGE_SIZE))
+    state = _load_checkpoint(checkpoint_path, user_id, queries)
+    if state["imported"]:
+        log(f"Resuming: {state['imported']} recipes already imported")
+
+    start = time.monotonic()
+    imported = skipped = 0
+
+    while state["imported"] < num_recipes and state["query_index"] < len(queries):
+        query = queries[state["query_index"]]
+        results = client.search(query, number=batch_size, offset=state["offset"]).get("results", [])
+        candidate_ids = list(dict.fromkeys(result["id"] for result in results))
+
+        existing = _existing_external_ids(db, user_id, [external_id(i) for i in candidate_ids])
+        new_ids = [i for i in candidate_ids if external_id(i) not in existing]
+        new_ids = new_ids[:num_recipes - state["imported"]]
+        skipped += len(candidate_ids) - len(new_ids)
+
+        rows = []
+        for data in _fetch_concurrently(client, new_ids, workers):
+            row = convert_spoonacular_to_recipe(data)
+            row["external_id"] = external_id(data["id"])
+            row["user_id"] = user_id
+            rows.append(row)
+
+        inserted = insert_recipes(db, adopt_legacy_recipes(db, user_id, rows))
+        db.commit()
+        if inserted and r is not None:
+            # Invalidate cached recipe reads
+            if user_id is None:
+                recipe_cache.bump_default_version(r)
+            else:
+                recipe_cache.bump_user_version(r, user_id)
+
+        imported += len(inserted)
+        skipped += len(rows) - len(inserted)
+        state["imported"] += len(inserted)
+        if len(results) < batch_size:
+            state["query_index"] += 1
+            state["offset"] = 0
+        else:
+            state["offset"] += len(results)
+        _save_checkpoint(checkpoint_path, state)
+
+        elapsed = time.monotonic() - start
+        log(f"[{query}] +{len(inserted)} recipes, {state['imported']}/{num_recipes} total "
+            f"({imported / elapsed if elapsed > 0 else 0.0:.1f} recipes/sec)")
+
+    if checkpoint_path and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+    return ImportResult(imported=imported, skipped=skipped, elapsed=time.monotonic() - start)
+
+
+def run(user_email: Optional[str], num_recipes: int, **kwargs) -> Optional[ImportResult]:
+    """Open a session and Redis client, resolve the user, and run the import."""
+    db = SessionLocal()
+    try:
+        user_id = None
+        if user_email:
+            user = db.query(User).filter(User.email == user_email).first()
+            if not user:
+                print(f"User with email {user_email} not found!")
+                return None
+            user_id = user.id
+            print(f"Importing {num_recipes} recipes for user: {user.username}")
+        else:
+            print(f"Importing {num_recipes} default recipes for all users...")
+
+        result = import_recipes(db, num_recipes, user_id=user_id,
+                                r=redis.from_url(REDIS_URL, decode_responses=True), **kwargs)
+        print(f"\nImported {result.imported} recipes ({result.skipped} skipped) "
+              f"in {result.elapsed:.1f}s, {result.rate:.1f} recipes/sec")
+        return result
+    except Exception as e:
+        db.rollback()
+        print(f"Error: {e} (progress is checkpointed; re-run to resume)")
+        return None
+    finally:
+        db.close()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Import recipes from Spoonacular")
+    parser.add_argument("--user-email", help="import for this user (default: default recipes)")
+    parser.add_argument("--count", type=int, default=20, help="number of recipes to import")
+    parser.add_argument("--queries", default=",".join(DEFAULT_QUERIES),
+                        help="comma-separated search queries")
+    parser.add_argument("--batch-size", type=int, default=MAX_PAGE_SIZE,
+                        help=f"search page size and insert batch (max {MAX_PAGE_SIZE})")
+    parser.add_argument("--workers", type=int, default=4, help="concurrent detail requests")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT, help="checkpoint file path")
+    parser.add_argument("--restart", action="store_true", help="ignore an existing checkpoint")
+    args = parser.parse_args(argv)
+
+    if args.restart and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+
+    result = run(
+        args.user_email, args.count,
+        queries=[q.strip() for q in args.queries.split(",") if q.strip()],
+        batch_size=args.batch_size,
+        workers=args.workers,
+        checkpoint_path=args.checkpoint,
+    )
+    return 0 if result is not None else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""
+Relevance-ranked recipe search on title and description.
+
+On PostgreSQL this uses the full-text GIN index and the pg_trgm indexes
+created by migration 003. Other databases (SQLite in tests) get a portable
+ILIKE fallback with a simple title-over-description ranking.
+"""
+from datetime import datetime
+from typing import Optional, Sequence, Tuple
+
+from sqlalchemy import Float, and_, case, func, literal_column, or_, select
+from sqlalchemy.sql import Select
+
+from database import Recipe
+from pagination import before
+
+# Must stay identical to the expression indexed by ix_recipes_search_document,
+# otherwise Postgres will not use the index.
+SEARCH_DOCUMENT_SQL = (
+    "setweight(to_tsvector('english'::regconfig, coalesce(recipes.title, '')), 'A') || "
+    "setweight(to_tsvector('english'::regconfig, coalesce(recipes.description, '')), 'B')"
+)
+
+
+def visible_to(user_id: int):
+    """Filter for the recipes a user can see: their own plus default recipes."""
+    return or_(
+        Recipe.user_id == user_id,  # User's own recipes
+        Recipe.user_id.is_(None)  # Default recipes for all users
+    )
+
+
+def _postgres_match_and_rank(q: str, search_term: str):
+    document = literal_column(f"({SEARCH_DOCUMENT_SQL})")
+    ts_query = func.websearch_to_tsquery(literal_column("'english'::regconfig"), q)
+
+    match = or_(
+        document.op("@@")(ts_query),
+        # Partial words, served by the gin_trgm_ops indexes
+        Recipe.title.ilike(search_term),
+        and_(Recipe.description.isnot(None), Recipe.description.ilike(search_term))
+    )
+    # Cast to double precision so the value round-trips exactly through a cursor
+    rank = (func.ts_rank(document, ts_query) + func.similarity(Recipe.title, q)).cast(Float)
+    return match, rank
+
+
+def _fallback_match_and_rank(search_term: str):
+    title_match = Recipe.title.ilike(search_term)
+    description_match = and_(Recipe.description.isnot(None), Recipe.description.ilike(search_term))
+
+    match = or_(title_match, description_match)
+    rank = (
+        case((title_match, 2), else_=0)
+        + case((description_match, 1), else_=0)
+    )
+    return match, rank
+
+
+def build_search_query(
+    dialect_name: str,
+    q: str,
+    user_id: int,
+    after: Optional[Tuple[float, datetime, int]] = None,
+    columns: Optional[Sequence] = None,
+) -> Select:
+    """
+    Build the search SELECT for the given database dialect, ordered by
+    relevance and then by creation date (newest first).
+
+    Rows are (Recipe, relevance), or (*columns, relevance) when `columns`
+    is given. `after` is the (relevance, created_at, id) key of the last
+    row of the previous page, for cursor pagination.
+    """
+    q = q.strip()
+    search_term = f"%{q}%"
+
+    if dialect_name == "postgresql":
+        match, rank = _postgres_match_and_rank(q, search_term)
+    else:
+        match, rank = _fallback_match_and_rank(search_term)
+
+    query = select(*(columns or [Recipe]), rank.label("relevance")).where(
+        and_(visible_to(user_id), match)
+    )
+    if after is not None:
+        query = query.where(before((rank, Recipe.created_at, Recipe.id), after))
+    return query.order_by(rank.desc(), Recipe.created_at.desc(), Recipe.id.desc())
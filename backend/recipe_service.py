@@ -0,0 +1,351 @@
+"""
+Recipe read/write logic shared by the sync and async routers.
+
+Every function takes a sync Session. The sync routes call them directly;
+the async routes run them on an AsyncSession through `run_sync`, so the
+queries are the same in both modes and only the I/O driver differs.
+The export helpers are the exception: a streamed response outlives the
+request's session, so they open their own.
+"""
+import heapq
+import zlib
+from datetime import datetime
+from itertools import islice
+from operator import attrgetter
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+import fast_json
+from config import EXPORT_BATCH_SIZE, RECIPE_BATCH_MAX_IDS
+from database import Recipe, RecipeIngredient
+from models.schemas import RecipeResponse, RecipeSummary, RecipeCreate
+from ingredient_index import ingredient_index, ingredient_names, ingredient_rows
+from recipe_search import build_search_query, visible_to
+from pagination import encode_cursor, own_recipe_page_query, recipe_page_query
+from default_recipes import default_recipe_store
+from pantry_matcher import pantry_matcher
+from autocomplete import autocomplete
+
+
+# RecipeResponse / RecipeSummary fields, in order; each is also a Recipe column
+RESPONSE_FIELDS = tuple(RecipeResponse.model_fields)
+SUMMARY_FIELDS = tuple(RecipeSummary.model_fields)
+
+
+def response_columns(fields: Sequence[str] = RESPONSE_FIELDS) -> list:
+    """The Recipe columns behind `fields`, for row-tuple queries."""
+    return [getattr(Recipe, name) for name in fields]
+
+
+def view_fields(summary: bool) -> Tuple[str, ...]:
+    """Fields selected for a list view: RecipeSummary when `summary`, else RecipeResponse."""
+    return SUMMARY_FIELDS if summary else RESPONSE_FIELDS
+
+
+def dump_rows(rows, fields: Sequence[str] = RESPONSE_FIELDS) -> List[dict]:
+    """
+    Response dicts built straight from rows of response_columns(fields), in
+    field order. Database values are trusted and not re-validated;
+    fast_json renders them byte for byte as the response_model path would.
+    """
+    items = []
+    for row in rows:
+        item = dict(zip(fields, row))
+        if "ingredients" in item:
+            item["ingredients"] = fast_json.ingredients_value(item["ingredients"])
+        items.append(item)
+    return items
+
+
+def normalize_ingredients(ingredients: List[str]) -> List[str]:
+    """Lowercase and strip search ingredients, rejecting empty input."""
+    if not ingredients:
+        raise HTTPException(status_code=400, detail="At least one ingredient is required")
+
+    search_ingredients = [ing.lower().strip() for ing in ingredients if ing.strip()]
+
+    if not search_ingredients:
+        raise HTTPException(status_code=400, detail="No valid ingredients provided")
+    return search_ingredients
+
+
+def parse_ids(ids: str) -> List[int]:
+    """Distinct recipe ids from a comma-separated list, in order; 400 if invalid or too many."""
+    try:
+        parsed = list(dict.fromkeys(int(part) for part in ids.split(",") if part.strip()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be comma-separated integers")
+    if not parsed:
+        raise HTTPException(status_code=400, detail="At least one id is required")
+    if len(parsed) > RECIPE_BATCH_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {RECIPE_BATCH_MAX_IDS} ids per request")
+    return parsed
+
+
+def _newest_first(row):
+    return row.created_at, row.id
+
+
+def list_page(
+    db: Session,
+    user_id: int,
+    limit: int,
+    offset: int = 0,
+    after: Optional[Tuple[datetime, int]] = None,
+    summary: bool = False,
+) -> Tuple[List[dict], Optional[str]]:
+    """
+    One newest-first page of visible recipes and the cursor for the next
+    page. With `summary`, only the RecipeSummary columns are read.
+
+    With a default recipe snapshot, only the user's own recipes come from
+    the database and are merged with the snapshot's.
+    """
+    fields = view_fields(summary)
+    if after is not None:
+        offset = 0  # the cursor replaces the offset
+    snapshot = default_recipe_store.get(db)
+    if snapshot is None:
+        query = recipe_page_query(user_id, limit, offset=offset, after=after, columns=fields)
+        rows = db.execute(query).all()
+    else:
+        wanted = offset + limit
+        own = db.execute(own_recipe_page_query(user_id, wanted, after=after, columns=fields)).all()
+        merged = heapq.merge(own, snapshot.newest(wanted, after), key=_newest_first, reverse=True)
+        rows = [attrgetter(*fields)(row) for row in islice(merged, offset, wanted)]
+    next_cursor = None
+    if len(rows) == limit:
+        last = dict(zip(fields, rows[-1]))
+        next_cursor = encode_cursor((last["created_at"], last["id"]))
+    return dump_rows(rows, fields), next_cursor
+
+
+def search_page(
+    db: Session,
+    user_id: int,
+    q: str,
+    limit: int,
+    offset: int = 0,
+    after: Optional[Tuple[float, datetime, int]] = None,
+    summary: bool = False,
+) -> Tuple[List[dict], Optional[str]]:
+    """
+    One relevance-ranked page of search results and the next cursor. With
+    `summary`, only the RecipeSummary columns are read.
+    """
+    fields = view_fields(summary)
+    # Ranked full-text/trigram search (ILIKE fallback outside Postgres)
+    query = build_search_query(
+        db.get_bind().dialect.name, q, user_id, after=after, columns=response_columns(fields)
+    ).limit(limit)
+    if after is None:
+        query = query.offset(offset)
+
+    rows = db.execute(query).all()
+    next_cursor = None
+    if len(rows) == limit:
+        last = rows[-1]
+        next_cursor = encode_cursor((last.relevance, last.created_at, last.id))
+    return dump_rows((row[:-1] for row in rows), fields), next_cursor
+
+
+def ingredient_search(
+    db: Session,
+    user_id: int,
+    search_ingredients: List[str],
+    match_all: bool,
+    limit: int,
+    offset: int,
+    exact: bool = False,
+) -> List[dict]:
+    """
+    Recipes matching the given (normalized) ingredients, best match first;
+    with `exact`, by canonical name instead of substring. With a default
+    recipe snapshot, only the user's own matches come from the database
+    and are merged with the snapshot's.
+    """
+    if not exact:
+        ingredient_index.sync(db)
+    snapshot = default_recipe_store.get(db)
+    wanted = offset + limit
+    query = ingredient_index.search_query(
+        search_ingredients,
+        user_id=user_id,
+        match_all=match_all,
+        limit=limit if snapshot is None else wanted,
+        offset=offset if snapshot is None else 0,
+        own_only=snapshot is not None,
+        columns=response_columns(),
+        exact=exact,
+    )
+    own = db.execute(query).all() if query is not None else []
+    if snapshot is None:
+        return dump_rows(row[:-1] for row in own)
+
+    # Own rows keep their trailing match_count; dump_rows stops at the last field
+    ranked = heapq.merge(
+        ((row.match_count, row) for row in own),
+        snapshot.ingredient_matches(search_ingredients, match_all, wanted, exact),
+        key=lambda match: (match[0], _newest_first(match[1])),
+        reverse=True,
+    )
+    return dump_rows(row for _, row in islice(ranked, offset, wanted))
+
+
+def pantry_search(
+    db: Session,
+    user_id: int,
+    pantry: List[str],
+    limit: int,
+    max_missing: Optional[int] = None,
+) -> List[dict]:
+    """
+    Visible recipes ranked by how much of them the (normalized) pantry
+    covers, as RecipeSummary dicts with matched_count, missing_count and
+    match_ratio. Scoring runs in memory; only the winners are read.
+    """
+    pantry_matcher.sync(db)
+    matches = pantry_matcher.match(user_id, pantry, limit, max_missing)
+    if not matches:
+        return []
+
+    rows = db.execute(
+        select(*response_columns(SUMMARY_FIELDS))
+        .where(Recipe.id.in_([match.recipe_id for match in matches]), visible_to(user_id))
+    ).all()
+    by_id = {item["id"]: item for item in dump_rows(rows, SUMMARY_FIELDS)}
+    results = []
+    for match in matches:
+        item = by_id.get(match.recipe_id)
+        if item is not None:
+            item.update(matched_count=match.matched, missing_count=match.missing,
+                        match_ratio=round(match.ratio, 4))
+            results.append(item)
+    return results
+
+
+def suggest(db: Session, user_id: int, q: str, limit: int) -> dict:
+    """Typeahead titles and ingredient names for `q`, from the in-memory index."""
+    autocomplete.sync(db)
+    return autocomplete.suggest(user_id, q, limit)
+
+
+def get_one(db: Session, user_id: int, recipe_id: int) -> dict:
+    """A single visible recipe, or 404."""
+    snapshot = default_recipe_store.get(db)
+    row = snapshot.get(recipe_id) if snapshot is not None else None
+    if row is None:
+        owner_filter = visible_to(user_id) if snapshot is None else Recipe.user_id == user_id
+        row = db.execute(
+            select(*response_columns()).where(Recipe.id == recipe_id, owner_filter)
+        ).first()
+
+    if not row:
+        raise HTTPException(status_code=404, detail="Recipe not found")
+
+    return dump_rows([row])[0]
+
+
+def get_many(db: Session, user_id: int, recipe_ids: Sequence[int]) -> Dict[int, dict]:
+    """
+    The visible recipes among `recipe_ids`, by id, with the visibility rules
+    of get_one: default recipes from the snapshot, the rest in one IN query.
+    """
+    snapshot = default_recipe_store.get(db)
+    rows = []
+    wanted = list(recipe_ids)
+    if snapshot is not None:
+        rows = [row for row in map(snapshot.get, wanted) if row is not None]
+        found = {row.id for row in rows}
+        wanted = [recipe_id for recipe_id in wanted if recipe_id not in found]
+    if wanted:
+        owner_filter = visible_to(user_id) if snapshot is None else Recipe.user_id == user_id
+        rows += db.execute(
+            select(*response_columns()).where(Recipe.id.in_(wanted), owner_filter)
+        ).all()
+    return {item["id"]: item for item in dump_rows(rows)}
+
+
+def export_query(user_id: int):
+    """
+    All of the user's own recipes, oldest first, read through a server-side
+    cursor EXPORT_BATCH_SIZE rows at a time.
+    """
+    return (
+        select(*response_columns())
+        .where(Recipe.user_id == user_id)
+        .order_by(Recipe.id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+
+
+def ndjson_chunk(rows) -> bytes:
+    """Rows of export_query as NDJSON: one RecipeResponse object per line."""
+    return "".join(fast_json.dumps(item) + "\n" for item in dump_rows(rows)).encode("utf-8")
+
+
+def export_ndjson(session_factory: Callable[[], Session], user_id: int) -> Iterator[bytes]:
+    """
+    The user's recipes as NDJSON, one chunk per cursor batch. Only one
+    batch is held at a time, so memory does not grow with the export.
+    The session comes from `session_factory` and is closed when the
+    iteration ends or is abandoned.
+    """
+    with session_factory() as db:
+        for rows in db.execute(export_query(user_id)).partitions():
+            yield ndjson_chunk(rows)
+
+
+class GzipStream:
+    """Incremental gzip for a streamed body: feed chunks, then finish()."""
+
+    def __init__(self):
+        self._compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+
+    def compress(self, chunk: bytes) -> bytes:
+        """Compressed bytes for `chunk`, flushed so the client can decode them now."""
+        return self._compressor.compress(chunk) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+def gzip_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """`chunks` as one gzip stream."""
+    stream = GzipStream()
+    for chunk in chunks:
+        yield stream.compress(chunk)
+    yield stream.finish()
+
+
+def create(db: Session, user_id: int, recipe: RecipeCreate) -> Recipe:
+    """Insert a recipe owned by `user_id`, with its recipe_ingredients rows."""
+    # Convert ingredients to JSON format
+    ingredients_json = [{"name": ing.name, "quantity": ing.quantity, "unit": ing.unit} for ing in recipe.ingredients]
+
+    db_recipe = Recipe(
+        title=recipe.title,
+        description=recipe.description,
+        ingredients=ingredients_json,
+        instructions=recipe.instructions,
+        prep_time=recipe.prep_time,
+        cook_time=recipe.cook_time,
+        servings=recipe.servings,
+        source_url=recipe.source_url,
+        user_id=user_id
+    )
+    db_recipe.recipe_ingredients = [
+        RecipeIngredient(**row) for row in ingredient_rows(None, ingredients_json)
+    ]
+
+    db.add(db_recipe)
+    db.commit()
+    db.refresh(db_recipe)
+    ingredient_index.add_names(ingredient_names(ingredients_json))
+    pantry_matcher.add_recipe(db_recipe.id, user_id, db_recipe.created_at,
+                              ingredient_names(ingredients_json))
+    autocomplete.add_recipe(user_id, db_recipe.title, ingredient_names(ingredients_json))
+    return db_recipe
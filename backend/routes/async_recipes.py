@@ -0,0 +1,224 @@
+# Async (ASYNC_MODE) counterpart of recipes.py. Query logic lives in
+# recipe_service and runs on the AsyncSession through run_sync.
+from datetime import datetime
+from typing import List, Optional, Union
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+import redis.asyncio as aioredis
+
+from database import User, get_async_db
+from models.schemas import (
+    RecipeResponse,
+    RecipeSummary,
+    IngredientSearchRequest,
+    PantryRequest,
+    PantryMatchResponse,
+    AutocompleteResponse,
+    BatchRecipeItem,
+    RecipeCreate
+)
+from dependencies import (
+    get_current_user_async, get_async_redis, get_async_read_db, mark_recent_write_async,
+    get_async_read_session_factory
+)
+from pagination import decode_cursor
+import recipe_cache
+import recipe_service
+
+router = APIRouter(prefix="/api/recipes", tags=["recipes"])
+
+@router.get("/search", response_model=Union[List[RecipeResponse], List[RecipeSummary]])
+async def search_recipes(
+    q: str = Query(..., description="Search query"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="Cursor from X-Next-Cursor; replaces offset"),
+    summary: bool = Query(False, description="Return RecipeSummary items (no description, ingredients or instructions)"),
+    db: AsyncSession = Depends(get_async_read_db),
+    r: aioredis.Redis = Depends(get_async_redis),
+    current_user: User = Depends(get_current_user_async)
+):
+    """
+    Search recipes by title or description (user's recipes + default recipes).
+    Results are ordered by relevance, then by creation date.
+    When a full page is returned, X-Next-Cursor holds the cursor for the next one.
+    With summary=true only the RecipeSummary columns are read and returned.
+    """
+    if not q or not q.strip():
+        return []
+
+    after = decode_cursor(cursor, (float, datetime, int)) if cursor else None
+    key = await recipe_cache.make_key_async(r, current_user.id, "search",
+                                            q=q.strip(), limit=limit, offset=offset, cursor=cursor,
+                                            summary=summary)
+    return await recipe_cache.cached_response_async(
+        r, key,
+        lambda: db.run_sync(recipe_service.search_page, current_user.id, q, limit, offset, after, summary)
+    )
+
+@router.get("/batch", response_model=List[BatchRecipeItem])
+async def get_recipes_batch(
+    ids: str = Query(..., description="Comma-separated recipe ids, e.g. 12,7,31"),
+    db: AsyncSession = Depends(get_async_read_db),
+    r: aioredis.Redis = Depends(get_async_redis),
+    current_user: User = Depends(get_current_user_async)
+):
+    """
+    Get several recipes by ID in one call (user's recipes + default recipes).
+    Items come back in the requested order; ids that do not exist or are not
+    visible have found=false and recipe=null.
+    """
+    recipe_ids = recipe_service.parse_ids(ids)
+    keys = await recipe_cache.make_keys_async(
+        r, current_user.id, "recipe", [{"id": recipe_id} for recipe_id in recipe_ids]
+    )
+
+    async def compute(missing):
+        return await db.run_sync(recipe_service.get_many, current_user.id, missing)
+
+    return await recipe_cache.batch_response_async(r, keys, recipe_ids, compute)
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_recipes(
+    gzip: bool = Query(False, description="Compress the stream (Content-Encoding: gzip)"),
+    session_factory=Depends(get_async_read_session_factory),
+    current_user: User = Depends(get_current_user_async)
+):
+    """
+    Export all of the user's own recipes as NDJSON, one RecipeResponse per
+    line, oldest first. Rows are streamed from a server-side cursor, so the
+    response starts at once and memory stays flat however many there are.
+    """
+    user_id = current_user.id
+
+    # The request's session is closed before the body is sent: open one here
+    async def chunks():
+        stream = recipe_service.GzipStream() if gzip else None
+        async with session_factory() as db:
+            result = await db.stream(recipe_service.export_query(user_id))
+            async for rows in result.partitions():
+                chunk = recipe_service.ndjson_chunk(rows)
+                yield stream.compress(chunk) if stream else chunk
+        if stream:
+            yield stream.finish()
+
+    headers = {"Content-Disposition": 'attachment; filename="recipes.ndjson"'}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(chunks(), media_type="application/x-ndjson", headers=headers)
+
+@router.get("/autocomplete", response_model=AutocompleteResponse)
+async def autocomplete_recipes(
+    q: str = Query(..., description="What the user has typed so far"),
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    """
+    Typeahead for the search box (user's recipes + default recipes):
+    recipe titles and ingredient names with a word starting with q.
+    Served from memory, so it is cheap enough to call on every keystroke.
+    """
+    results = await db.run_sync(recipe_service.suggest, current_user.id, q, limit)
+    return recipe_cache.json_response(recipe_cache.render_json(results))
+
+@router.post("/search/ingredients", response_model=List[RecipeResponse])
+async def search_by_ingredients(
+    search_request: IngredientSearchRequest,
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    """
+    Search recipes by ingredients (user's recipes only).
+    If match_all is True, recipe must contain all ingredients.
+    If match_all is False, recipe must contain any of the ingredients.
+    If exact is True, ingredients match by canonical name instead of substring.
+    Results are ranked by number of matching ingredients.
+    """
+    search_ingredients = recipe_service.normalize_ingredients(search_request.ingredients)
+
+    results = await db.run_sync(
+        recipe_service.ingredient_search, current_user.id, search_ingredients,
+        search_request.match_all, search_request.limit, search_request.offset,
+        search_request.exact
+    )
+    return recipe_cache.json_response(recipe_cache.render_json(results))
+
+
+@router.post("/pantry", response_model=List[PantryMatchResponse])
+async def search_by_pantry(
+    pantry_request: PantryRequest,
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    """
+    What can I cook with what I have (user's recipes + default recipes).
+    Recipes using at least one pantry ingredient, ranked by the share of
+    their ingredients the pantry covers, then by fewest missing ingredients.
+    """
+    pantry = recipe_service.normalize_ingredients(pantry_request.ingredients)
+
+    results = await db.run_sync(
+        recipe_service.pantry_search, current_user.id, pantry,
+        pantry_request.limit, pantry_request.max_missing
+    )
+    return recipe_cache.json_response(recipe_cache.render_json(results))
+
+
+@router.get("", response_model=Union[List[RecipeResponse], List[RecipeSummary]])
+async def list_recipes(
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="Cursor from X-Next-Cursor; replaces offset"),
+    summary: bool = Query(False, description="Return RecipeSummary items (no description, ingredients or instructions)"),
+    db: AsyncSession = Depends(get_async_read_db),
+    r: aioredis.Redis = Depends(get_async_redis),
+    current_user: User = Depends(get_current_user_async)
+):
+    """
+    List all recipes with pagination (user's recipes only).
+    Pages by offset, or by cursor for infinite scroll: when a full page is
+    returned, X-Next-Cursor holds the cursor for the next one.
+    With summary=true only the RecipeSummary columns are read and returned.
+    """
+    after = decode_cursor(cursor, (datetime, int)) if cursor else None
+    key = await recipe_cache.make_key_async(r, current_user.id, "list",
+                                            limit=limit, offset=offset, cursor=cursor,
+                                            summary=summary)
+    return await recipe_cache.cached_response_async(
+        r, key,
+        lambda: db.run_sync(recipe_service.list_page, current_user.id, limit, offset, after, summary)
+    )
+
+
+@router.post("", response_model=RecipeResponse)
+async def create_recipe(
+    recipe: RecipeCreate,
+    db: AsyncSession = Depends(get_async_db),
+    r: aioredis.Redis = Depends(get_async_redis),
+    current_user: User = Depends(get_current_user_async)
+):
+    """Create a new recipe."""
+    db_recipe = await db.run_sync(recipe_service.create, current_user.id, recipe)
+    await mark_recent_write_async(r, current_user.id)
+    await recipe_cache.bump_user_version_async(r, current_user.id)
+
+    return db_recipe
+
+
+@router.get("/{recipe_id}", response_model=RecipeResponse)
+async def get_recipe(
+    recipe_id: int,
+    db: AsyncSession = Depends(get_async_read_db),
+    r: aioredis.Redis = Depends(get_async_redis),
+    current_user: User = Depends(get_current_user_async)
+):
+    """
+    Get a single recipe by ID (user's recipes only).
+    """
+    async def compute():
+        return await db.run_sync(recipe_service.get_one, current_user.id, recipe_id), None
+
+    key = await recipe_cache.make_key_async(r, current_user.id, "recipe", id=recipe_id)
+    return await recipe_cache.cached_response_async(r, key, compute)
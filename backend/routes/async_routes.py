@@ -0,0 +1,120 @@
+# Async (ASYNC_MODE) counterpart of routes.py: same endpoints, running on
+# the event loop with AsyncSession and redis.asyncio instead of the threadpool.
+from typing import Optional
+from fastapi import APIRouter, Depends, Response, HTTPException, Cookie
+from sqlalchemy import text, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError
+import redis.asyncio as aioredis
+
+from models.schemas import User_in, User_out, LoginRequest
+from helper import get_uuid, set_auth_cookie, delete_auth_cookie
+from password_pool import password_pool
+from database import User, get_async_db
+from dependencies import get_async_redis, get_current_user_async
+from config import DEV_MODE
+import recipe_cache
+import metrics
+import db_pool
+import rate_limit
+from sessions import create_session_async, delete_session_async
+
+router = APIRouter()
+
+
+# --- Routes ----------------------------------------------------
+@router.get("/ping-db")
+async def ping_db(db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(text("SELECT 1"))
+    return {"db": result.scalar_one()}
+
+@router.get("/ping-redis")
+async def ping_redis(r: aioredis.Redis = Depends(get_async_redis)):
+    await r.set("ping", "pong", ex=10)
+    value = await r.get("ping")
+    return {"redis": value}
+
+@router.get("/cache/stats")
+async def cache_stats():
+    # Per-process recipe cache counters
+    return recipe_cache.stats.as_dict()
+
+@router.get("/db/stats")
+async def db_stats():
+    # Per-process connection pool usage, by engine
+    return db_pool.stats()
+
+@router.get("/rate-limit/stats")
+async def rate_limit_stats():
+    # Per-process rate limiting decisions, by rule
+    return rate_limit.limiter.stats.as_dict()
+
+@router.get("/metrics")
+async def prometheus_metrics():
+    # Per-process request, DB and Redis metrics (Prometheus text format)
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+@router.post("/register", response_model=User_out)
+async def register(*, user: User_in,
+                   db: AsyncSession = Depends(get_async_db),
+                   response: Response,
+                   r: aioredis.Redis = Depends(get_async_redis)
+                   ):
+    # bcrypt runs in the password pool, off the event loop
+    new_user = User(
+        username=user.username,
+        email=user.email,
+        hash_password=await password_pool.hash_password_async(user.password)
+        )
+    db.add(new_user)
+
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Email already exists")
+    await db.refresh(new_user)
+    # create a cookie for user
+    SID = get_uuid()
+    set_auth_cookie(response, SID)
+    await create_session_async(r, SID, new_user)
+    return new_user
+
+@router.get("/auth/me", response_model=User_out)
+async def authenticate(current_user: User = Depends(get_current_user_async),
+                       response: Response = None,
+                       r: aioredis.Redis = Depends(get_async_redis),
+                       ) -> User_out:
+    # In dev mode, optionally set a cookie for consistency with frontend
+    if DEV_MODE:
+        dev_session_id = "dev_session"
+        set_auth_cookie(response, dev_session_id)
+        await create_session_async(r, dev_session_id, current_user)
+
+    return current_user
+
+@router.post("/logout")
+async def logout(response: Response, SID: Optional[str] = Cookie(None), r: aioredis.Redis = Depends(get_async_redis)):
+    if SID:
+        await delete_session_async(r, SID)
+    delete_auth_cookie(response)
+    return {"message": "You have been logged out"}
+
+@router.get("/users")
+async def get_users(db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(select(User))
+    return result.scalars().all()
+
+@router.post("/auth/login", response_model=User_out)
+async def login(*, login_request: LoginRequest,
+                db: AsyncSession = Depends(get_async_db),
+                response: Response,
+                r: aioredis.Redis = Depends(get_async_redis)):
+    curr_user = await db.scalar(select(User).where(User.email == login_request.email))
+    if curr_user and await password_pool.verify_password_async(login_request.password, curr_user.hash_password):
+        SID = get_uuid()
+        set_auth_cookie(response, SID)
+        await create_session_async(r, SID, curr_user)
+        return curr_user
+    else:
+        raise HTTPException(status_code=401, detail="Incorrect email or password")
@@ -1,220 +1,210 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, Query
+from datetime import datetime
+from typing import List, Optional, Union
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import select, or_, and_
+import redis
 
-from database import Recipe, User, get_db
+from database import User, get_db
 from models.schemas import (
-    RecipeResponse, 
+    RecipeResponse,
+    RecipeSummary,
     IngredientSearchRequest,
+    PantryRequest,
+    PantryMatchResponse,
+    AutocompleteResponse,
+    BatchRecipeItem,
     RecipeCreate
 )
-from dependencies import get_current_user
+from dependencies import (
+    get_current_user, get_redis, get_read_db, get_read_session_factory, mark_recent_write
+)
+from pagination import decode_cursor
+import recipe_cache
+import recipe_service
 
 router = APIRouter(prefix="/api/recipes", tags=["recipes"])
 
-@router.get("/search", response_model=List[RecipeResponse])
+@router.get("/search", response_model=Union[List[RecipeResponse], List[RecipeSummary]])
 def search_recipes(
     q: str = Query(..., description="Search query"),
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, description="Cursor from X-Next-Cursor; replaces offset"),
+    summary: bool = Query(False, description="Return RecipeSummary items (no description, ingredients or instructions)"),
+    db: Session = Depends(get_read_db),
+    r: redis.Redis = Depends(get_redis),
     current_user: User = Depends(get_current_user)
 ):
     """
     Search recipes by title or description (user's recipes + default recipes).
+    Results are ordered by relevance, then by creation date.
+    When a full page is returned, X-Next-Cursor holds the cursor for the next one.
+    With summary=true only the RecipeSummary columns are read and returned.
     """
     # Validate search query
     if not q or not q.strip():
         return []
-    
-    # Case-insensitive search on title and description
-    search_term = f"%{q.strip()}%"
-    query = select(Recipe).where(
-        and_(
-            or_(
-                Recipe.user_id == current_user.id,  # User's own recipes
-                Recipe.user_id.is_(None)  # Default recipes for all users
-            ),
-            or_(
-                Recipe.title.ilike(search_term),
-                and_(Recipe.description.isnot(None), Recipe.description.ilike(search_term))
-            )
-        )
-    ).limit(limit).offset(offset).order_by(Recipe.created_at.desc())
-    
-    recipes = db.scalars(query).all()
-    return recipes
+
+    after = decode_cursor(cursor, (float, datetime, int)) if cursor else None
+    key = recipe_cache.make_key(r, current_user.id, "search",
+                                q=q.strip(), limit=limit, offset=offset, cursor=cursor,
+                                summary=summary)
+    return recipe_cache.cached_response(
+        r, key,
+        lambda: recipe_service.search_page(db, current_user.id, q, limit, offset, after, summary)
+    )
+
+@router.get("/batch", response_model=List[BatchRecipeItem])
+def get_recipes_batch(
+    ids: str = Query(..., description="Comma-separated recipe ids, e.g. 12,7,31"),
+    db: Session = Depends(get_read_db),
+    r: redis.Redis = Depends(get_redis),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get several recipes by ID in one call (user's recipes + default recipes).
+    Items come back in the requested order; ids that do not exist or are not
+    visible have found=false and recipe=null.
+    """
+    recipe_ids = recipe_service.parse_ids(ids)
+    keys = recipe_cache.make_keys(
+        r, current_user.id, "recipe", [{"id": recipe_id} for recipe_id in recipe_ids]
+    )
+    return recipe_cache.batch_response(
+        r, keys, recipe_ids,
+        lambda missing: recipe_service.get_many(db, current_user.id, missing)
+    )
+
+@router.get("/export", response_class=StreamingResponse)
+def export_recipes(
+    gzip: bool = Query(False, description="Compress the stream (Content-Encoding: gzip)"),
+    session_factory=Depends(get_read_session_factory),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Export all of the user's own recipes as NDJSON, one RecipeResponse per
+    line, oldest first. Rows are streamed from a server-side cursor, so the
+    response starts at once and memory stays flat however many there are.
+    """
+    chunks = recipe_service.export_ndjson(session_factory, current_user.id)
+    headers = {"Content-Disposition": 'attachment; filename="recipes.ndjson"'}
+    if gzip:
+        chunks = recipe_service.gzip_chunks(chunks)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(chunks, media_type="application/x-ndjson", headers=headers)
+
+@router.get("/autocomplete", response_model=AutocompleteResponse)
+def autocomplete_recipes(
+    q: str = Query(..., description="What the user has typed so far"),
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Typeahead for the search box (user's recipes + default recipes):
+    recipe titles and ingredient names with a word starting with q.
+    Served from memory, so it is cheap enough to call on every keystroke.
+    """
+    results = recipe_service.suggest(db, current_user.id, q, limit)
+    return recipe_cache.json_response(recipe_cache.render_json(results))
 
 @router.post("/search/ingredients", response_model=List[RecipeResponse])
 def search_by_ingredients(
     search_request: IngredientSearchRequest,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Search recipes by ingredients (user's recipes only).
     If match_all is True, recipe must contain all ingredients.
     If match_all is False, recipe must contain any of the ingredients.
+    If exact is True, ingredients match by canonical name instead of substring.
     Results are ranked by number of matching ingredients.
     """
-    if not search_request.ingredients:
-        raise HTTPException(status_code=400, detail="At least one ingredient is required")
-    
     # Normalize ingredient names (lowercase for comparison)
-    search_ingredients = [ing.lower().strip() for ing in search_request.ingredients if ing.strip()]
-    
-    if not search_ingredients:
-        raise HTTPException(status_code=400, detail="No valid ingredients provided")
-    
-    # Get user's recipes only
-    all_recipes = db.scalars(
-        select(Recipe).where(
-            or_(
-                Recipe.user_id == current_user.id,  # User's own recipes
-                Recipe.user_id.is_(None)  # Default recipes for all users
-            )
-        )
-    ).all()
-
-    def count_matches(recipe: Recipe) -> int:
-        """Count how many search ingredients match the recipe's ingredients."""
-        if not recipe.ingredients:
-            return 0
-        
-        # Extract ingredient names from recipe (handle both dict and string formats)
-        recipe_ingredient_names = []
-        for ing in recipe.ingredients:
-            if isinstance(ing, dict):
-                name = ing.get("name", "").lower()
-            elif isinstance(ing, str):
-                name = ing.lower()
-            else:
-                continue
-            recipe_ingredient_names.append(name)
-        
-        # Count matches (check if search ingredient is contained in any recipe ingredient)
-        matches = 0
-        for search_ing in search_ingredients:
-            for recipe_ing in recipe_ingredient_names:
-                if search_ing in recipe_ing or recipe_ing in search_ing:
-                    matches += 1
-                    break  # Count each search ingredient only once
-        
-        return matches
-    
-    def has_all_ingredients(recipe: Recipe) -> bool:
-        """Check if recipe contains all search ingredients."""
-        if not recipe.ingredients:
-            return False
-        
-        # Extract ingredient names from recipe
-        recipe_ingredient_names = []
-        for ing in recipe.ingredients:
-            if isinstance(ing, dict):
-                name = ing.get("name", "").lower()
-            elif isinstance(ing, str):
-                name = ing.lower()
-            else:
-                continue
-            recipe_ingredient_names.append(name)
-        
-        # Check if all search ingredients are found
-        for search_ing in search_ingredients:
-            found = False
-            for recipe_ing in recipe_ingredient_names:
-                if search_ing in recipe_ing or recipe_ing in search_ing:
-                    found = True
-                    break
-            if not found:
-                return False
-        return True
-    
-    # Filter recipes based on match_all flag
-    if search_request.match_all:
-        filtered_recipes = [r for r in all_recipes if has_all_ingredients(r)]
-    else:
-        filtered_recipes = [r for r in all_recipes if count_matches(r) > 0]
-    
-    # Sort by match count (descending) and then by creation date
-    sorted_recipes = sorted(filtered_recipes, key=lambda r: (count_matches(r), r.created_at), reverse=True)
-    
-    # Apply pagination
-    start = search_request.offset
-    end = start + search_request.limit
-    paginated_recipes = sorted_recipes[start:end]
-    
-    return paginated_recipes
-
-
-@router.get("", response_model=List[RecipeResponse])
+    search_ingredients = recipe_service.normalize_ingredients(search_request.ingredients)
+
+    results = recipe_service.ingredient_search(
+        db, current_user.id, search_ingredients,
+        search_request.match_all, search_request.limit, search_request.offset,
+        search_request.exact
+    )
+    return recipe_cache.json_response(recipe_cache.render_json(results))
+
+
+@router.post("/pantry", response_model=List[PantryMatchResponse])
+def search_by_pantry(
+    pantry_request: PantryRequest,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    What can I cook with what I have (user's recipes + default recipes).
+    Recipes using at least one pantry ingredient, ranked by the share of
+    their ingredients the pantry covers, then by fewest missing ingredients.
+    """
+    pantry = recipe_service.normalize_ingredients(pantry_request.ingredients)
+
+    results = recipe_service.pantry_search(
+        db, current_user.id, pantry, pantry_request.limit, pantry_request.max_missing
+    )
+    return recipe_cache.json_response(recipe_cache.render_json(results))
+
+
+@router.get("", response_model=Union[List[RecipeResponse], List[RecipeSummary]])
 def list_recipes(
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, description="Cursor from X-Next-Cursor; replaces offset"),
+    summary: bool = Query(False, description="Return RecipeSummary items (no description, ingredients or instructions)"),
+    db: Session = Depends(get_read_db),
+    r: redis.Redis = Depends(get_redis),
     current_user: User = Depends(get_current_user)
 ):
     """
     List all recipes with pagination (user's recipes only).
+    Pages by offset, or by cursor for infinite scroll: when a full page is
+    returned, X-Next-Cursor holds the cursor for the next one.
+    With summary=true only the RecipeSummary columns are read and returned.
     """
-    query = select(Recipe).where(
-        or_(
-            Recipe.user_id == current_user.id,  # User's own recipes
-            Recipe.user_id.is_(None)  # Default recipes for all users
-        )
-    ).limit(limit).offset(offset).order_by(Recipe.created_at.desc())
-    recipes = db.scalars(query).all()
-    return recipes
+    after = decode_cursor(cursor, (datetime, int)) if cursor else None
+    key = recipe_cache.make_key(r, current_user.id, "list",
+                                limit=limit, offset=offset, cursor=cursor,
+                                summary=summary)
+    return recipe_cache.cached_response(
+        r, key,
+        lambda: recipe_service.list_page(db, current_user.id, limit, offset, after, summary)
+    )
 
 
 @router.post("", response_model=RecipeResponse)
 def create_recipe(
     recipe: RecipeCreate,
     db: Session = Depends(get_db),
+    r: redis.Redis = Depends(get_redis),
     current_user: User = Depends(get_current_user)
 ):
     """Create a new recipe."""
-    # Convert ingredients to JSON format
-    ingredients_json = [{"name": ing.name, "quantity": ing.quantity, "unit": ing.unit} for ing in recipe.ingredients]
-    
-    db_recipe = Recipe(
-        title=recipe.title,
-        description=recipe.description,
-        ingredients=ingredients_json,
-        instructions=recipe.instructions,
-        prep_time=recipe.prep_time,
-        cook_time=recipe.cook_time,
-        servings=recipe.servings,
-        source_url=recipe.source_url,
-        user_id=current_user.id
-    )
-    
-    db.add(db_recipe)
-    db.commit()
-    db.refresh(db_recipe)
-    
+    db_recipe = recipe_service.create(db, current_user.id, recipe)
+    mark_recent_write(r, current_user.id)
+    recipe_cache.bump_user_version(r, current_user.id)
+
     return db_recipe
 
 
 @router.get("/{recipe_id}", response_model=RecipeResponse)
 def get_recipe(
     recipe_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
+    r: redis.Redis = Depends(get_redis),
     current_user: User = Depends(get_current_user)
 ):
     """
     Get a single recipe by ID (user's recipes only).
     """
-    query = select(Recipe).where(
-        Recipe.id == recipe_id,
-        or_(
-            Recipe.user_id == current_user.id,
-            Recipe.user_id.is_(None)
-        )
+    key = recipe_cache.make_key(r, current_user.id, "recipe", id=recipe_id)
+    return recipe_cache.cached_response(
+        r, key,
+        lambda: (recipe_service.get_one(db, current_user.id, recipe_id), None)
     )
-    recipe = db.scalar(query)
-    
-    if not recipe:
-        raise HTTPException(status_code=404, detail="Recipe not found")
-    
-    return recipe
\ No newline at end of file
@@ -6,10 +6,16 @@ from sqlalchemy.exc import IntegrityError
 import redis
 
 from models.schemas import User_in, User_out, LoginRequest
-from helper import hash_password, get_user_by_email, get_uuid, verify_password, set_auth_cookie, delete_auth_cookie
+from helper import get_user_by_email, get_uuid, set_auth_cookie, delete_auth_cookie
+from password_pool import password_pool
 from database import User, get_db
 from dependencies import get_redis, get_current_user
 from config import DEV_MODE
+import recipe_cache
+import metrics
+import db_pool
+import rate_limit
+from sessions import create_session, delete_session
 
 router = APIRouter()
 
@@ -26,6 +32,26 @@ def ping_redis(r: redis.Redis = Depends(get_redis)):
     value = r.get("ping")
     return {"redis": value}
 
+@router.get("/cache/stats")
+def cache_stats():
+    # Per-process recipe cache counters
+    return recipe_cache.stats.as_dict()
+
+@router.get("/db/stats")
+def db_stats():
+    # Per-process connection pool usage, by engine
+    return db_pool.stats()
+
+@router.get("/rate-limit/stats")
+def rate_limit_stats():
+    # Per-process rate limiting decisions, by rule
+    return rate_limit.limiter.stats.as_dict()
+
+@router.get("/metrics")
+def prometheus_metrics():
+    # Per-process request, DB and Redis metrics (Prometheus text format)
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 @router.post("/register", response_model=User_out)
 def register(*, user: User_in, 
            db: Session = Depends(get_db), 
@@ -36,7 +62,7 @@ def register(*, user: User_in,
     new_user = User(
         username=user.username, 
         email=user.email, 
-        hash_password=hash_password(user.password)
+        hash_password=password_pool.hash_password(user.password)
         )
     # adds to database
     db.add(new_user)
@@ -52,7 +78,7 @@ def register(*, user: User_in,
     # create a cookie for user
     SID = get_uuid()
     set_auth_cookie(response, SID)
-    r.setex(name=SID, time=60*60*24, value=str(new_user.id)) # <-- IMPORTANT -- Change samesite and secure when deploying
+    create_session(r, SID, new_user) # <-- IMPORTANT -- Change samesite and secure when deploying
     return new_user
 
 @router.get("/auth/me", response_model=User_out)
@@ -64,7 +90,7 @@ def authenticate(current_user: User = Depends(get_current_user),
     if DEV_MODE:
         dev_session_id = "dev_session"
         set_auth_cookie(response, dev_session_id)
-        r.setex(name=dev_session_id, time=60*60*24, value=str(current_user.id))
+        create_session(r, dev_session_id, current_user)
     
     # Return user data (User_out schema will exclude hash_password)
     return current_user
@@ -73,7 +99,7 @@ def authenticate(current_user: User = Depends(get_current_user),
 def logout(response: Response, SID: Optional[str] = Cookie(None), r: redis.Redis = Depends(get_redis)):
     # Delete session from Redis if exists
     if SID:
-        r.delete(SID)
+        delete_session(r, SID)
     # Delete the cookie from the browser with same parameters as setting
     delete_auth_cookie(response)
     return {"message": "You have been logged out"}
@@ -93,11 +119,11 @@ def login(*, login_request: LoginRequest,
     # find user through inputted email
     curr_user = get_user_by_email(login_request.email, db)
     # verify password and email
-    if curr_user and verify_password(login_request.password, curr_user.hash_password):
+    if curr_user and password_pool.verify_password(login_request.password, curr_user.hash_password):
         # create new cookie if verified
         SID = get_uuid()
         set_auth_cookie(response, SID)
-        r.setex(name=SID, time=60*60*24, value=str(curr_user.id)) # <-- IMPORTANT -- Change samesite and secure when deploying
+        create_session(r, SID, curr_user) # <-- IMPORTANT -- Change samesite and secure when deploying
         return curr_user
     else:
         raise HTTPException(status_code=401, detail="Incorrect email or password")
@@ -0,0 +1,317 @@
+"""
+Session storage and session-to-user resolution.
+
+A session is a Redis hash keyed by the SID cookie holding a compact user
+payload (id, username, email). Resolved sessions are kept in a small
+per-process TTL/LRU cache, so most requests need neither Redis nor the
+database. A cache miss reads the hash (sliding the session's expiry
+forward) and re-checks the user row, so deleted users are rejected as
+they were before the cache.
+
+Revocations reach every worker: logout (delete_session) and
+invalidate_user publish on REVOCATION_CHANNEL, and each process applies
+them to its cache from listen_for_revocations(). While that listener is
+not subscribed the cache is bypassed, since revocations could be missed.
+
+Sessions written before this module stored the bare user id as a string;
+those are still accepted and upgraded to a hash on first use.
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import redis
+import redis.asyncio as aioredis
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import SESSION_TTL, SESSION_CACHE_TTL, SESSION_CACHE_SIZE
+from database import User
+
+logger = logging.getLogger(__name__)
+
+REVOCATION_CHANNEL = "sessions:revoked"
+
+
+class LocalSessionCache:
+    """Thread-safe TTL + LRU map of SID -> user payload."""
+
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        # False while revocations cannot be received; see listen_for_revocations
+        self.active = True
+
+    def set_active(self, active: bool) -> None:
+        """Turn the cache on or off; it is emptied either way."""
+        with self._lock:
+            self.active = active
+            self._entries.clear()
+
+    def get(self, sid: str) -> Optional[Dict[str, str]]:
+        now = time.monotonic()
+        with self._lock:
+            if not self.active:
+                return None
+            entry = self._entries.get(sid)
+            if entry is None:
+                return None
+            expires_at, payload = entry
+            if expires_at <= now:
+                del self._entries[sid]
+                return None
+            self._entries.move_to_end(sid)
+            return payload
+
+    def put(self, sid: str, payload: Dict[str, str]) -> None:
+        if self.ttl <= 0 or self.max_size <= 0:
+            return
+        with self._lock:
+            if not self.active:
+                return
+            self._entries[sid] = (time.monotonic() + self.ttl, payload)
+            self._entries.move_to_end(sid)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def pop(self, sid: str) -> None:
+        with self._lock:
+            self._entries.pop(sid, None)
+
+    def pop_user(self, user_id: int) -> None:
+        user_id = str(user_id)
+        with self._lock:
+            for sid in [sid for sid, (_, payload) in self._entries.items() if payload["id"] == user_id]:
+                del self._entries[sid]
+
+
+local_cache = LocalSessionCache(ttl=SESSION_CACHE_TTL, max_size=SESSION_CACHE_SIZE)
+
+
+def _payload(user: User) -> Dict[str, str]:
+    return {"id": str(user.id), "username": user.username or "", "email": user.email or ""}
+
+
+def _payload_user_id(payload: Dict[str, str]) -> int:
+    try:
+        return int(payload["id"])
+    except (KeyError, ValueError, TypeError):
+        raise HTTPException(status_code=401, detail="Invalid session data")
+
+
+def _user_from_payload(payload: Dict[str, str]) -> User:
+    """Build a detached User carrying only the session fields."""
+    return User(id=_payload_user_id(payload), username=payload.get("username"), email=payload.get("email"))
+
+
+def _revoke_locally(message) -> None:
+    """Apply one REVOCATION_CHANNEL message ("sid:<sid>" or "user:<id>") to the local cache."""
+    if isinstance(message, bytes):
+        message = message.decode()
+    kind, _, value = message.partition(":")
+    if kind == "sid":
+        local_cache.pop(value)
+    elif kind == "user":
+        local_cache.pop_user(value)
+
+
+def parse_session_user_id(user_id_str) -> int:
+    """Validate a legacy (string) session value and return the user ID."""
+    if not user_id_str:
+        raise HTTPException(status_code=401, detail="Invalid or expired session")
+
+    # Convert user ID from string to int (Redis stores as string)
+    try:
+        return int(user_id_str)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=401, detail="Invalid session data")
+
+
+# --- Sync (redis-py) -------------------------------------------
+def create_session(r: redis.Redis, sid: str, user: User) -> None:
+    """Store a new session for `user` under `sid`."""
+    payload = _payload(user)
+    pipe = r.pipeline(transaction=False)
+    pipe.delete(sid)
+    pipe.hset(sid, mapping=payload)
+    pipe.expire(sid, SESSION_TTL)
+    pipe.execute()
+    local_cache.put(sid, payload)
+
+
+def delete_session(r: redis.Redis, sid: str) -> None:
+    """End a session (logout), in every worker's cache too."""
+    local_cache.pop(sid)
+    pipe = r.pipeline(transaction=False)
+    pipe.delete(sid)
+    pipe.publish(REVOCATION_CHANNEL, f"sid:{sid}")
+    pipe.execute()
+
+
+def invalidate_user(r: redis.Redis, user_id: int) -> None:
+    """
+    Drop every worker's cached sessions for a user. Call it after deleting
+    a user or changing their details: the next request of each session
+    then re-reads the user row, and is rejected if it is gone.
+    """
+    local_cache.pop_user(user_id)
+    r.publish(REVOCATION_CHANNEL, f"user:{user_id}")
+
+
+def _check_user(r: redis.Redis, sid: str, user: Optional[User]) -> User:
+    """`user`, or 401 (ending the session) when its row no longer exists."""
+    if user is None:
+        r.delete(sid)
+        raise HTTPException(status_code=401, detail="User not found")
+    return user
+
+
+def load_session_user(r: redis.Redis, sid: str, db: Session) -> User:
+    """
+    Resolve a SID to its user: local cache, then one Redis round trip
+    (HGETALL + sliding EXPIRE) and the user row. Raises 401 for unknown or
+    expired sessions and for deleted users.
+    """
+    payload = local_cache.get(sid)
+    if payload is not None:
+        return _user_from_payload(payload)
+
+    pipe = r.pipeline(transaction=False)
+    pipe.hgetall(sid)
+    pipe.expire(sid, SESSION_TTL)
+    try:
+        payload, _ = pipe.execute()
+    except redis.ResponseError:
+        # Legacy session: plain string holding the user id
+        user_id = parse_session_user_id(r.get(sid))
+        user = db.scalar(select(User).where(User.id == user_id))
+        if not user:
+            raise HTTPException(status_code=401, detail="User not found")
+        create_session(r, sid, user)
+        return user
+
+    if not payload:
+        raise HTTPException(status_code=401, detail="Invalid or expired session")
+    user_id = _payload_user_id(payload)
+    user = _check_user(r, sid, db.scalar(select(User).where(User.id == user_id)))
+    local_cache.put(sid, _payload(user))
+    return user
+
+
+# --- Async (redis.asyncio, ASYNC_MODE) -------------------------
+async def create_session_async(r: aioredis.Redis, sid: str, user: User) -> None:
+    """Async version of create_session."""
+    payload = _payload(user)
+    pipe = r.pipeline(transaction=False)
+    pipe.delete(sid)
+    pipe.hset(sid, mapping=payload)
+    pipe.expire(sid, SESSION_TTL)
+    await pipe.execute()
+    local_cache.put(sid, payload)
+
+
+async def delete_session_async(r: aioredis.Redis, sid: str) -> None:
+    """Async version of delete_session."""
+    local_cache.pop(sid)
+    pipe = r.pipeline(transaction=False)
+    pipe.delete(sid)
+    pipe.publish(REVOCATION_CHANNEL, f"sid:{sid}")
+    await pipe.execute()
+
+
+async def invalidate_user_async(r: aioredis.Redis, user_id: int) -> None:
+    """Async version of invalidate_user."""
+    local_cache.pop_user(user_id)
+    await r.publish(REVOCATION_CHANNEL, f"user:{user_id}")
+
+
+async def session_user_id_async(r: aioredis.Redis, sid: str) -> Optional[int]:
+    """The user id `sid` belongs to, or None when it is not a live session.
+
+    Cheap enough to run before routing: a cache hit or one Redis read, with
+    no database check and no expiry refresh.
+    """
+    payload = local_cache.get(sid)
+    if payload is None:
+        try:
+            value = await r.hget(sid, "id")
+        except redis.ResponseError:
+            # Legacy session: plain string holding the user id
+            value = await r.get(sid)
+        payload = {"id": value}
+    try:
+        return _payload_user_id(payload)
+    except HTTPException:
+        return None
+
+
+async def _check_user_async(r: aioredis.Redis, sid: str, user: Optional[User]) -> User:
+    """Async version of _check_user."""
+    if user is None:
+        await r.delete(sid)
+        raise HTTPException(status_code=401, detail="User not found")
+    return user
+
+
+async def load_session_user_async(r: aioredis.Redis, sid: str, db: AsyncSession) -> User:
+    """Async version of load_session_user."""
+    payload = local_cache.get(sid)
+    if payload is not None:
+        return _user_from_payload(payload)
+
+    pipe = r.pipeline(transaction=False)
+    pipe.hgetall(sid)
+    pipe.expire(sid, SESSION_TTL)
+    try:
+        payload, _ = await pipe.execute()
+    except redis.ResponseError:
+        # Legacy session: plain string holding the user id
+        user_id = parse_session_user_id(await r.get(sid))
+        user = await db.scalar(select(User).where(User.id == user_id))
+        if not user:
+            raise HTTPException(status_code=401, detail="User not found")
+        await create_session_async(r, sid, user)
+        return user
+
+    if not payload:
+        raise HTTPException(status_code=401, detail="Invalid or expired session")
+    user_id = _payload_user_id(payload)
+    user = await _check_user_async(r, sid, await db.scalar(select(User).where(User.id == user_id)))
+    local_cache.put(sid, _payload(user))
+    return user
+
+
+async def listen_for_revocations(client: aioredis.Redis, retry_seconds: float = 1.0) -> None:
+    """
+    Apply revocations published by any worker to this process's cache,
+    until cancelled. The cache is only used while subscribed: it is
+    emptied and turned off whenever the subscription drops, and back on
+    once it is restored.
+    """
+    while True:
+        pubsub = client.pubsub(ignore_subscribe_messages=True)
+        try:
+            await pubsub.subscribe(REVOCATION_CHANNEL)
+            local_cache.set_active(True)
+            async for message in pubsub.listen():
+                _revoke_locally(message["data"])
+        except (redis.RedisError, OSError):
+            logger.warning("Session revocation listener disconnected; bypassing the session cache",
+                           exc_info=True)
+        finally:
+            local_cache.set_active(False)
+            await pubsub.aclose()
+        await asyncio.sleep(retry_seconds)
+
+
+def start_revocation_listener(client: aioredis.Redis) -> asyncio.Task:
+    """Run listen_for_revocations in the background; the cache stays off until it subscribes."""
+    local_cache.set_active(False)
+    return asyncio.create_task(listen_for_revocations(client))
@@ -1,66 +1,297 @@
 """
 Spoonacular API service for searching and fetching recipes.
+
+SpoonacularClient keeps one pooled HTTP session (connection reuse, timeouts,
+retry with backoff on 429/5xx), throttles itself with a token bucket, and
+caches responses on disk or in Redis so repeated seeding runs do not spend
+API quota. Point SPOONACULAR_BASE_URL at `spoonacular_stub.py` to run
+without the live API.
 """
-import requests
+import hashlib
+import json
+import os
 import re
-from typing import Dict, List, Optional
-from config import SPOONACULAR_API_KEY, SPOONACULAR_BASE_URL
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from config import (
+    SPOONACULAR_API_KEY,
+    SPOONACULAR_BASE_URL,
+    SPOONACULAR_TIMEOUT,
+    SPOONACULAR_MAX_RETRIES,
+    SPOONACULAR_RATE_LIMIT,
+    SPOONACULAR_CACHE,
+    SPOONACULAR_CACHE_DIR,
+    SPOONACULAR_CACHE_TTL,
+    REDIS_URL,
+)
+
+# informationBulk accepts a comma-separated id list; keep requests modest
+BULK_CHUNK_SIZE = 50
+
+
+class TokenBucket:
+    """Blocking token bucket: `rate` tokens per second, bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class DiskCache:
+    """JSON files under `directory`, expired by modification time."""
+
+    def __init__(self, directory: str, ttl: int):
+        self.directory = directory
+        self.ttl = ttl
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(key.encode("utf-8")).hexdigest() + ".json")
+
+    def get(self, key: str) -> Optional[Dict]:
+        path = self._path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def set(self, key: str, value: Dict) -> None:
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(value, f)
+        os.replace(tmp_path, path)
+
+
+class RedisCache:
+    """Redis strings with a TTL, under the `spoonacular:` prefix."""
+
+    def __init__(self, client, ttl: int):
+        self.client = client
+        self.ttl = ttl
+
+    def get(self, key: str) -> Optional[Dict]:
+        value = self.client.get(f"spoonacular:{key}")
+        return json.loads(value) if value is not None else None
+
+    def set(self, key: str, value: Dict) -> None:
+        self.client.set(f"spoonacular:{key}", json.dumps(value), ex=self.ttl)
+
+
+def make_cache(kind: str = SPOONACULAR_CACHE):
+    """Build the response cache selected by SPOONACULAR_CACHE (disk, redis or none)."""
+    if kind == "disk":
+        return DiskCache(SPOONACULAR_CACHE_DIR, SPOONACULAR_CACHE_TTL)
+    if kind == "redis":
+        import redis
+        return RedisCache(redis.from_url(REDIS_URL, decode_responses=True), SPOONACULAR_CACHE_TTL)
+    return None
+
+
+class SpoonacularClient:
+    """Pooled, rate-limited, caching client for the Spoonacular recipe API."""
+
+    def __init__(
+        self,
+        api_key: str = SPOONACULAR_API_KEY,
+        base_url: str = SPOONACULAR_BASE_URL,
+        timeout: float = SPOONACULAR_TIMEOUT,
+        max_retries: int = SPOONACULAR_MAX_RETRIES,
+        rate_limit: float = SPOONACULAR_RATE_LIMIT,
+        cache=None,
+        pool_size: int = 10,
+    ):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.cache = cache
+        self.bucket = TokenBucket(rate_limit)
+
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(["GET"]),
+            respect_retry_after_header=True,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def close(self) -> None:
+        self.session.close()
+
+    @staticmethod
+    def _cache_key(path: str, params: Dict) -> str:
+        # The API key is deliberately not part of the key
+        return path + "?" + json.dumps(params, sort_keys=True, separators=(",", ":"))
+
+    def _get(self, path: str, params: Dict) -> Dict:
+        key = self._cache_key(path, params)
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        self.bucket.acquire()
+        response = self.session.get(
+            f"{self.base_url}{path}",
+            params={"apiKey": self.api_key, **params},
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        data = response.json()
+
+        if self.cache is not None:
+            self.cache.set(key, data)
+        return data
+
+    def search(self, query: str, number: int = 10, offset: int = 0) -> Dict:
+        """Search recipes; returns a dict with a 'results' list of summaries."""
+        return self._get("/recipes/complexSearch", {
+            "query": query,
+            "number": number,
+            "offset": offset,
+            "addRecipeInformation": False,  # We'll fetch full details separately
+        })
+
+    def get_recipe(self, recipe_id: int) -> Dict:
+        """Full recipe information for one id."""
+        return self._get(f"/recipes/{recipe_id}/information", {"includeNutrition": False})
+
+    def get_recipes_bulk(self, recipe_ids: Iterable[int]) -> List[Dict]:
+        """
+        Full recipe information for many ids, in input order. Cached ids are
+        served from the cache; the rest are fetched with informationBulk,
+        one request per BULK_CHUNK_SIZE ids, and cached individually so
+        get_recipe shares the same entries.
+        """
+        recipe_ids = list(recipe_ids)
+        found: Dict[int, Dict] = {}
+        missing = []
+        for recipe_id in recipe_ids:
+            cached = None
+            if self.cache is not None:
+                cached = self.cache.get(
+                    self._cache_key(f"/recipes/{recipe_id}/information", {"includeNutrition": False})
+                )
+            if cached is not None:
+                found[recipe_id] = cached
+            else:
+                missing.append(recipe_id)
+
+        for start in range(0, len(missing), BULK_CHUNK_SIZE):
+            chunk = missing[start:start + BULK_CHUNK_SIZE]
+            self.bucket.acquire()
+            response = self.session.get(
+                f"{self.base_url}/recipes/informationBulk",
+                params={
+                    "apiKey": self.api_key,
+                    "ids": ",".join(str(recipe_id) for recipe_id in chunk),
+                    "includeNutrition": False,
+                },
+                timeout=self.timeout,
+            )
+            response.raise_for_status()
+            for data in response.json():
+                found[data["id"]] = data
+                if self.cache is not None:
+                    self.cache.set(
+                        self._cache_key(f"/recipes/{data['id']}/information", {"includeNutrition": False}),
+                        data,
+                    )
+
+        return [found[recipe_id] for recipe_id in recipe_ids if recipe_id in found]
+
+
+_default_client: Optional[SpoonacularClient] = None
+_default_client_lock = threading.Lock()
+
+
+def get_client() -> SpoonacularClient:
+    """Shared client configured from environment settings."""
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = SpoonacularClient(cache=make_cache())
+        return _default_client
 
 
 def search_spoonacular_recipes(query: str, number: int = 10, offset: int = 0) -> Dict:
     """
     Search for recipes using Spoonacular API.
-    
+
     Args:
         query: Search query string
         number: Number of results to return (default: 10)
         offset: Number of results to skip (default: 0)
-    
+
     Returns:
         Dictionary with 'results' key containing list of recipe summaries
     """
-    url = f"{SPOONACULAR_BASE_URL}/recipes/complexSearch"
-    params = {
-        "apiKey": SPOONACULAR_API_KEY,
-        "query": query,
-        "number": number,
-        "offset": offset,
-        "addRecipeInformation": False,  # We'll fetch full details separately
-    }
-    
-    response = requests.get(url, params=params)
-    response.raise_for_status()
-    return response.json()
+    return get_client().search(query, number=number, offset=offset)
 
 
 def get_spoonacular_recipe(recipe_id: int) -> Dict:
     """
     Get full recipe information by ID from Spoonacular API.
-    
+
     Args:
         recipe_id: Spoonacular recipe ID
-    
+
     Returns:
         Dictionary with full recipe information
     """
-    url = f"{SPOONACULAR_BASE_URL}/recipes/{recipe_id}/information"
-    params = {
-        "apiKey": SPOONACULAR_API_KEY,
-        "includeNutrition": False,
-    }
-    
-    response = requests.get(url, params=params)
-    response.raise_for_status()
-    return response.json()
+    return get_client().get_recipe(recipe_id)
+
+
+def get_spoonacular_recipes_bulk(recipe_ids: Iterable[int]) -> List[Dict]:
+    """
+    Get full recipe information for many IDs in as few requests as possible.
+
+    Args:
+        recipe_ids: Spoonacular recipe IDs
+
+    Returns:
+        List of full recipe dictionaries, in input order (unknown IDs omitted)
+    """
+    return get_client().get_recipes_bulk(recipe_ids)
 
 
 def convert_spoonacular_to_recipe(spoonacular_data: Dict) -> Dict:
     """
     Convert Spoonacular recipe format to our internal recipe format.
-    
+
     Args:
         spoonacular_data: Recipe data from Spoonacular API
-    
+
     Returns:
         Dictionary in our internal recipe format
     """
@@ -72,7 +303,7 @@ def convert_spoonacular_to_recipe(spoonacular_data: Dict) -> Dict:
             "quantity": str(ingredient.get("amount", "")),
             "unit": ingredient.get("unit", "")
         })
-    
+
     # Extract instructions
     instructions = ""
     analyzed_instructions = spoonacular_data.get("analyzedInstructions", [])
@@ -80,11 +311,11 @@ def convert_spoonacular_to_recipe(spoonacular_data: Dict) -> Dict:
         steps = analyzed_instructions[0].get("steps", [])
         instruction_list = [step.get("step", "") for step in steps]
         instructions = "\n".join(instruction_list)
-    
+
     # Extract prep and cook time
     prep_time = spoonacular_data.get("preparationMinutes")
     cook_time = spoonacular_data.get("cookingMinutes")
-    
+
     # If total time is available but prep/cook are not, estimate
     if not prep_time and not cook_time:
         total_time = spoonacular_data.get("readyInMinutes")
@@ -92,7 +323,7 @@ def convert_spoonacular_to_recipe(spoonacular_data: Dict) -> Dict:
             # Rough estimate: 30% prep, 70% cook
             prep_time = int(total_time * 0.3)
             cook_time = int(total_time * 0.7)
-    
+
     # Clean HTML tags from description
     description = spoonacular_data.get("summary", "")
     if description:
@@ -100,7 +331,7 @@ def convert_spoonacular_to_recipe(spoonacular_data: Dict) -> Dict:
         description = re.sub(r'<[^>]+>', '', description)
         # Limit length
         description = description[:500] if len(description) > 500 else description
-    
+
     return {
         "title": spoonacular_data.get("title", ""),
         "description": description if description else None,
@@ -111,4 +342,3 @@ def convert_spoonacular_to_recipe(spoonacular_data: Dict) -> Dict:
         "servings": spoonacular_data.get("servings"),
         "source_url": spoonacular_data.get("sourceUrl") or spoonacular_data.get("spoonacularSourceUrl"),
     }
-
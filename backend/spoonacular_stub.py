@@ -0,0 +1,115 @@
+"""
+Local stand-in for the Spoonacular API.
+
+Serves deterministic synthetic recipes for the endpoints SpoonacularClient
+uses (complexSearch, {id}/information, informationBulk), so seeding and
+imports can run without network access or API quota.
+
+Usage: python spoonacular_stub.py [--port 8089]
+       SPOONACULAR_BASE_URL=http://127.0.0.1:8089 python seed_recipes.py ...
+
+In-process: `server, base_url = start_stub_server()`; `server.shutdown()` when done.
+"""
+import argparse
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Tuple
+from urllib.parse import parse_qs, urlparse
+
+INGREDIENTS = [
+    "flour", "sugar", "butter", "egg", "milk", "salt", "garlic", "onion",
+    "olive oil", "tomato", "chicken breast", "rice", "pasta", "basil",
+    "parmesan", "lemon", "black pepper", "carrot", "potato", "cream",
+]
+
+
+def fake_recipe(recipe_id: int) -> Dict:
+    """Full recipe information for `recipe_id`; the same id always yields the same recipe."""
+    names = [INGREDIENTS[(recipe_id * 7 + i * 3) % len(INGREDIENTS)] for i in range(3 + recipe_id % 5)]
+    names = list(dict.fromkeys(names))
+    return {
+        "id": recipe_id,
+        "title": f"Stub Recipe {recipe_id}",
+        "summary": f"<b>Stub recipe</b> number {recipe_id} with {', '.join(names)}.",
+        "extendedIngredients": [
+            {"name": name, "amount": 1 + (recipe_id + i) % 4, "unit": "cup"}
+            for i, name in enumerate(names)
+        ],
+        "analyzedInstructions": [{
+            "steps": [{"number": i + 1, "step": f"Add the {name}."} for i, name in enumerate(names)]
+        }],
+        "readyInMinutes": 10 + recipe_id % 50,
+        "servings": 1 + recipe_id % 6,
+        "sourceUrl": f"https://example.com/recipes/{recipe_id}",
+    }
+
+
+def _query_base(query: str) -> int:
+    # Stable per-query id range so different queries return different recipes
+    return 1000 + sum(ord(c) for c in query.lower()) * 100
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def _send_json(self, status: int, body) -> None:
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+
+        if url.path == "/recipes/complexSearch":
+            query = params.get("query", [""])[0]
+            number = int(params.get("number", ["10"])[0])
+            offset = int(params.get("offset", ["0"])[0])
+            base = _query_base(query)
+            results = [
+                {"id": base + i, "title": f"Stub Recipe {base + i}"}
+                for i in range(offset, offset + number)
+            ]
+            self._send_json(200, {"results": results, "offset": offset,
+                                  "number": number, "totalResults": 1000})
+            return
+
+        if url.path == "/recipes/informationBulk":
+            ids = [int(i) for i in params.get("ids", [""])[0].split(",") if i.strip()]
+            self._send_json(200, [fake_recipe(recipe_id) for recipe_id in ids])
+            return
+
+        match = re.fullmatch(r"/recipes/(\d+)/information", url.path)
+        if match:
+            self._send_json(200, fake_recipe(int(match.group(1))))
+            return
+
+        self._send_json(404, {"status": "failure", "message": "Not found"})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server(host: str = "127.0.0.1", port: int = 0) -> Tuple[ThreadingHTTPServer, str]:
+    """Start the stub in a background thread; port 0 picks a free port."""
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local Spoonacular API stub")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), StubHandler)
+    print(f"Spoonacular stub listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
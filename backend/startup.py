@@ -0,0 +1,264 @@
+"""
+Application startup: schema check, cache preloading and phase timings.
+
+Instead of running Base.metadata.create_all on every worker start (which
+inspects every table and races the Alembic migrations), startup compares
+the database's alembic_version with the head revision of the migration
+scripts, in a single query that also serves as the connectivity check.
+STARTUP_SCHEMA selects the behaviour:
+
+- "check" (default): refuse to start unless the database is at head;
+- "create_all": the old behaviour, for throwaway development databases;
+- "skip": trust the deployment and run no query at all.
+
+Per-process caches (the ingredient vocabulary, the default recipe
+snapshot, the pantry bitsets, the autocomplete index) are then filled in
+the background, so the worker accepts requests right away; a request
+that arrives first simply fills them itself. Every phase is timed; the timings are logged and
+exported on /metrics as startup_phase_seconds.
+
+The caches that catch up incrementally by row id are also rebuilt from
+scratch every INDEX_RESYNC_SECONDS on a background thread, which picks
+up rows their incremental syncs could not see (see sync_cursor.py).
+"""
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from sqlalchemy import text
+from sqlalchemy.exc import ProgrammingError, OperationalError
+from sqlalchemy.orm import Session
+
+from autocomplete import autocomplete
+from config import INDEX_RESYNC_SECONDS, STARTUP_SCHEMA
+from default_recipes import default_recipe_store
+from ingredient_index import ingredient_index
+from pantry_matcher import pantry_matcher
+
+logger = logging.getLogger(__name__)
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini")
+VERSION_QUERY = text("SELECT version_num FROM alembic_version")
+
+
+class SchemaOutOfDate(RuntimeError):
+    """The database is not at the Alembic head revision."""
+
+
+class StartupTimings:
+    """Duration of each startup phase, in seconds, in the order they ran."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.phases: Dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.phases[name] = elapsed
+            logger.info("Startup phase %s took %.1f ms", name, elapsed * 1000)
+
+    def as_dict(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self.phases)
+
+
+timings = StartupTimings()
+
+
+# --- Schema ------------------------------------------------------
+def head_revisions() -> List[str]:
+    """Head revision(s) of the migration scripts; reads files only."""
+    alembic_config = Config(ALEMBIC_INI)
+    alembic_config.set_main_option(
+        "script_location", os.path.join(os.path.dirname(ALEMBIC_INI), "alembic")
+    )
+    return list(ScriptDirectory.from_config(alembic_config).get_heads())
+
+
+def check_revision(current: List[str], heads: List[str]) -> None:
+    if not current:
+        raise SchemaOutOfDate(
+            "Database has no Alembic revision; run `alembic upgrade head` "
+            "(or set STARTUP_SCHEMA=create_all for a throwaway database)"
+        )
+    if sorted(current) != sorted(heads):
+        raise SchemaOutOfDate(
+            f"Database is at revision {', '.join(sorted(current))} but the code expects "
+            f"{', '.join(sorted(heads))}; run `alembic upgrade head`"
+        )
+
+
+def _missing_version_table(exc: Exception) -> bool:
+    return "alembic_version" in str(exc)
+
+
+def prepare_schema(engine, create_all: Callable[[], None]) -> None:
+    """Apply STARTUP_SCHEMA on a sync Engine."""
+    if STARTUP_SCHEMA == "skip":
+        return
+    if STARTUP_SCHEMA == "create_all":
+        with timings.phase("create_all"):
+            create_all()
+        return
+
+    with timings.phase("schema_check"):
+        heads = head_revisions()
+        with engine.connect() as conn:
+            try:
+                current = list(conn.scalars(VERSION_QUERY))
+            except (ProgrammingError, OperationalError) as exc:
+                if not _missing_version_table(exc):
+                    raise
+                current = []
+        check_revision(current, heads)
+
+
+async def prepare_schema_async(async_engine, create_all: Callable) -> None:
+    """Async version of prepare_schema; `create_all` is awaited."""
+    if STARTUP_SCHEMA == "skip":
+        return
+    if STARTUP_SCHEMA == "create_all":
+        with timings.phase("create_all"):
+            await create_all()
+        return
+
+    with timings.phase("schema_check"):
+        heads = head_revisions()
+        async with async_engine.connect() as conn:
+            try:
+                current = list(await conn.scalars(VERSION_QUERY))
+            except (ProgrammingError, OperationalError) as exc:
+                if not _missing_version_table(exc):
+                    raise
+                current = []
+        check_revision(current, heads)
+
+
+# --- Cache preloading --------------------------------------------
+# (name, fn(Session)) pairs run in order by preload()
+preloaders: List[tuple] = []
+
+
+def preloader(name: str):
+    """Register fn(db: Session) to fill a per-process cache at startup."""
+    def register(fn: Callable[[Session], None]):
+        preloaders.append((name, fn))
+        return fn
+    return register
+
+
+def preload(db: Session) -> None:
+    """Run every registered preloader; a failure only costs that cache's warm-up."""
+    for name, fn in preloaders:
+        try:
+            with timings.phase(f"preload_{name}"):
+                fn(db)
+        except Exception:
+            logger.warning("Startup preload %s failed", name, exc_info=True)
+
+
+def preload_in_background(session_factory) -> threading.Thread:
+    """
+    Run preload() on a daemon thread with its own (sync) session, in both
+    modes: the preloaders are CPU work that would otherwise stall the
+    event loop.
+    """
+    def run():
+        with session_factory() as db:
+            preload(db)
+
+    thread = threading.Thread(target=run, name="startup-preload", daemon=True)
+    thread.start()
+    return thread
+
+
+
+@preloader("ingredient_index")
+def _preload_ingredient_index(db: Session) -> None:
+    ingredient_index.sync(db)
+
+
+@preloader("default_recipes")
+def _preload_default_recipes(db: Session) -> None:
+    default_recipe_store.get(db)
+
+
+@preloader("pantry_matcher")
+def _preload_pantry_matcher(db: Session) -> None:
+    pantry_matcher.sync(db)
+
+
+@preloader("autocomplete")
+def _preload_autocomplete(db: Session) -> None:
+    autocomplete.sync(db, force=True)
+
+
+# --- Periodic rebuilds -------------------------------------------
+# (name, fn(Session)) pairs run in order by resync()
+resyncers: List[tuple] = []
+
+
+def resyncer(name: str):
+    """Register fn(db: Session) to rebuild a per-process cache from scratch."""
+    def register(fn: Callable[[Session], None]):
+        resyncers.append((name, fn))
+        return fn
+    return register
+
+
+def resync(db: Session) -> None:
+    """Run every registered resyncer; a failure keeps that cache as it was."""
+    for name, fn in resyncers:
+        started = time.perf_counter()
+        try:
+            fn(db)
+        except Exception:
+            logger.warning("Resync of %s failed", name, exc_info=True)
+        else:
+            logger.info("Resync of %s took %.1f ms", name, (time.perf_counter() - started) * 1000)
+
+
+def resync_in_background(session_factory, interval: float = INDEX_RESYNC_SECONDS) -> Optional[threading.Thread]:
+    """
+    Run resync() every `interval` seconds on a daemon thread with its own
+    session, in both modes: the rebuilds are CPU work that would otherwise
+    stall the event loop. None when `interval` is 0.
+    """
+    if interval <= 0:
+        return None
+
+    def run():
+        while True:
+            time.sleep(interval)
+            with session_factory() as db:
+                resync(db)
+
+    thread = threading.Thread(target=run, name="index-resync", daemon=True)
+    thread.start()
+    return thread
+
+
+@resyncer("ingredient_index")
+def _resync_ingredient_index(db: Session) -> None:
+    ingredient_index.resync(db)
+
+
+@resyncer("pantry_matcher")
+def _resync_pantry_matcher(db: Session) -> None:
+    pantry_matcher.resync(db)
+
+
+@resyncer("autocomplete")
+def _resync_autocomplete(db: Session) -> None:
+    autocomplete.resync(db)
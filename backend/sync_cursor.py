@@ -0,0 +1,71 @@
+"""
+Incremental catch-up reads by row id, for the per-process caches
+(ingredient vocabulary, pantry bitsets, autocomplete).
+
+Each sync reads only rows it has not read yet. "id > highest id read"
+is not enough: ids are taken at INSERT but rows become visible at
+COMMIT, so a transaction holding lower ids (an importer batch, say) can
+commit after a higher id was already read, and its rows would be
+skipped for good. SyncCursor also remembers the ids it has not seen in
+the trailing INDEX_SYNC_GAP_IDS ids below the highest one (the gaps),
+and every sync reads those again until they appear or
+INDEX_SYNC_GAP_SECONDS pass; ids of rolled-back or deleted rows never
+appear. Rows that take even longer are picked up by the periodic full
+rebuild (startup.resync_in_background).
+"""
+import time
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import or_
+
+from config import INDEX_SYNC_GAP_IDS, INDEX_SYNC_GAP_SECONDS
+
+
+class SyncCursor:
+    """The highest row id read, and the unread ids below it still expected."""
+
+    def __init__(self):
+        self.max_id = 0
+        self._gaps: Dict[int, float] = {}  # unread id -> when it was first missed
+
+    @property
+    def gaps(self) -> List[int]:
+        return sorted(self._gaps)
+
+    def _gap_ranges(self) -> List[Tuple[int, int]]:
+        ranges: List[Tuple[int, int]] = []
+        for row_id in self.gaps:
+            if ranges and ranges[-1][1] == row_id - 1:
+                ranges[-1] = (ranges[-1][0], row_id)
+            else:
+                ranges.append((row_id, row_id))
+        return ranges
+
+    def unread(self, column):
+        """WHERE clause for rows not read yet: above max_id, or in a gap."""
+        if not self._gaps:
+            return column > self.max_id
+        return or_(column > self.max_id, *(
+            column == low if low == high else column.between(low, high)
+            for low, high in self._gap_ranges()
+        ))
+
+    def advance(self, ids: Iterable[int]) -> None:
+        """
+        Record the ids of the rows a sync read. Below the highest id, only
+        the trailing INDEX_SYNC_GAP_IDS need to be among them; older unread
+        ids are not tracked.
+        """
+        now = time.monotonic()
+        seen = set(ids)
+        for row_id in seen.intersection(self._gaps):
+            del self._gaps[row_id]
+        top = max(seen, default=0)
+        if top > self.max_id:
+            for row_id in range(max(self.max_id, top - INDEX_SYNC_GAP_IDS) + 1, top):
+                if row_id not in seen:
+                    self._gaps[row_id] = now
+            self.max_id = top
+        expired = now - INDEX_SYNC_GAP_SECONDS
+        if any(missed_at <= expired for missed_at in self._gaps.values()):
+            self._gaps = {row_id: missed_at for row_id, missed_at in self._gaps.items() if missed_at > expired}
@@ -0,0 +1,61 @@
+"""NameMatcher.matching must return exactly the names term_matches accepts."""
+import random
+
+import pytest
+
+from ingredient_matcher import SEPARATOR, NameMatcher, term_matches
+
+NAMES = [
+    "salt", "sea salt", "tomato", "roma tomatoes", "tomato paste", "egg",
+    "eggplant", "oil", "olive oil", "garlic", "garlic powder", "a", "",
+    "pepper", "red pepper flakes", "x" + SEPARATOR + "y",
+]
+
+TERMS = [
+    "", "a", "salt", "tomato", "tomatoes", "sea salt and pepper",
+    "olive oil", "egg", "eggs", "eggplant parmesan", "garlic powder mix",
+    "x", "y", SEPARATOR, "x" + SEPARATOR + "y", "zzz", "tomato" * 30,
+]
+
+
+def expected(names, term):
+    return {name for name in names if term_matches(term, name)}
+
+
+@pytest.mark.parametrize("term", TERMS)
+def test_matches_term_matches(term):
+    matcher = NameMatcher(NAMES)
+    assert matcher.matching(term) == expected(NAMES, term)
+
+
+def test_names_added_later_are_matched():
+    matcher = NameMatcher(["oil"])
+    matcher.add(["extra virgin olive oil", "oil", "vinegar"])
+    names = list(matcher)
+    assert names == ["oil", "extra virgin olive oil", "vinegar"]
+    for term in ["oil", "olive", "balsamic vinegar", "extra virgin olive oil spray"]:
+        assert matcher.matching(term) == expected(names, term)
+
+
+def test_longest_name_grows_with_add():
+    matcher = NameMatcher(["ab"])
+    matcher.add(["abcdefgh"])
+    assert matcher.matching("xxabcdefghxx") == {"ab", "abcdefgh"}
+
+
+def test_random_vocabularies():
+    rng = random.Random(20)
+    alphabet = "abc "
+    for _ in range(200):
+        names = {
+            "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 6)))
+            for _ in range(rng.randint(0, 15))
+        }
+        matcher = NameMatcher()
+        ordered = sorted(names)
+        split = rng.randint(0, len(ordered))
+        matcher.add(ordered[:split])
+        matcher.add(ordered[split:])
+        for _ in range(10):
+            term = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 12)))
+            assert matcher.matching(term) == expected(names, term)
@@ -0,0 +1,79 @@
+"""Cursor pages must cover every visible recipe exactly once, in order."""
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select
+
+import default_recipes
+import recipe_service
+from database import Recipe, User
+from pagination import decode_cursor
+
+
+def add_recipes(db, owners, created_at=None):
+    """One recipe per entry of `owners` (None = default recipe); created_at from the database when not given."""
+    for owner in owners:
+        recipe = Recipe(title="soup", ingredients=[], instructions="stir", user_id=owner)
+        if created_at is not None:
+            recipe.created_at = created_at
+        db.add(recipe)
+    db.commit()
+
+
+@pytest.fixture
+def user_id(db):
+    user = User(username="cook", email="cook@example.com", hash_password="x")
+    db.add(user)
+    db.commit()
+    # Several rows share each server-side created_at, so the id breaks the ties
+    add_recipes(db, [None, user.id, None, user.id, None, None, user.id])
+    add_recipes(db, [user.id, None, None], created_at=datetime(2020, 1, 1, 12, 0, 0, 250000))
+    return user.id
+
+
+def visible_ids(db, user_id):
+    rows = db.execute(
+        select(Recipe.id).where((Recipe.user_id == user_id) | Recipe.user_id.is_(None))
+        .order_by(Recipe.created_at.desc(), Recipe.id.desc())
+    ).scalars()
+    return list(rows)
+
+
+def walk(fetch, types, max_pages=50):
+    ids, after = [], None
+    for _ in range(max_pages):
+        rows, cursor = fetch(after)
+        ids.extend(row["id"] for row in rows)
+        if cursor is None:
+            return ids
+        after = decode_cursor(cursor, types)
+    pytest.fail(f"no last page after {max_pages} pages: {ids[:20]}")
+
+
+@pytest.mark.parametrize("snapshot", [True, False])
+@pytest.mark.parametrize("limit", [1, 2, 3])
+def test_list_pages_cover_every_recipe_once(db, user_id, monkeypatch, snapshot, limit):
+    monkeypatch.setattr(default_recipes, "DEFAULT_SNAPSHOT_ENABLED", snapshot)
+    ids = walk(lambda after: recipe_service.list_page(db, user_id, limit, after=after, summary=True),
+               (datetime, int))
+    assert ids == visible_ids(db, user_id)
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3])
+def test_search_pages_cover_every_match_once(db, user_id, limit):
+    ids = walk(lambda after: recipe_service.search_page(db, user_id, "soup", limit, after=after, summary=True),
+               (float, datetime, int))
+    assert sorted(ids) == sorted(visible_ids(db, user_id))
+    assert len(ids) == len(set(ids))
+
+
+@pytest.mark.parametrize("offset", [0, 2])
+def test_cursor_replaces_offset_with_and_without_snapshot(db, user_id, monkeypatch, offset):
+    _, cursor = recipe_service.list_page(db, user_id, 3, summary=True)
+    after = decode_cursor(cursor, (datetime, int))
+    pages = {}
+    for snapshot in (True, False):
+        monkeypatch.setattr(default_recipes, "DEFAULT_SNAPSHOT_ENABLED", snapshot)
+        rows, _ = recipe_service.list_page(db, user_id, 2, offset=offset, after=after, summary=True)
+        pages[snapshot] = [row["id"] for row in rows]
+    assert pages[True] == pages[False] == visible_ids(db, user_id)[3:5]